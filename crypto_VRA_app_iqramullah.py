@@ -1,15 +1,31 @@
 import streamlit as st
 import base64
-import requests
 import pandas as pd
 import numpy as np
 import os
+import json
 import time
-import plotly.graph_objects as go
 import plotly.express as px
-from datetime import datetime
 from streamlit_autorefresh import st_autorefresh
 
+from crypto_vra.assets import background_css, build_image_variants
+from crypto_vra.intervals import INTERVAL_MS, bar_label, lookback_options, periods_per_year
+from crypto_vra.exchange import QUOTE_ASSETS, crypto_symbols, discover_symbols, mirror_stats
+from crypto_vra.ingest import INGEST_WAIT_TIMEOUT, request_refresh, wait_for_ingest
+from crypto_vra.metrics import beta_label, calculate_volatility_simple, risk_level, validate_price_data
+from crypto_vra.live import LIVE_REFRESH_SECONDS, acquire_live_stream
+from crypto_vra.dag import analytics, analytics_context
+from crypto_vra.alerts import start_alert_service
+from crypto_vra.correlation import CORR_WINDOWS, rolling_correlation
+from crypto_vra.charts import CHART_POINT_BUDGET, downsample, in_window, line_figure
+from crypto_vra.processed import RangeIndex
+from crypto_vra.portfolio import portfolio_stats, risk_contributions
+from crypto_vra.risk import MC_PATHS
+from crypto_vra.volatility import garch_conditional_volatility, garch_forecast
+from crypto_vra.profiling import (
+    RunRecorder, record_frame, registry, stage, start_metrics_server
+)
+
 # =====================================================
 # PAGE CONFIG
 # =====================================================
@@ -37,25 +53,51 @@ if "users_db" not in st.session_state:
 if "selected_days" not in st.session_state:
     st.session_state.selected_days = 180
 
+if "selected_interval" not in st.session_state:
+    st.session_state.selected_interval = "1d"
+
+if "universe" not in st.session_state:
+    st.session_state.universe = "core"
+
+if "quote_asset" not in st.session_state:
+    st.session_state.quote_asset = "USDT"
+
 # =====================================================
 # BACKGROUND IMAGE
 # =====================================================
-def get_base64(file_path):
-    if os.path.exists(file_path):
-        with open(file_path, "rb") as f:
-            return base64.b64encode(f.read()).decode()
-    return None
-
-bg_image = get_base64("assets/login_img.png")
+# Encoded once per process into fingerprinted AVIF/WebP/JPEG variants under
+# ./static and referenced by URL (server.enableStaticServing, see
+# .streamlit/config.toml). Without static serving the PNG is inlined as
+# before, but base64-encoded only once.
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKGROUND_SOURCE = os.path.join(APP_DIR, "assets", "login_img.png")
+BACKGROUND_STATIC_DIR = os.path.join(APP_DIR, "static", "bg")
+BACKGROUND_URL_PREFIX = "app/static/bg"
+
+@st.cache_resource(show_spinner=False)
+def background_style():
+    if not os.path.exists(BACKGROUND_SOURCE):
+        return None
+    if st.get_option("server.enableStaticServing"):
+        try:
+            manifest = build_image_variants(BACKGROUND_SOURCE, BACKGROUND_STATIC_DIR)
+            return background_css(manifest, BACKGROUND_URL_PREFIX)
+        except Exception:
+            pass
+    with open(BACKGROUND_SOURCE, "rb") as f:
+        encoded = base64.b64encode(f.read()).decode()
+    return f'.stApp {{ background-image: url("data:image/png;base64,{encoded}"); }}'
+
+bg_style = background_style()
 
 # =====================================================
 # PREMIUM UI (UPDATED WITH MILESTONE STYLING)
 # =====================================================
-if bg_image:
+if bg_style:
     st.markdown(f"""
     <style>
+    {bg_style}
     .stApp {{
-        background-image: url("data:image/png;base64,{bg_image}");
         background-size: cover;
         background-position: center;
         background-attachment: fixed;
@@ -203,130 +245,143 @@ if bg_image:
     """, unsafe_allow_html=True)
 
 # =====================================================
-# HELPERS
+# SYMBOL UNIVERSE
 # =====================================================
-def calculate_volatility_simple(df):
-    if df.empty or len(df) < 2:
-        return 0
-    returns = df["price"].pct_change().dropna()
-    return returns.std() * np.sqrt(365) * 100
-
-def risk_level(vol):
-    if vol < 20:
-        return "🟢 Low Risk"
-    elif vol < 50:
-        return "🟡 Medium Risk"
-    else:
-        return "🔴 High Risk"
+@st.cache_data(ttl=3600, show_spinner=False)
+def universe_symbols(quote_asset="USDT"):
+    return discover_symbols(quote_asset)
 
-# =====================================================
-# BINANCE FETCH (UPDATED)
-# =====================================================
-BINANCE_BASE_URLS = [
-    "https://api.binance.com",
-    "https://api-gcp.binance.com",
-    "https://api1.binance.com",
-    "https://api2.binance.com",
-    "https://api3.binance.com",
-]
-
-crypto_symbols = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "ADAUSDT", "DOGEUSDT"]
-
-@st.cache_data(ttl=300, show_spinner=False)
-def fetch_binance_data(days):
-    limit = min(days, 1000)
-    all_data = []
-
-    for symbol in crypto_symbols:
-        for base_url in BINANCE_BASE_URLS:
-            try:
-                url = f"{base_url}/api/v3/klines"
-                params = {
-                    "symbol": symbol,
-                    "interval": "1d",
-                    "limit": limit
-                }
-
-                r = requests.get(url, params=params, timeout=10)
-
-                if r.status_code == 200:
-                    df = pd.DataFrame(r.json())
-                    df = df.iloc[:, [0, 4]]
-                    df.columns = ["timestamp", "price"]
-                    df["date"] = pd.to_datetime(df["timestamp"], unit="ms")
-                    df["crypto"] = symbol
-                    df["price"] = df["price"].astype(float)
-                    all_data.append(df[["date", "crypto", "price"]])
-                    break
-            except Exception:
-                continue
-        time.sleep(0.2)
-
-    if not all_data:
-        return pd.DataFrame()
-
-    return pd.concat(all_data).sort_values("date")
+def session_symbols():
+    if st.session_state.universe == "all":
+        symbols = universe_symbols(st.session_state.quote_asset)
+        if symbols:
+            return symbols
+    return crypto_symbols
 
 # =====================================================
-# MILESTONE 2 FUNCTIONS (UNCHANGED)
+# CHART ZOOM
 # =====================================================
-TRADING_DAYS = 252
-
-def validate_price_data(df):
-    required_cols = {"date", "crypto", "price"}
-    return not df.empty and required_cols.issubset(df.columns)
-
-def compute_log_returns(df):
-    df = df.copy().sort_values(["crypto", "date"])
-    df["log_return"] = df.groupby("crypto")["price"].transform(
-        lambda x: np.log(x / x.shift(1))
+def zoom_window(times, key, budget=CHART_POINT_BUDGET):
+    # Only offered when the data would be downsampled; returns the
+    # (start, end) to slice the full-resolution frame with
+    times = pd.Series(times)
+    start, end = times.min(), times.max()
+    if len(times) <= budget or pd.isna(start) or start == end:
+        return start, end
+    span = (end - start).to_pytimedelta()
+    step = max(span / 500, pd.Timedelta(minutes=1).to_pytimedelta())
+    lo, hi = st.slider(
+        "🔎 Zoom",
+        min_value=start.to_pydatetime(),
+        max_value=end.to_pydatetime(),
+        value=(start.to_pydatetime(), end.to_pydatetime()),
+        step=step,
+        format="YYYY-MM-DD HH:mm",
+        key=key
     )
-    return df
-
-def compute_volatility(returns_df):
-    return (returns_df.groupby("crypto")["log_return"]
-            .std() * np.sqrt(TRADING_DAYS) * 100).round(2)
+    return pd.Timestamp(lo), pd.Timestamp(hi)
 
-def compute_sharpe(returns_df):
-    mean_returns = returns_df.groupby("crypto")["log_return"].mean() * TRADING_DAYS
-    vol = returns_df.groupby("crypto")["log_return"].std() * np.sqrt(TRADING_DAYS)
-    return (mean_returns / vol).round(2)
+# =====================================================
+# CSV EXPORT
+# =====================================================
+@st.cache_data(max_entries=2, show_spinner=False)
+def prices_csv(prices_version, _prices):
+    # Serialized once per version of the price panel, not on every rerun
+    return _prices.to_csv(index=False).encode()
 
-def compute_beta(returns_df, benchmark="BTCUSDT"):
-    pivot = returns_df.pivot(index="date", columns="crypto", values="log_return")
-    if benchmark not in pivot.columns:
-        return pd.Series(dtype=float)
+# =====================================================
+# MILESTONE 3 RANGE INDEX
+# =====================================================
+@st.cache_resource(max_entries=4, show_spinner=False)
+def processed_range_index(processed_version, _ctx):
+    # Keyed by the version of the processed stage, so the index is rebuilt
+    # exactly when the dataset it was built from changes
+    processed = analytics.get("processed", _ctx)
+    record_frame("processed", processed)
+    with stage("processed.index"):
+        return RangeIndex(
+            processed,
+            value_cols=("Returns", "Volatility", "Sharpe_Ratio"),
+            squared_cols=("Returns",)
+        )
 
-    market_var = pivot[benchmark].var()
-    beta_values = {}
+# =====================================================
+# PERFORMANCE PANEL
+# =====================================================
+# Every rerun of the main app is recorded (stage timings, cache counters,
+# frame footprints). Admins, or everyone when CVRA_PERF_PANEL=1, can open
+# the breakdown in the sidebar and capture a cProfile of the next rerun.
+# CVRA_METRICS_LOG appends each rerun as a JSON line and CVRA_METRICS_PORT
+# serves process totals on /metrics.
+PERF_PANEL_USERS = {"admin"}
+
+start_metrics_server()
+# Alert worker for this server process, started by the first script run
+# once an alert rules file exists; it keeps running after the session
+# closes. For alerts with no session ever opened, run the headless
+# watcher instead (see crypto_vra/alerts.py)
+alert_service = start_alert_service()
+
+def perf_panel_enabled():
+    return (os.environ.get("CVRA_PERF_PANEL") == "1"
+            or st.session_state.get("username") in PERF_PANEL_USERS)
+
+def render_perf_panel(run):
+    with st.sidebar:
+        if not st.toggle("🛠️ Performance panel", key="perf_panel"):
+            return
+        st.caption(f"Rerun of **{run.label}** took {run.seconds * 1000:.0f} ms")
+        if run.stages:
+            st.dataframe(pd.DataFrame([
+                {"Stage": "· " * s["depth"] + s["stage"], "ms": round(s["seconds"] * 1000, 1)}
+                for s in sorted(run.stages, key=lambda s: s["offset"])
+            ]), hide_index=True, use_container_width=True)
+        if run.counters:
+            st.dataframe(
+                pd.DataFrame(sorted(run.counters.items()), columns=["Counter", "Count"]),
+                hide_index=True, use_container_width=True
+            )
+        if run.frames:
+            st.dataframe(pd.DataFrame([
+                {"Frame": name, "Rows": f["rows"], "MB": round(f["bytes"] / 2**20, 2)}
+                for name, f in run.frames.items()
+            ]), hide_index=True, use_container_width=True)
+        st.markdown("**Mirrors**")
+        st.dataframe(pd.DataFrame(mirror_stats()), hide_index=True, use_container_width=True)
+        with st.expander("Process totals"):
+            st.json(registry.snapshot())
+        st.download_button(
+            "⬇️ Rerun log (JSON)",
+            json.dumps(run.to_dict(), indent=2),
+            file_name=f"rerun-{run.label}.json",
+            mime="application/json",
+            use_container_width=True
+        )
+        if st.button("🔬 Profile next rerun", use_container_width=True):
+            st.session_state.perf_profile_next = True
+            st.rerun()
+        if run.profile_text:
+            with st.expander("cProfile (cumulative)", expanded=True):
+                st.code(run.profile_text)
 
-    for col in pivot.columns:
-        if col == benchmark:
-            beta_values[col] = 1.0
+# =====================================================
+# ALERTS PANEL
+# =====================================================
+def render_alert_panel(service):
+    with st.sidebar.expander("🔔 Alerts"):
+        if service.error is not None:
+            st.warning(f"⚠️ Alert worker: {service.error}")
+        if service.last_run and service.engine is not None:
+            checked = time.strftime("%H:%M:%S", time.localtime(service.last_run))
+            st.caption(f"{len(service.engine.rules.rules)} rules, last checked {checked}")
+        recent = service.snapshot()[::-1][:20]
+        if recent:
+            st.dataframe(
+                pd.DataFrame(recent)[["bar", "symbol", "rule", "value"]],
+                hide_index=True, use_container_width=True
+            )
         else:
-            cov = pivot[col].cov(pivot[benchmark])
-            beta_values[col] = cov / market_var if market_var != 0 else np.nan
-
-    return pd.Series(beta_values).round(2)
-
-def add_rolling_features(df, window=30):
-    df = df.copy().sort_values(["crypto", "date"])
-    df["ma_30"] = df.groupby("crypto")["price"].transform(
-        lambda x: x.rolling(window).mean()
-    )
-    df["rolling_vol_30"] = df.groupby("crypto")["log_return"].transform(
-        lambda x: x.rolling(window).std() * np.sqrt(TRADING_DAYS) * 100
-    )
-    return df
-
-def build_metrics_table(returns_df):
-    metrics = pd.concat([
-        compute_volatility(returns_df),
-        compute_sharpe(returns_df),
-        compute_beta(returns_df)
-    ], axis=1)
-    metrics.columns = ["Volatility (%)", "Sharpe Ratio", "Beta vs BTC"]
-    return metrics.reset_index().rename(columns={"index": "Crypto"})
+            st.caption("No alerts fired yet")
 
 # =====================================================
 # LOGIN PAGE (UPDATED)
@@ -354,6 +409,7 @@ if not st.session_state.logged_in:
                 if username in st.session_state.users_db and \
                    st.session_state.users_db[username] == password:
                     st.session_state.logged_in = True
+                    st.session_state.username = username
                     st.success("✨ Login Successful!")
                     time.sleep(1)
                     st.rerun()
@@ -413,6 +469,15 @@ if not st.session_state.logged_in:
 # =====================================================
 else:
 
+    # A rerun cut short by st.rerun()/st.stop() is closed here instead
+    stale_run = st.session_state.pop("perf_run", None)
+    if stale_run is not None:
+        stale_run.finish()
+    st.session_state.perf_run = RunRecorder(
+        st.session_state.active_page,
+        profile=st.session_state.pop("perf_profile_next", False)
+    ).activate()
+
     if st.session_state.active_page == "dashboard":
 
         st.markdown(
@@ -447,7 +512,9 @@ else:
     # =================================================
     elif st.session_state.active_page == "milestone_1":
 
-        st_autorefresh(interval=60000, key="datarefresh")
+        # In live mode only the streaming panel refreshes (see below)
+        if not st.session_state.get("live_mode", False):
+            st_autorefresh(interval=60000, key="datarefresh")
 
         st.markdown(
             '<div class="header"><h2>📊 Milestone-1: Live Crypto Monitoring</h2></div>',
@@ -455,44 +522,108 @@ else:
         )
 
         # ⭐ CONTROLS WITH CYAN LABELS
-        cA, cB = st.columns([1, 1])
+        cI, cA, cU, cB = st.columns([1, 1, 1, 1])
+
+        with cI:
+            st.markdown(
+                '<p class="milestone-label">⏱️ Select Interval</p>',
+                unsafe_allow_html=True
+            )
+            interval = st.selectbox(
+                "label",
+                list(INTERVAL_MS),
+                index=list(INTERVAL_MS).index(st.session_state.selected_interval),
+                label_visibility="collapsed"
+            )
+            st.session_state.selected_interval = interval
 
         with cA:
             st.markdown(
                 '<p class="milestone-label">📅 Select Data Range</p>',
                 unsafe_allow_html=True
             )
+            day_options = lookback_options(interval)
+            if st.session_state.selected_days not in day_options:
+                st.session_state.selected_days = day_options[0]
             days = st.selectbox(
                 "label",
-                [30, 180, 365],
-                index=[30, 180, 365].index(st.session_state.selected_days),
+                day_options,
+                index=day_options.index(st.session_state.selected_days),
+                format_func=lambda d: f"{d} days",
                 label_visibility="collapsed"
             )
             st.session_state.selected_days = days
 
+        with cU:
+            st.markdown(
+                '<p class="milestone-label">🌐 Symbol Universe</p>',
+                unsafe_allow_html=True
+            )
+            universe_options = ["core"] + QUOTE_ASSETS
+            universe_choice = st.selectbox(
+                "label",
+                universe_options,
+                index=universe_options.index(
+                    "core" if st.session_state.universe == "core"
+                    else st.session_state.quote_asset
+                ),
+                format_func=lambda q: "Core pairs" if q == "core" else f"All {q} pairs",
+                label_visibility="collapsed"
+            )
+            if universe_choice == "core":
+                st.session_state.universe = "core"
+            else:
+                st.session_state.universe = "all"
+                st.session_state.quote_asset = universe_choice
+
         with cB:
             if st.button("🔄 Refresh Data", use_container_width=True):
-                fetch_binance_data.clear()
+                request_refresh(
+                    st.session_state.selected_days,
+                    st.session_state.selected_interval,
+                    session_symbols()
+                )
                 st.rerun()
-
-        with st.spinner("⏳ Fetching Binance data..."):
-            final_df = fetch_binance_data(st.session_state.selected_days)
+            st.toggle("⚡ Live streaming", key="live_mode")
+
+        universe = session_symbols()
+        progress = st.progress(0.0, text=f"⏳ Fetching Binance data for {len(universe)} symbols...")
+        wait_for_ingest(
+            st.session_state.selected_days,
+            st.session_state.selected_interval,
+            symbols=universe,
+            on_progress=lambda done, total: progress.progress(
+                done / total, text=f"⏳ Ingested {done}/{total} symbols"
+            )
+        )
+        progress.empty()
+        # Read through the analytics graph, so Milestone-2/3 reuse this panel
+        prices_ctx = analytics_context(
+            st.session_state.selected_days, universe, st.session_state.selected_interval
+        )
+        final_df = analytics.get("prices", prices_ctx)
+        record_frame("prices", final_df)
 
         if final_df.empty:
             st.error("⚠️ Binance API unavailable - Please try again later")
             st.stop()
 
-        os.makedirs("data", exist_ok=True)
-        file_path = "data/binance_crypto_prices.csv"
-        final_df.to_csv(file_path, index=False)
-
         st.success("✅ Live Data Updated Successfully!")
+
+        st.download_button(
+            "⬇️ Export CSV",
+            prices_csv(analytics.version("prices", prices_ctx), final_df),
+            file_name="binance_crypto_prices.csv",
+            mime="text/csv"
+        )
         
         st.markdown(
             '<p class="milestone-subheader">📋 Recent Data (Last 10 Records)</p>',
             unsafe_allow_html=True
         )
-        st.dataframe(final_df.tail(10), use_container_width=True)
+        # Panels are grouped by symbol; pick the latest bars across all of them
+        latest = np.argsort(final_df["date"].to_numpy(), kind="stable")[-10:]
+        st.dataframe(final_df.iloc[latest], use_container_width=True)
 
         # ⭐ CYAN TEXT FOR "Select Cryptocurrency"
         st.markdown(
@@ -511,9 +642,10 @@ else:
             '<p class="milestone-subheader">📈 Price Chart</p>',
             unsafe_allow_html=True
         )
-        st.line_chart(filtered.set_index("date")["price"], use_container_width=True)
+        chart_df = in_window(filtered, "date", zoom_window(filtered["date"], "price_zoom"))
+        st.line_chart(downsample(chart_df, "date", "price").set_index("date")["price"], use_container_width=True)
 
-        vol = calculate_volatility_simple(filtered)
+        vol = calculate_volatility_simple(filtered, periods_per_year(st.session_state.selected_interval))
         risk = risk_level(vol)
 
         # ⭐ CYAN LABELS FOR METRICS WITH COLORED VALUES
@@ -539,6 +671,37 @@ else:
                 unsafe_allow_html=True
             )
 
+        if st.session_state.get("live_mode", False):
+            stream = acquire_live_stream(
+                sorted(final_df["crypto"].unique()),
+                st.session_state.selected_interval,
+                final_df
+            )
+
+            @st.fragment(run_every=LIVE_REFRESH_SECONDS)
+            def live_panel():
+                frame, stats, status = stream.snapshot(selected_coin)
+                st.markdown(
+                    f'<p class="milestone-subheader">⚡ Live {selected_coin}</p>',
+                    unsafe_allow_html=True
+                )
+                if status["error"] and not status["connected"]:
+                    st.warning(f"⚠️ Stream reconnecting: {status['error']}")
+                l1, l2, l3, l4 = st.columns(4)
+                l1.metric("Last Price", f"{stats.get('price', np.nan):,.4f}")
+                l2.metric("MA (30)", f"{stats.get('ma_30', np.nan):,.4f}")
+                l3.metric("Rolling Vol (30)", f"{stats.get('rolling_vol_30', np.nan):.2f}%")
+                l4.metric("Rolling Sharpe (30)", f"{stats.get('rolling_sharpe', np.nan):.2f}")
+                if not frame.empty:
+                    st.line_chart(frame.set_index("date")["price"], use_container_width=True)
+                lag = status["lag"]
+                st.caption(
+                    f"{status['messages']} updates · "
+                    + (f"last tick {lag:.1f}s ago" if lag is not None else "waiting for first tick")
+                )
+
+            live_panel()
+
         st.divider()
         
         if st.button("⬅️ Back to Dashboard", use_container_width=True):
@@ -557,50 +720,15 @@ else:
 
         st.markdown('<p class="milestone-subheader">📁 Loading / Preparing Processed Data</p>', unsafe_allow_html=True)
 
-        def load_or_build_processed():
-            proc_path = "data/crypto_processed.csv"
-            raw_path = "data/binance_crypto_prices.csv"
-
-            if os.path.exists(proc_path):
-                try:
-                    df = pd.read_csv(proc_path, parse_dates=["Date"]) 
-                    expected = {"Date", "Close", "Returns", "Volatility", "Sharpe_Ratio", "Crypto"}
-                    if expected.issubset(set(df.columns)):
-                        return df
-                except Exception:
-                    pass
-
-            # Fallback: build from raw Binance CSV
-            if not os.path.exists(raw_path):
-                return pd.DataFrame()
-
-            df = pd.read_csv(raw_path)
-            df = df.rename(columns={"date": "Date", "price": "Close", "crypto": "Crypto"})
-            df["Date"] = pd.to_datetime(df["Date"]) 
-            df = df.sort_values(["Crypto", "Date"]).reset_index(drop=True)
-            df["Close"] = df["Close"].astype(float)
-            df["Returns"] = df.groupby("Crypto")["Close"].transform(lambda x: x.pct_change())
-            # Rolling volatility and Sharpe (30-day window)
-            window = 30
-            df["Volatility"] = df.groupby("Crypto")["Returns"].transform(
-                lambda x: x.rolling(window).std() * np.sqrt(TRADING_DAYS)
-            )
-            df["Sharpe_Ratio"] = df.groupby("Crypto")["Returns"].transform(
-                lambda x: (x.rolling(window).mean() * TRADING_DAYS) / (x.rolling(window).std() * np.sqrt(TRADING_DAYS))
-            )
-
-            # Keep mandatory columns and save a copy for faster reloads
-            out = df[["Date", "Crypto", "Close", "Returns", "Volatility", "Sharpe_Ratio"]]
-            try:
-                out.to_csv(proc_path, index=False)
-            except Exception:
-                pass
-
-            return out
-
-        proc_df = load_or_build_processed()
+        ctx = analytics_context(
+            st.session_state.selected_days,
+            session_symbols(),
+            st.session_state.selected_interval
+        )
+        range_index = processed_range_index(analytics.version("processed", ctx), ctx)
+        ppy = ctx["ppy"]
 
-        if proc_df.empty:
+        if range_index.empty:
             st.error("⚠️ Processed dataset not found and raw data unavailable. Run Milestone-1 & Milestone-2 first.")
             if st.button("⬅️ Back to Dashboard", use_container_width=True):
                 st.session_state.active_page = "dashboard"
@@ -610,32 +738,35 @@ else:
         # -----------------------
         # Filters
         # -----------------------
-        min_date = proc_df["Date"].min().date()
-        max_date = proc_df["Date"].max().date()
+        first_bar, last_bar = range_index.time_span()
+        min_date = first_bar.date()
+        max_date = last_bar.date()
 
         c1, c2 = st.columns([2, 3])
         with c1:
             date_range = st.date_input("Select date range", value=(min_date, max_date), min_value=min_date, max_value=max_date)
-            cryptos = st.multiselect("Select cryptocurrencies", options=proc_df["Crypto"].unique(), default=list(proc_df["Crypto"].unique()))
+            crypto_options = range_index.symbols
+            default_cryptos = [c for c in crypto_symbols if c in crypto_options] or crypto_options[:len(crypto_symbols)]
+            cryptos = st.multiselect("Select cryptocurrencies", options=crypto_options, default=default_cryptos)
 
         with c2:
             st.markdown("\n")
             if st.button("🔄 Refresh Processed Data", use_container_width=True):
-                # clear cache file and rebuild
-                try:
-                    if os.path.exists("data/crypto_processed.csv"):
-                        os.remove("data/crypto_processed.csv")
-                except Exception:
-                    pass
-                proc_df = load_or_build_processed()
-                st.experimental_rerun()
+                # drop this artifact so the rerun rebuilds it
+                analytics.invalidate("processed", ctx)
+                processed_range_index.clear()
+                st.rerun()
 
         # -----------------------
         # Data filtering
         # -----------------------
         start, end = date_range
-        mask = (proc_df["Date"].dt.date >= start) & (proc_df["Date"].dt.date <= end) & (proc_df["Crypto"].isin(cryptos))
-        filtered = proc_df.loc[mask].copy()
+        # Both ends are whole days; end is made exclusive at the next midnight
+        lo, hi = range_index.bounds(sorted(cryptos), start, pd.Timestamp(end) + pd.Timedelta(days=1))
+        keep = hi > lo
+        shown = [c for c, k in zip(sorted(cryptos), keep) if k]
+        lo, hi = lo[keep], hi[keep]
+        filtered = range_index.rows(lo, hi)
 
         if filtered.empty:
             st.warning("No data for selected filters")
@@ -644,7 +775,7 @@ else:
             # Price Trend
             # -----------------------
             st.markdown('<p class="milestone-subheader">📈 Price Trend</p>', unsafe_allow_html=True)
-            fig_price = px.line(filtered, x="Date", y="Close", color="Crypto", title="Price vs Date")
+            fig_price = line_figure(filtered, x="Date", y="Close", color="Crypto", title="Price vs Date")
             fig_price.update_layout(plot_bgcolor="rgba(15, 20, 45, 0.5)", paper_bgcolor="rgba(15, 20, 45, 0.3)", font=dict(color="#00FFFF"))
             st.plotly_chart(fig_price, use_container_width=True)
 
@@ -652,7 +783,7 @@ else:
             # Volatility Trend
             # -----------------------
             st.markdown('<p class="milestone-subheader">📉 Volatility Trend</p>', unsafe_allow_html=True)
-            fig_vol = px.line(filtered, x="Date", y="Volatility", color="Crypto", title="Volatility vs Date")
+            fig_vol = line_figure(filtered, x="Date", y="Volatility", color="Crypto", title="Volatility vs Date")
             fig_vol.update_layout(plot_bgcolor="rgba(15, 20, 45, 0.5)", paper_bgcolor="rgba(15, 20, 45, 0.3)", font=dict(color="#00FFFF"))
             st.plotly_chart(fig_vol, use_container_width=True)
 
@@ -660,13 +791,15 @@ else:
             # Risk-Return Scatter
             # -----------------------
             st.markdown('<p class="milestone-subheader">⚖️ Risk–Return Scatter</p>', unsafe_allow_html=True)
-            grp = filtered.groupby("Crypto").agg(
-                Average_Return=("Returns", lambda x: x.mean() * TRADING_DAYS * 100),
-                Average_Volatility=("Volatility", "mean"),
-                Avg_Sharpe=("Sharpe_Ratio", "mean")
-            ).reset_index()
-
-            fig_scatter = px.scatter(grp, x="Average_Volatility", y="Average_Return", color="Crypto", size_max=40, hover_data=["Avg_Sharpe"], title="Risk vs Return")
+            grp = pd.DataFrame({
+                "Crypto": shown,
+                "Average_Return": range_index.mean("Returns", lo, hi) * ppy * 100,
+                "Average_Volatility": range_index.mean("Volatility", lo, hi),
+                "Avg_Sharpe": range_index.mean("Sharpe_Ratio", lo, hi)
+            })
+
+            with stage("charts.figure"):
+                fig_scatter = px.scatter(grp, x="Average_Volatility", y="Average_Return", color="Crypto", size_max=40, hover_data=["Avg_Sharpe"], title="Risk vs Return")
             fig_scatter.update_layout(plot_bgcolor="rgba(15, 20, 45, 0.5)", paper_bgcolor="rgba(15, 20, 45, 0.3)", font=dict(color="#00FFFF"))
             fig_scatter.update_xaxes(title_text="Volatility (%)")
             fig_scatter.update_yaxes(title_text="Annualized Return (%)")
@@ -676,11 +809,13 @@ else:
             # KPIs
             # -----------------------
             st.markdown('<p class="milestone-subheader">📊 KPIs</p>', unsafe_allow_html=True)
-            kpi_grp = filtered.groupby("Crypto").agg(
-                Volatility=("Volatility", "mean"),
-                Return=("Returns", lambda x: x.mean() * TRADING_DAYS * 100),
-                Sharpe=("Sharpe_Ratio", "mean")
-            ).round(2).reset_index()
+            kpi_grp = pd.DataFrame({
+                "Crypto": shown,
+                "Volatility": range_index.mean("Volatility", lo, hi),
+                "Realized_Volatility": range_index.std("Returns", lo, hi) * np.sqrt(ppy),
+                "Return": range_index.mean("Returns", lo, hi) * ppy * 100,
+                "Sharpe": range_index.mean("Sharpe_Ratio", lo, hi)
+            }).round(2)
 
             st.dataframe(kpi_grp, use_container_width=True)
 
@@ -704,30 +839,50 @@ else:
         cA, cB = st.columns([1, 1])
 
         with cA:
-            st.info(f"📅 Using last **{st.session_state.selected_days} days** of data")
+            st.info(
+                f"📅 Using last **{st.session_state.selected_days} days** of "
+                f"**{st.session_state.selected_interval}** bars"
+            )
 
         with cB:
             if st.button("🔄 Refresh Metrics", use_container_width=True):
-                fetch_binance_data.clear()
+                with st.spinner("⏳ Refreshing market data..."):
+                    request_refresh(
+                        st.session_state.selected_days,
+                        st.session_state.selected_interval,
+                        session_symbols()
+                    ).wait(timeout=INGEST_WAIT_TIMEOUT)
                 st.rerun()
 
-        file_path = "data/binance_crypto_prices.csv"
+        interval = st.session_state.selected_interval
+        ppy = periods_per_year(interval)
+        ctx = analytics_context(st.session_state.selected_days, session_symbols(), interval)
+        price_df = analytics.get("prices", ctx)
 
-        if not os.path.exists(file_path):
+        if price_df.empty:
             st.error("⚠️ Run Milestone-1 first to acquire data.")
             st.stop()
 
-        price_df = pd.read_csv(file_path)
-        price_df["date"] = pd.to_datetime(price_df["date"])
-
         if not validate_price_data(price_df):
             st.error("❌ Invalid dataset")
             st.stop()
 
+        symbols = sorted(price_df["crypto"].unique())
+        benchmark = st.selectbox(
+            "📌 Beta Benchmark",
+            symbols,
+            index=symbols.index("BTCUSDT") if "BTCUSDT" in symbols else 0
+        )
+        beta_col = beta_label(benchmark)
+        # Only the stages that take the benchmark are recomputed when it changes
+        ctx["benchmark"] = benchmark
+
+        record_frame("prices", price_df)
         with st.spinner("⏳ Computing metrics..."):
-            returns_df = compute_log_returns(price_df)
-            returns_df = add_rolling_features(returns_df)
-            metrics_df = build_metrics_table(returns_df)
+            returns_df = analytics.get("rolling", ctx)
+            params = analytics.get("garch", ctx)
+            metrics_df = analytics.get("metrics", ctx)
+            record_frame("returns", returns_df)
 
         st.success("✅ Metrics computed successfully!")
 
@@ -741,14 +896,15 @@ else:
             '<p class="milestone-subheader">📉 Volatility Comparison</p>',
             unsafe_allow_html=True
         )
-        fig_bar = px.bar(
-            metrics_df,
-            x="Crypto",
-            y="Volatility (%)",
-            color="Volatility (%)",
-            color_continuous_scale="Viridis",
-            title="Volatility Across Cryptocurrencies"
-        )
+        with stage("charts.figure"):
+            fig_bar = px.bar(
+                metrics_df,
+                x="Crypto",
+                y="Volatility (%)",
+                color="Volatility (%)",
+                color_continuous_scale="Viridis",
+                title="Volatility Across Cryptocurrencies"
+            )
         fig_bar.update_layout(
             plot_bgcolor="rgba(15, 20, 45, 0.5)",
             paper_bgcolor="rgba(15, 20, 45, 0.3)",
@@ -757,7 +913,7 @@ else:
         st.plotly_chart(fig_bar, use_container_width=True)
 
         st.markdown(
-            '<p class="milestone-subheader">📈 Rolling Volatility (30-Day)</p>',
+            f'<p class="milestone-subheader">📈 Rolling Volatility (30-{bar_label(interval)})</p>',
             unsafe_allow_html=True
         )
 
@@ -767,12 +923,13 @@ else:
         )
 
         temp = returns_df[returns_df["crypto"] == selected_crypto]
+        window = zoom_window(temp["date"], "rolling_zoom")
 
-        fig_roll = px.line(
-            temp, 
+        fig_roll = line_figure(
+            in_window(temp, "date", window),
             x="date", 
             y="rolling_vol_30",
-            title=f"30-Day Rolling Volatility - {selected_crypto}",
+            title=f"30-{bar_label(interval)} Rolling Volatility - {selected_crypto}",
             labels={"rolling_vol_30": "Volatility (%)", "date": "Date"}
         )
         fig_roll.update_layout(
@@ -782,6 +939,208 @@ else:
         )
         st.plotly_chart(fig_roll, use_container_width=True)
 
+        st.markdown(
+            '<p class="milestone-subheader">🔮 EWMA & GARCH(1,1) Volatility Forecast</p>',
+            unsafe_allow_html=True
+        )
+        with stage("metrics.garch_series"):
+            fitted = garch_conditional_volatility(temp, params, ppy)
+            forecast = garch_forecast(params.loc[[selected_crypto]], horizon=30, ppy=ppy)
+        forecast["date"] = temp["date"].max() + pd.to_timedelta(
+            forecast["step"] * INTERVAL_MS[interval], unit="ms"
+        )
+        model_vol = pd.concat([
+            in_window(temp, "date", window)[["date", "ewma_vol"]]
+                .rename(columns={"ewma_vol": "vol"}).assign(model="EWMA"),
+            in_window(fitted, "date", window)[["date", "garch_vol"]]
+                .rename(columns={"garch_vol": "vol"}).assign(model="GARCH"),
+            forecast[["date", "garch_vol"]]
+                .rename(columns={"garch_vol": "vol"}).assign(model="GARCH forecast")
+        ], ignore_index=True)
+        fig_model = line_figure(
+            model_vol,
+            x="date",
+            y="vol",
+            color="model",
+            title=f"Conditional Volatility & 30-{bar_label(interval)} Forecast - {selected_crypto}",
+            labels={"vol": "Volatility (%)", "date": "Date", "model": "Model"}
+        )
+        fig_model.update_layout(
+            plot_bgcolor="rgba(15, 20, 45, 0.5)",
+            paper_bgcolor="rgba(15, 20, 45, 0.3)",
+            font=dict(color="#00FFFF")
+        )
+        st.plotly_chart(fig_model, use_container_width=True)
+
+        st.markdown(
+            f'<p class="milestone-subheader">📐 Rolling Beta (30-{bar_label(interval)}) vs {benchmark}</p>',
+            unsafe_allow_html=True
+        )
+        betas = analytics.get("beta", ctx)
+        if selected_crypto in betas.columns:
+            fig_beta = line_figure(
+                in_window(betas[selected_crypto].rename("beta").reset_index(), "date", window),
+                x="date",
+                y="beta",
+                title=f"30-{bar_label(interval)} Rolling Beta - {selected_crypto}",
+                labels={"beta": "Beta", "date": "Date"}
+            )
+            fig_beta.update_layout(
+                plot_bgcolor="rgba(15, 20, 45, 0.5)",
+                paper_bgcolor="rgba(15, 20, 45, 0.3)",
+                font=dict(color="#00FFFF")
+            )
+            st.plotly_chart(fig_beta, use_container_width=True)
+
+        st.markdown(
+            '<p class="milestone-subheader">🧩 Correlation Heatmap & Regime</p>',
+            unsafe_allow_html=True
+        )
+        n_bars = returns_df["date"].nunique()
+        windows = [w for w in CORR_WINDOWS if w < n_bars] or [max(n_bars - 1, 2)]
+        ctx["corr_window"] = st.select_slider(
+            f"Correlation window ({bar_label(interval)}s)", options=windows, value=windows[0]
+        )
+        regime = analytics.get("correlation", ctx)
+        valid = regime[regime["Symbols"] >= 2]
+        if valid.empty:
+            st.info("ℹ️ Not enough history for a full correlation window.")
+        else:
+            first, last = valid.index.min(), valid.index.max()
+            as_of = last
+            if first < last:
+                as_of = pd.Timestamp(st.slider(
+                    "📅 Heatmap as of",
+                    min_value=first.to_pydatetime(),
+                    max_value=last.to_pydatetime(),
+                    value=last.to_pydatetime(),
+                    step=pd.Timedelta(milliseconds=INTERVAL_MS[interval]).to_pytimedelta(),
+                    format="YYYY-MM-DD HH:mm"
+                ))
+            with stage("correlation.heatmap"):
+                corr = rolling_correlation(returns_df, ctx["corr_window"], as_of)
+                corr = corr.dropna(how="all").dropna(axis=1, how="all")
+                fig_corr = px.imshow(
+                    corr,
+                    zmin=-1,
+                    zmax=1,
+                    color_continuous_scale="RdBu_r",
+                    title=f"{ctx['corr_window']}-{bar_label(interval)} Correlation as of {as_of:%Y-%m-%d %H:%M}",
+                    labels={"color": "Correlation"}
+                )
+            fig_corr.update_layout(
+                plot_bgcolor="rgba(15, 20, 45, 0.5)",
+                paper_bgcolor="rgba(15, 20, 45, 0.3)",
+                font=dict(color="#00FFFF")
+            )
+            st.plotly_chart(fig_corr, use_container_width=True)
+
+            fig_regime = line_figure(
+                in_window(valid.reset_index(), "date", window),
+                x="date",
+                y="Mean Correlation",
+                title=f"Correlation Regime - now {valid['Regime'].iloc[-1]}",
+                labels={"date": "Date"}
+            )
+            fig_regime.update_layout(
+                plot_bgcolor="rgba(15, 20, 45, 0.5)",
+                paper_bgcolor="rgba(15, 20, 45, 0.3)",
+                font=dict(color="#00FFFF")
+            )
+            st.plotly_chart(fig_regime, use_container_width=True)
+
+        st.markdown(
+            '<p class="milestone-subheader">🛡️ Tail Risk (VaR / CVaR)</p>',
+            unsafe_allow_html=True
+        )
+        r1, r2, r3 = st.columns(3)
+        with r1:
+            confidence = st.selectbox(
+                "Confidence", [0.90, 0.95, 0.99], index=1, format_func=lambda c: f"{c:.0%}"
+            )
+        with r2:
+            horizon = st.number_input(f"Horizon ({bar_label(interval)}s)", 1, 30, 1)
+        with r3:
+            path_options = sorted({10_000, 100_000, 1_000_000, MC_PATHS})
+            n_paths = st.selectbox(
+                "Monte Carlo paths", path_options,
+                index=path_options.index(MC_PATHS), format_func="{:,}".format
+            )
+        # The portfolio row is the default equal-weight basket of every
+        # loaded symbol; results are memoized per returns version and inputs
+        ctx.update(risk_confidence=(confidence,), risk_horizon=int(horizon), risk_paths=n_paths)
+        with st.spinner("⏳ Simulating..."):
+            risk_df = analytics.get("risk", ctx)
+        st.dataframe(risk_df, use_container_width=True)
+        st.caption(
+            "Loss (%) over the horizon: VaR is exceeded with probability "
+            f"{1 - confidence:.0%}, CVaR is the average loss beyond it. "
+            "Portfolio = equal weights across the loaded symbols."
+        )
+
+        st.markdown(
+            '<p class="milestone-subheader">💼 Portfolio Optimizer</p>',
+            unsafe_allow_html=True
+        )
+        mean, cov = analytics.get("moments", ctx)
+        p1, p2 = st.columns([1, 2])
+        with p1:
+            weights_df = st.data_editor(
+                pd.DataFrame({"Crypto": symbols, "Weight": 1 / len(symbols)}),
+                disabled=["Crypto"],
+                hide_index=True,
+                use_container_width=True,
+                key="portfolio_weights"
+            )
+            long_only = st.toggle("Long only", value=True)
+        weights = weights_df.set_index("Crypto")["Weight"]
+
+        # Optimizer results only change with new candles or the long-only
+        # switch; editing the weights reuses them
+        ctx["long_only"] = long_only
+        with st.spinner("⏳ Optimizing..."):
+            optimal = analytics.get("optimal", ctx)
+            frontier = analytics.get("frontier", ctx)
+            candidates = analytics.get("candidates", ctx)
+        summary = portfolio_stats(
+            pd.concat([weights.rename("Your Portfolio"), optimal], axis=1).T, mean, cov, ppy
+        ).round(2)
+
+        with p2:
+            st.dataframe(summary, use_container_width=True)
+            contributions = risk_contributions(weights, mean, cov, ppy).round(2)
+            st.dataframe(contributions, use_container_width=True)
+
+        fig_frontier = px.scatter(
+            candidates,
+            x="Volatility (%)",
+            y="Return (%)",
+            color="Sharpe Ratio",
+            color_continuous_scale="Viridis",
+            opacity=0.4,
+            render_mode="webgl",
+            title="Efficient Frontier vs Random Long-Only Portfolios"
+        )
+        fig_frontier.add_scatter(
+            x=frontier["Volatility (%)"], y=frontier["Return (%)"],
+            mode="lines", name="Efficient frontier", line=dict(color="#00FFFF", width=3)
+        )
+        fig_frontier.add_scatter(
+            x=summary["Volatility (%)"], y=summary["Return (%)"], text=summary.index,
+            mode="markers+text", textposition="top center", name="Portfolios",
+            marker=dict(size=12, color="#FFD700", symbol="star")
+        )
+        fig_frontier.update_layout(
+            plot_bgcolor="rgba(15, 20, 45, 0.5)",
+            paper_bgcolor="rgba(15, 20, 45, 0.3)",
+            font=dict(color="#00FFFF")
+        )
+        st.plotly_chart(fig_frontier, use_container_width=True)
+        st.dataframe(
+            (optimal[(optimal.abs() > 1e-4).any(axis=1)] * 100).round(2).add_suffix(" (%)"),
+            use_container_width=True
+        )
+
         st.divider()
 
         # Key Insights
@@ -793,10 +1152,10 @@ else:
         ]
         
         lowest_beta = metrics_df.loc[
-            metrics_df["Beta vs BTC"].idxmin(), "Crypto"
+            metrics_df[beta_col].idxmin(), "Crypto"
         ]
         highest_beta = metrics_df.loc[
-            metrics_df["Beta vs BTC"].idxmax(), "Crypto"
+            metrics_df[beta_col].idxmax(), "Crypto"
         ]
 
         col1, col2, col3, col4 = st.columns(4)
@@ -830,3 +1189,13 @@ else:
         if st.button("⬅️ Back to Dashboard", use_container_width=True):
             st.session_state.active_page = "dashboard"
             st.rerun()
+
+    if alert_service is not None:
+        render_alert_panel(alert_service)
+
+    # =================================================
+    # PERFORMANCE PANEL
+    # =================================================
+    perf_run = st.session_state.pop("perf_run").finish()
+    if perf_panel_enabled():
+        render_perf_panel(perf_run)
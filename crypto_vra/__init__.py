@@ -0,0 +1,74 @@
+import importlib
+
+# Headless core of the Crypto Volatility & Risk Analyzer. Nothing here
+# imports Streamlit, and submodules are only loaded when one of their names
+# is first used, so `import crypto_vra` stays cheap for batch jobs:
+#
+#   from crypto_vra import fetch_binance_data, build_metrics_table
+#   python -m crypto_vra --days 30 --output report.csv
+
+_EXPORTS = {
+    "intervals": [
+        "INTERVAL_MS", "TRADING_DAYS", "periods_per_year", "ingest_interval",
+        "lookback_options", "bar_label"
+    ],
+    "exchange": [
+        "crypto_symbols", "QUOTE_ASSETS", "get_http_session", "api_get", "discover_symbols"
+    ],
+    "store": ["DATA_DIR", "read_partitions", "write_partitions", "write_dataset"],
+    "candles": ["read_candles", "sync_symbol", "load_price_panel", "resample_ohlcv"],
+    "ingest": [
+        "ingest_symbols", "IngestionService", "get_ingestion_service", "request_refresh",
+        "wait_for_ingest", "fetch_binance_data"
+    ],
+    "engine": [
+        "PanelMatrix", "covariance_frame", "correlation_frame", "beta_from_covariance",
+        "rolling_beta"
+    ],
+    "metrics": [
+        "calculate_volatility_simple", "risk_level", "validate_price_data",
+        "compute_log_returns", "compute_volatility", "compute_sharpe", "compute_beta",
+        "add_rolling_features", "beta_label", "build_metrics_table"
+    ],
+    "volatility": [
+        "add_ewma_volatility", "compute_ewma_volatility", "fit_garch", "fit_garch_warm",
+        "garch_volatility", "garch_forecast", "garch_conditional_volatility",
+        "load_garch_params", "save_garch_params"
+    ],
+    "memory": [
+        "PANEL_FLOAT_DTYPE", "compact_panel", "frame_bytes", "memory_report", "pipeline_memory"
+    ],
+    "risk": ["historical_var", "parametric_var", "monte_carlo_var", "risk_table"],
+    "correlation": [
+        "RollingCorrelation", "rolling_correlation", "correlation_regime", "correlation_regime_label"
+    ],
+    "portfolio": [
+        "CovarianceState", "cached_covariance", "portfolio_stats", "risk_contributions",
+        "min_variance_weights", "max_sharpe_weights", "efficient_frontier", "random_portfolios"
+    ],
+    "alerts": [
+        "AlertRules", "AlertEngine", "AlertService", "LogSink", "WebhookSink", "alert_metrics",
+        "load_alert_config", "start_alert_service"
+    ],
+    "rolling": ["RollingWindowStats", "SymbolRollingTracker", "RollingBook"],
+    "live": ["LiveKlineStream", "acquire_live_stream"],
+    "derived": ["raw_data_version", "derived_key", "cached_derived", "derived_invalidate"],
+    "charts": ["lttb_indices", "downsample", "line_figure"],
+    "processed": ["build_processed", "RangeIndex"],
+    "dag": ["AnalyticsGraph", "analytics", "analytics_context"],
+    "profiling": ["stage", "count", "record_frame", "RunRecorder", "registry", "start_metrics_server"],
+}
+_MODULES = {name: module for module, names in _EXPORTS.items() for name in names}
+
+__all__ = sorted(_MODULES)
+
+def __getattr__(name):
+    module = _MODULES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
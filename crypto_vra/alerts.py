@@ -0,0 +1,373 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+import requests
+
+from .dag import analytics, analytics_context
+from .engine import PanelMatrix, matrix_rolling_mean, matrix_rolling_std, matrix_sharpe
+from .exchange import crypto_symbols, discover_symbols
+from .ingest import INGEST_WAIT_TIMEOUT, get_ingestion_service
+from .intervals import ingest_interval
+from .profiling import count, stage
+from .store import DATA_DIR, write_json_atomic
+
+# =====================================================
+# ALERT RULES
+# =====================================================
+# Threshold rules over the latest bar of every symbol, declared in a JSON
+# file (CVRA_ALERT_RULES):
+#
+#   {"interval": "1h", "days": 30, "symbols": "all", "quote": "USDT",
+#    "benchmark": "BTCUSDT",
+#    "rules": [
+#      {"name": "vol-50", "metric": "rolling_vol_30", "op": ">", "threshold": 50},
+#      {"name": "sharpe-neg", "metric": "sharpe_30", "op": "<", "threshold": 0},
+#      {"name": "beta-spike", "metric": "beta_30", "op": ">", "threshold": 2},
+#      {"name": "off-ma", "metric": "ma_deviation", "op": "abs>", "threshold": 10,
+#       "symbols": ["BTCUSDT", "ETHUSDT"]}
+#    ]}
+#
+# All rules are compiled into arrays and evaluated against the whole
+# [rule x symbol] grid at once. Alerts are edge-triggered: a (rule, symbol)
+# fires when its condition becomes true and is re-armed only once it is
+# false again; missing values leave the state unchanged. The state is
+# persisted, so a restart does not repeat alerts that are still active.
+ALERTS_DIR = os.path.join(DATA_DIR, "alerts")
+ALERT_RULES_PATH = os.environ.get("CVRA_ALERT_RULES", os.path.join(ALERTS_DIR, "rules.json"))
+ALERT_LOG_PATH = os.environ.get("CVRA_ALERT_LOG", os.path.join(ALERTS_DIR, "alerts.log"))
+ALERT_STATE_PATH = os.path.join(ALERTS_DIR, "state.json")
+ALERT_WEBHOOK_URL = os.environ.get("CVRA_ALERT_WEBHOOK")
+ALERT_POLL_SECONDS = int(os.environ.get("CVRA_ALERT_POLL", "60"))
+ALERT_SERVICE_ENABLED = os.environ.get("CVRA_ALERT_SERVICE", "1") != "0"
+ALERT_HISTORY = 500
+ALERT_DEFAULTS = {"interval": "1h", "days": 30, "symbols": None, "quote": "USDT", "benchmark": "BTCUSDT"}
+ALERT_METRICS = [
+    "price", "return", "ma_30", "ma_deviation", "rolling_vol_30", "ewma_vol", "sharpe_30", "beta_30"
+]
+ALERT_OPS = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+    "abs>": lambda v, t: np.abs(v) > t,
+}
+
+def load_alert_config(path=ALERT_RULES_PATH):
+    with open(path) as f:
+        config = json.load(f)
+    return {**ALERT_DEFAULTS, **config}
+
+class AlertRules:
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        names = [rule.get("name") for rule in self.rules]
+        for i, rule in enumerate(self.rules):
+            if not names[i]:
+                raise ValueError(f"alert rule {i} has no name")
+            if rule.get("metric") not in ALERT_METRICS:
+                raise ValueError(f"alert rule {names[i]!r}: unknown metric {rule.get('metric')!r}")
+            if rule.get("op") not in ALERT_OPS:
+                raise ValueError(f"alert rule {names[i]!r}: unknown op {rule.get('op')!r}")
+        if len(set(names)) != len(names):
+            raise ValueError("alert rule names must be unique")
+        self.names = np.array(names, dtype=object)
+        self.metric = np.array([ALERT_METRICS.index(r["metric"]) for r in self.rules], dtype=np.int64)
+        self.op = np.array([list(ALERT_OPS).index(r["op"]) for r in self.rules], dtype=np.int64)
+        self.threshold = np.array([float(r["threshold"]) for r in self.rules])
+
+    def symbols(self):
+        # Symbols named by any rule (rules without a list apply to all)
+        named = set()
+        for rule in self.rules:
+            named.update(rule.get("symbols") or ())
+        return sorted(named)
+
+    def scope(self, symbols):
+        # [rule x symbol] mask of where each rule applies
+        mask = np.ones((len(self.rules), len(symbols)), dtype=bool)
+        index = pd.Index(symbols)
+        for i, rule in enumerate(self.rules):
+            if rule.get("symbols"):
+                mask[i] = index.isin(rule["symbols"])
+        return mask
+
+    def evaluate(self, metrics):
+        # metrics: [symbol x metric] frame with ALERT_METRICS columns.
+        # Returns the condition grid and where it could be evaluated.
+        values = metrics[ALERT_METRICS].to_numpy(dtype=float).T[self.metric]
+        cond = np.zeros(values.shape, dtype=bool)
+        with np.errstate(invalid="ignore"):
+            for code, fn in enumerate(ALERT_OPS.values()):
+                rows = self.op == code
+                if rows.any():
+                    cond[rows] = fn(values[rows], self.threshold[rows, None])
+        known = ~np.isnan(values) & self.scope(metrics.index)
+        return cond & known, known, values
+
+# =====================================================
+# LATEST-BAR METRICS
+# =====================================================
+def alert_metrics(rolling_df, betas, window=30, ppy=365):
+    # One row per symbol at its latest bar. Symbols whose latest bar is
+    # older than the newest one in the panel get NaN, so stale data never
+    # alerts.
+    panel = PanelMatrix(rolling_df)
+    counts = np.bincount(panel.codes, minlength=len(panel.symbols))
+    # Rows are grouped by symbol and sorted by date: each symbol's last row
+    latest = panel.frame.iloc[np.cumsum(counts) - 1]
+    times = latest["date"].to_numpy()
+    bar_time = times.max()
+    cols = np.arange(len(panel.symbols))
+
+    # Rolling Sharpe over each symbol's last `window` returns
+    rows = counts[None, :] - window + np.arange(window)[:, None]
+    tail = panel.matrix("log_return")[np.maximum(rows, 0), cols]
+    tail[rows < 0] = np.nan
+    mean = matrix_rolling_mean(tail, window)[-1]
+    std = matrix_rolling_std(tail, window)[-1]
+
+    beta = np.full(len(cols), np.nan)
+    if len(betas):
+        at = betas.index.get_indexer(times)
+        wide = betas.reindex(columns=panel.symbols).to_numpy(dtype=float)
+        beta = np.where(at >= 0, wide[at, cols], np.nan)
+
+    def col(name):
+        return latest[name].to_numpy(dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        metrics = pd.DataFrame({
+            "price": col("price"),
+            "return": np.expm1(col("log_return")) * 100,
+            "ma_30": col("ma_30"),
+            "ma_deviation": (col("price") / col("ma_30") - 1) * 100,
+            "rolling_vol_30": col("rolling_vol_30"),
+            "ewma_vol": col("ewma_vol"),
+            "sharpe_30": matrix_sharpe(mean, std, ppy),
+            "beta_30": beta
+        }, index=panel.symbols)
+    metrics[times < bar_time] = np.nan
+    return metrics, bar_time
+
+# =====================================================
+# NOTIFICATION SINKS
+# =====================================================
+class LogSink:
+
+    def __init__(self, path=ALERT_LOG_PATH):
+        self.path = path
+
+    def emit(self, alerts):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as f:
+            f.write("".join(json.dumps(alert) + "\n" for alert in alerts))
+
+class WebhookSink:
+    # POSTs each batch as {"alerts": [...]}; tools/webhook_standin_server.py
+    # is a local receiver for trying it out
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def emit(self, alerts):
+        response = self.session.post(self.url, json={"alerts": alerts}, timeout=self.timeout)
+        response.raise_for_status()
+
+def default_sinks():
+    sinks = [LogSink()]
+    if ALERT_WEBHOOK_URL:
+        sinks.append(WebhookSink(ALERT_WEBHOOK_URL))
+    return sinks
+
+# =====================================================
+# ALERT ENGINE
+# =====================================================
+class AlertEngine:
+
+    def __init__(self, rules, sinks=None, state_path=None):
+        self.rules = rules if isinstance(rules, AlertRules) else AlertRules(rules)
+        self.sinks = default_sinks() if sinks is None else sinks
+        self.state_path = state_path
+        # [rule x symbol] grid of conditions that are currently true
+        self.active = pd.DataFrame(dtype=bool)
+        if state_path and os.path.exists(state_path):
+            try:
+                with open(state_path) as f:
+                    pairs = [tuple(pair) for pair in json.load(f)["active"]]
+                if pairs:
+                    self.active = pd.Series(True, index=pd.MultiIndex.from_tuples(pairs)).unstack(fill_value=False)
+            except Exception:
+                pass
+
+    def _save_state(self):
+        rules, symbols = np.nonzero(self.active.to_numpy())
+        names = np.asarray(self.active.index, dtype=object)
+        pairs = np.column_stack([names[rules], np.asarray(self.active.columns, dtype=object)[symbols]]).tolist()
+        write_json_atomic(self.state_path, {"active": pairs, "saved_at": time.time()})
+
+    def evaluate(self, metrics, bar_time, interval=None):
+        # Evaluates every rule on every symbol, notifies the sinks of the
+        # rising edges and returns them as a list of alert dicts. Rules and
+        # symbols that are no longer evaluated drop out of the state.
+        names = self.rules.names
+        with stage("alerts.evaluate"):
+            cond, known, values = self.rules.evaluate(metrics)
+            was = self.active.reindex(index=names, columns=metrics.index, fill_value=False)
+            was = was.to_numpy(dtype=bool)
+            now = np.where(known, cond, was)
+            fired = np.argwhere(now & ~was)
+            changed = (now != was).any() or self.active.shape != now.shape
+            self.active = pd.DataFrame(now, index=names, columns=metrics.index)
+
+        bar = pd.Timestamp(bar_time).isoformat()
+        stamp = pd.Timestamp.now(tz="UTC").isoformat()
+        symbols = np.asarray(metrics.index, dtype=object)
+        r, s = fired.T
+        alerts = [
+            {
+                "time": stamp,
+                "bar": bar,
+                "interval": interval,
+                "rule": name,
+                "symbol": symbol,
+                "metric": self.rules.rules[i]["metric"],
+                "op": self.rules.rules[i]["op"],
+                "threshold": float(self.rules.threshold[i]),
+                "value": value
+            }
+            for i, name, symbol, value in zip(r.tolist(), names[r], symbols[s], values[r, s].tolist())
+        ]
+        if changed and self.state_path:
+            self._save_state()
+        count("alerts.fired", len(alerts))
+        if alerts:
+            self.notify(alerts)
+        return alerts
+
+    def notify(self, alerts):
+        for sink in self.sinks:
+            try:
+                sink.emit(alerts)
+            except Exception:
+                count(f"alerts.sink.{type(sink).__name__}.error")
+
+# =====================================================
+# BACKGROUND SERVICE
+# =====================================================
+# Re-reads the rules file when it changes, syncs the configured universe
+# through the shared ingestion service and evaluates the rules whenever
+# the stored candles changed since the last pass, in its own thread of the
+# process that started it. The dashboard starts one on its first script
+# run, so it only evaluates once some session has opened a page (again
+# after every server restart). To evaluate alerts independently of any
+# browser session, run the headless watcher as its own long-lived process:
+#
+#   python -m crypto_vra --alerts data/alerts/rules.json --watch
+#
+# and set CVRA_ALERT_SERVICE=0 for the dashboard, so the two processes do
+# not both notify the sinks.
+class AlertService:
+
+    def __init__(self, path=ALERT_RULES_PATH, poll=ALERT_POLL_SECONDS, sinks=None, start=True):
+        self.path = path
+        self.poll = poll
+        self.sinks = sinks
+        self.lock = threading.Lock()
+        self.recent = deque(maxlen=ALERT_HISTORY)
+        self.engine = None
+        self.config = None
+        self.config_mtime = None
+        self.universe = (None, [], 0.0)
+        self.last_version = None
+        self.last_run = None
+        self.error = None
+        self.stopped = threading.Event()
+        self.thread = None
+        if start:
+            self.thread = threading.Thread(target=self.run_forever, name="alert-worker", daemon=True)
+            self.thread.start()
+
+    def _reload(self):
+        mtime = os.stat(self.path).st_mtime_ns
+        if mtime != self.config_mtime:
+            config = load_alert_config(self.path)
+            self.engine = AlertEngine(config["rules"], self.sinks, ALERT_STATE_PATH)
+            self.config, self.config_mtime = config, mtime
+            self.last_version = None
+
+    def _symbols(self):
+        config = self.config
+        if config["symbols"] == "all":
+            quote, symbols, fetched = self.universe
+            if quote != config["quote"] or time.time() - fetched > 3600:
+                symbols = discover_symbols(config["quote"]) or list(crypto_symbols)
+                self.universe = (config["quote"], symbols, time.time())
+            return symbols
+        if config["symbols"]:
+            return list(config["symbols"])
+        return sorted(set(crypto_symbols) | set(self.engine.rules.symbols()))
+
+    def tick(self):
+        # One pass; returns the alerts it fired
+        self._reload()
+        config = self.config
+        symbols = self._symbols()
+        days, interval = config["days"], config["interval"]
+        # A slow sync does not stall the loop: unchanged candles are skipped
+        # below and the rest is evaluated on the next pass
+        get_ingestion_service().submit(symbols, days, ingest_interval(interval)).wait(
+            timeout=INGEST_WAIT_TIMEOUT
+        )
+        ctx = analytics_context(days, symbols, interval, config["benchmark"])
+        if ctx["raw_version"] == self.last_version:
+            count("alerts.unchanged")
+            return []
+        rolling_df = analytics.get("rolling", ctx)
+        if rolling_df.empty:
+            return []
+        metrics, bar_time = alert_metrics(rolling_df, analytics.get("beta", ctx), ctx["window"], ctx["ppy"])
+        alerts = self.engine.evaluate(metrics, bar_time, interval)
+        self.last_version = ctx["raw_version"]
+        with self.lock:
+            self.recent.extend(alerts)
+        return alerts
+
+    def run_forever(self):
+        while not self.stopped.is_set():
+            try:
+                self.tick()
+                self.error = None
+            except Exception as exc:
+                self.error = exc
+                count("alerts.error")
+            self.last_run = time.time()
+            self.stopped.wait(self.poll)
+
+    def stop(self):
+        self.stopped.set()
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.recent)
+
+_alert_service = None
+_alert_service_lock = threading.Lock()
+
+def start_alert_service(path=ALERT_RULES_PATH):
+    # Idempotent; one alert worker per process, only when a rules file exists
+    # and CVRA_ALERT_SERVICE is not 0
+    global _alert_service
+    if not ALERT_SERVICE_ENABLED or not os.path.exists(path):
+        return None
+    with _alert_service_lock:
+        if _alert_service is None:
+            _alert_service = AlertService(path)
+    return _alert_service
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+
+from .store import write_atomic, write_json_atomic
+
+# =====================================================
+# STATIC ASSETS
+# =====================================================
+# Images are fingerprinted by content and re-encoded once into smaller
+# variants that the web server can hand out as static files, so pages
+# reference them by URL instead of inlining megabytes of base64 on every
+# rerun. The content hash is part of every file name: a changed source
+# gets new URLs, and unchanged ones stay cacheable by the browser.
+ASSET_WIDTHS = (768, 1280, 1920)
+# (Pillow format, file extension, MIME type, quality), best compression first
+ASSET_FORMATS = (
+    ("AVIF", "avif", "image/avif", 50),
+    ("WEBP", "webp", "image/webp", 70),
+    ("JPEG", "jpg", "image/jpeg", 80),
+)
+
+def file_digest(path, length=12):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:length]
+
+def build_image_variants(src, out_dir, widths=ASSET_WIDTHS, formats=ASSET_FORMATS):
+    # Returns the variant manifest, building it only if this version of
+    # `src` has not been encoded yet. Widths are capped at the source width.
+    digest = file_digest(src)
+    stem = os.path.splitext(os.path.basename(src))[0]
+    manifest_path = os.path.join(out_dir, f"{stem}.{digest}.json")
+    if os.path.exists(manifest_path):
+        try:
+            with open(manifest_path) as f:
+                return json.load(f)
+        except ValueError:
+            pass
+
+    from PIL import Image, features
+
+    os.makedirs(out_dir, exist_ok=True)
+    variants = []
+    with Image.open(src) as image:
+        image = image.convert("RGB")
+        for width in sorted({min(w, image.width) for w in widths}):
+            height = round(image.height * width / image.width)
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            for fmt, ext, mime, quality in formats:
+                if fmt != "JPEG" and not features.check(fmt.lower()):
+                    continue
+                name = f"{stem}.{digest}.{width}.{ext}"
+                path = os.path.join(out_dir, name)
+                write_atomic(path, lambda tmp: resized.save(
+                    tmp, format=fmt, quality=quality, optimize=fmt == "JPEG",
+                    progressive=fmt == "JPEG"
+                ))
+                variants.append({
+                    "file": name, "width": width, "height": height,
+                    "mime": mime, "bytes": os.path.getsize(path)
+                })
+
+    manifest = {"source": os.path.basename(src), "digest": digest, "variants": variants}
+    write_json_atomic(manifest_path, manifest)
+
+    # Variants of older versions of the same source are no longer referenced
+    for name in os.listdir(out_dir):
+        if name.startswith(f"{stem}.") and f".{digest}." not in name:
+            os.remove(os.path.join(out_dir, name))
+    return manifest
+
+def background_css(manifest, url_prefix, selector=".stApp"):
+    # One image-set() per width, switched by media queries so small screens
+    # only download the small variant. The plain url() line is the fallback
+    # for browsers without image-set() type() support.
+    by_width = {}
+    for v in manifest["variants"]:
+        by_width.setdefault(v["width"], []).append(v)
+
+    def rules(variants):
+        fallback = next(v for v in variants if v["mime"] == "image/jpeg")
+        options = ", ".join(
+            f'url("{url_prefix}/{v["file"]}") type("{v["mime"]}")' for v in variants
+        )
+        return (f'background-image: url("{url_prefix}/{fallback["file"]}"); '
+                f"background-image: image-set({options});")
+
+    widths = sorted(by_width, reverse=True)
+    css = [f"{selector} {{ {rules(by_width[widths[0]])} }}"]
+    for width in widths[1:]:
+        css.append(f"@media (max-width: {width}px) {{ {selector} {{ {rules(by_width[width])} }} }}")
+    return "\n".join(css)
@@ -0,0 +1,223 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .exchange import api_get, kline_weight
+from .intervals import DAY_MS, INTERVAL_MS, ingest_interval
+from .memory import PANEL_FLOAT_DTYPE
+from .profiling import stage
+from .store import (
+    CANDLE_STORE_DIR, dataset_symbols, partition_files, read_partitions,
+    write_json_atomic, write_partitions
+)
+
+# =====================================================
+# LOCAL CANDLE STORE
+# =====================================================
+CANDLE_MANIFEST = os.path.join(CANDLE_STORE_DIR, "manifest.json")
+KLINE_PAGE_LIMIT = 1000
+KLINE_COLUMNS = ["open_time", "open", "high", "low", "close", "volume"]
+
+def load_manifest():
+    if not os.path.exists(CANDLE_MANIFEST):
+        return {}
+    try:
+        with open(CANDLE_MANIFEST) as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def save_manifest(manifest):
+    write_json_atomic(CANDLE_MANIFEST, manifest)
+
+def candle_root(interval="1d"):
+    return os.path.join(CANDLE_STORE_DIR, interval)
+
+def empty_candles():
+    return pd.DataFrame({
+        "open_time": pd.Series(dtype="int64"),
+        **{col: pd.Series(dtype="float64") for col in KLINE_COLUMNS[1:]}
+    })
+
+def read_candles(symbol, interval="1d", start=None, end=None, columns=None):
+    df = read_partitions(candle_root(interval), [symbol], start, end, columns=columns)
+    return df if not df.empty else empty_candles()
+
+def stored_bounds(symbol, interval="1d"):
+    # First/last stored open time, read from the edge partitions only.
+    files = partition_files(candle_root(interval), symbol)
+    if not files:
+        return None, None
+    first = pd.read_parquet(files[0], columns=["open_time"])["open_time"]
+    last = pd.read_parquet(files[-1], columns=["open_time"])["open_time"]
+    if first.empty or last.empty:
+        return None, None
+    return int(first.min()), int(last.max())
+
+def parse_klines(rows):
+    if not rows:
+        return empty_candles()
+    df = pd.DataFrame([row[:6] for row in rows], columns=KLINE_COLUMNS)
+    df["open_time"] = df["open_time"].astype("int64")
+    df[KLINE_COLUMNS[1:]] = df[KLINE_COLUMNS[1:]].astype(float)
+    return df
+
+def request_klines(session, symbol, interval, start_time=None, end_time=None,
+                   limit=KLINE_PAGE_LIMIT):
+    params = {"symbol": symbol, "interval": interval, "limit": limit}
+    if start_time is not None:
+        params["startTime"] = int(start_time)
+    if end_time is not None:
+        params["endTime"] = int(end_time)
+
+    return api_get(session, "/api/v3/klines", params, weight=kline_weight(limit))
+
+def fetch_klines_range(session, symbol, interval, start_time, end_time):
+    # Page forward through [start_time, end_time] in KLINE_PAGE_LIMIT chunks.
+    # Returns (candles, complete): complete is False when a page after the
+    # first failed, so candles stop short of end_time. candles is None only
+    # if the very first page could not be fetched.
+    step = INTERVAL_MS[interval]
+    pages = []
+    cursor = start_time
+    complete = True
+
+    while cursor <= end_time:
+        rows = request_klines(session, symbol, interval, cursor, end_time)
+        if rows is None:
+            if not pages:
+                return None, False
+            complete = False
+            break
+        if not rows:
+            break
+        pages.append(parse_klines(rows))
+        cursor = int(rows[-1][0]) + step
+        if len(rows) < KLINE_PAGE_LIMIT:
+            break
+
+    if not pages:
+        return empty_candles(), complete
+    return pd.concat(pages, ignore_index=True), complete
+
+def window_start_ms(days, interval="1d", now_ms=None):
+    # Open time of the oldest bar in a `days`-long window ending with the
+    # current (possibly still open) bar.
+    step = INTERVAL_MS[interval]
+    bars = max(1, days * DAY_MS // step)
+    now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+    return (now_ms // step - (bars - 1)) * step
+
+def sync_symbol(session, symbol, days, entry, interval="1d"):
+    # Bring the stored history for one symbol up to date and make sure it
+    # reaches back at least `days` bars. Only missing candles are requested:
+    # the tail is re-fetched from the last stored open time (that candle may
+    # still have been in progress), and older bars only when the requested
+    # window starts before what we already cover.
+    step = INTERVAL_MS[interval]
+    now_ms = int(time.time() * 1000)
+    window_start = window_start_ms(days, interval, now_ms)
+    root = candle_root(interval)
+    entry = dict(entry or {})
+
+    if "last_open_time" not in entry:
+        first, last = stored_bounds(symbol, interval)
+        if last is not None:
+            entry.update(covered_from=first, last_open_time=last)
+
+    if "last_open_time" not in entry:
+        # A short range only leaves a gap at the tail, which the next sync
+        # re-fetches from last_open_time
+        fetched, _ = fetch_klines_range(session, symbol, interval, window_start, now_ms)
+        if fetched is None:
+            return None
+        write_partitions(root, symbol, fetched)
+        entry["covered_from"] = window_start
+        if fetched.empty:
+            return entry
+        entry["last_open_time"] = int(fetched["open_time"].iloc[-1])
+        return entry
+
+    if window_start < entry["covered_from"]:
+        backfill, complete = fetch_klines_range(
+            session, symbol, interval, window_start, entry["covered_from"] - step
+        )
+        if backfill is not None:
+            write_partitions(root, symbol, backfill)
+        # Coverage only moves back once the whole gap up to covered_from was
+        # fetched; otherwise the next sync retries the backfill
+        if complete:
+            entry["covered_from"] = window_start
+
+    tail, _ = fetch_klines_range(session, symbol, interval, entry["last_open_time"], now_ms)
+    if tail is not None and not tail.empty:
+        write_partitions(root, symbol, tail)
+        entry["last_open_time"] = int(tail["open_time"].iloc[-1])
+
+    return entry
+
+def load_price_panel(days, symbols=None, interval="1d", float_dtype=None):
+    # Compact (date, crypto, price) panel, grouped by symbol and sorted by
+    # date within each symbol (see memory.py)
+    source = ingest_interval(interval)
+    root = candle_root(source)
+    symbols = dataset_symbols(root) if symbols is None else symbols
+    columns = ["open_time", "close"] if source == interval else KLINE_COLUMNS
+    candles = read_partitions(
+        root, symbols, start=window_start_ms(days, interval),
+        columns=columns, symbol_col="crypto"
+    )
+    if candles.empty:
+        return pd.DataFrame()
+    if source != interval:
+        with stage("candles.resample"):
+            candles = resample_ohlcv(candles, interval, symbol_col="crypto")
+    return pd.DataFrame({
+        "date": pd.to_datetime(candles["open_time"].to_numpy(), unit="ms").astype("datetime64[ns]"),
+        "crypto": candles["crypto"].array,
+        "price": candles["close"].to_numpy(dtype=float_dtype or PANEL_FLOAT_DTYPE)
+    }, copy=False)
+
+# =====================================================
+# OHLCV RESAMPLING
+# =====================================================
+def resample_ohlcv(candles, interval, symbol_col=None):
+    # Aggregate finer candles into `interval` bars aligned on the epoch (the
+    # same boundaries Binance uses). Rows are grouped by contiguous runs of
+    # (symbol, bucket), so the whole frame is reduced with one reduceat per
+    # column instead of a groupby.
+    step = INTERVAL_MS[interval]
+    if candles.empty:
+        return candles
+    if symbol_col:
+        codes, symbols = pd.factorize(candles[symbol_col], sort=True)
+    else:
+        codes, symbols = np.zeros(len(candles), dtype=np.int64), None
+    times = candles["open_time"].to_numpy(dtype="int64")
+    if not ((np.diff(codes) > 0) | ((np.diff(codes) == 0) & (np.diff(times) > 0))).all():
+        order = np.lexsort((times, codes))
+        candles, codes, times = candles.iloc[order], codes[order], times[order]
+
+    buckets = times // step * step
+    new_group = np.empty(len(times), dtype=bool)
+    new_group[0] = True
+    new_group[1:] = (buckets[1:] != buckets[:-1]) | (codes[1:] != codes[:-1])
+    starts = np.flatnonzero(new_group)
+    ends = np.append(starts[1:], len(times)) - 1
+
+    out = pd.DataFrame({"open_time": buckets[starts]})
+    if "open" in candles:
+        out["open"] = candles["open"].to_numpy()[starts]
+    if "high" in candles:
+        out["high"] = np.maximum.reduceat(candles["high"].to_numpy(), starts)
+    if "low" in candles:
+        out["low"] = np.minimum.reduceat(candles["low"].to_numpy(), starts)
+    out["close"] = candles["close"].to_numpy()[ends]
+    if "volume" in candles:
+        out["volume"] = np.add.reduceat(candles["volume"].to_numpy(), starts)
+    if symbol_col:
+        out[symbol_col] = pd.Categorical.from_codes(codes[starts], categories=np.asarray(symbols))
+    return out
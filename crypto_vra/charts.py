@@ -0,0 +1,66 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from .profiling import stage
+
+# =====================================================
+# CHART DATA LAYER
+# =====================================================
+# Charts never ship more than CHART_POINT_BUDGET points per series to the
+# browser. Longer series are reduced with Largest-Triangle-Three-Buckets,
+# which keeps the peaks and troughs a plain stride would drop; a zoom
+# slider re-slices the full-resolution data so narrowing the window brings
+# the detail back. Figures above WEBGL_THRESHOLD points render with WebGL.
+CHART_POINT_BUDGET = int(os.environ.get("CVRA_CHART_POINTS", "2000"))
+WEBGL_THRESHOLD = 1000
+
+def lttb_indices(x, y, n_out):
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    # First and last points are always kept; n_out - 2 buckets in between
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i == n_out - 3:
+            cx, cy = x[-1], y[-1]
+        else:
+            cx, cy = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        # Pick the point forming the largest triangle with the previous
+        # pick and the next bucket's centroid
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+def downsample(df, x, y, color=None, budget=CHART_POINT_BUDGET):
+    groups = df.groupby(color, sort=False) if color else [(None, df)]
+    frames = []
+    for _, g in groups:
+        g = g[g[y].notna()]
+        if len(g) > budget:
+            if not g[x].is_monotonic_increasing:
+                g = g.sort_values(x)
+            xs = g[x].to_numpy()
+            xs = xs.astype("datetime64[ns]").astype(np.int64).astype(float) if np.issubdtype(xs.dtype, np.datetime64) else xs.astype(float)
+            g = g.iloc[lttb_indices(xs, g[y].to_numpy(dtype=float), budget)]
+        frames.append(g)
+    return pd.concat(frames) if frames else df.iloc[:0]
+
+def in_window(df, col, window):
+    start, end = window
+    return df[(df[col] >= start) & (df[col] <= end)]
+
+def line_figure(df, x, y, color=None, budget=CHART_POINT_BUDGET, **kwargs):
+    import plotly.express as px
+
+    with stage("charts.downsample"):
+        data = downsample(df, x, y, color, budget)
+    render_mode = "webgl" if len(data) > WEBGL_THRESHOLD else "auto"
+    with stage("charts.figure"):
+        return px.line(data, x=x, y=y, color=color, render_mode=render_mode, **kwargs)
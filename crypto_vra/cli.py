@@ -0,0 +1,164 @@
+import argparse
+import os
+import sys
+
+from .intervals import INTERVAL_MS, ingest_interval, periods_per_year
+
+# Batch fetch -> metrics -> export, for cron jobs and reports that should
+# not have to start the web UI:
+#
+#   python -m crypto_vra --days 180 --output data/reports/metrics.parquet
+#   python -m crypto_vra --universe all --interval 1h --days 7 --output - --format json
+#   python -m crypto_vra --risk data/reports/var.csv --confidence 0.99 --horizon 10
+#   python -m crypto_vra --universe all --days 1825 --correlation data/reports/regime.csv
+#   python -m crypto_vra --alerts data/alerts/rules.json --watch
+
+EXPORT_FORMATS = ["csv", "parquet", "json"]
+
+def export_frame(df, path, fmt=None):
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower() or "csv"
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unsupported export format: {fmt}")
+    if path == "-":
+        if fmt == "parquet":
+            raise ValueError("parquet output needs a file path")
+        target = sys.stdout
+    else:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        target = path
+    if fmt == "parquet":
+        df.to_parquet(target, index=False)
+    elif fmt == "json":
+        df.to_json(target, orient="records", date_format="iso", indent=2)
+        if target is sys.stdout:
+            sys.stdout.write("\n")
+    else:
+        df.to_csv(target, index=False)
+
+def resolve_symbols(args):
+    from .exchange import crypto_symbols, discover_symbols
+
+    if args.symbols:
+        return [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    if args.universe == "all":
+        symbols = discover_symbols(args.quote)
+        if symbols:
+            return symbols
+        print("warning: symbol discovery failed, using the core universe", file=sys.stderr)
+    return list(crypto_symbols)
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m crypto_vra",
+        description="Fetch Binance klines, compute risk metrics and export them"
+    )
+    parser.add_argument("--days", type=int, default=180, help="lookback window in days")
+    parser.add_argument("--interval", choices=list(INTERVAL_MS), default="1d")
+    parser.add_argument("--symbols", help="comma-separated symbols (overrides --universe)")
+    parser.add_argument("--universe", choices=["core", "all"], default="core")
+    parser.add_argument("--quote", default="USDT", help="quote asset for --universe all")
+    parser.add_argument("--benchmark", default="BTCUSDT")
+    parser.add_argument("--output", default="-", help="metrics file, or - for stdout")
+    parser.add_argument("--format", choices=EXPORT_FORMATS,
+                        help="export format (default: from the file suffix, else csv)")
+    parser.add_argument("--prices", help="also export prices with returns and rolling features")
+    parser.add_argument("--risk", help="also export historical / parametric / Monte Carlo VaR and CVaR")
+    parser.add_argument("--confidence", type=float, nargs="+", default=[0.95, 0.99],
+                        help="VaR confidence levels for --risk")
+    parser.add_argument("--horizon", type=int, default=1, help="VaR horizon in bars for --risk")
+    parser.add_argument("--paths", type=int, help="Monte Carlo paths for --risk")
+    parser.add_argument("--seed", type=int, default=0, help="Monte Carlo seed for --risk")
+    parser.add_argument("--correlation",
+                        help="also export the rolling mean pairwise correlation and its regime")
+    parser.add_argument("--corr-window", type=int, default=30,
+                        help="rolling window in bars for --correlation")
+    parser.add_argument("--alerts", metavar="RULES",
+                        help="evaluate the alert rules file and export the alerts it fires "
+                             "(universe and interval come from the rules file)")
+    parser.add_argument("--watch", action="store_true",
+                        help="with --alerts: keep evaluating as new bars land, printing alerts "
+                             "as JSON lines (the headless alert worker)")
+    parser.add_argument("--no-fetch", action="store_true",
+                        help="use the local candle store only, without calling the exchange")
+    return parser
+
+def run_alerts(args):
+    import json
+    import time
+
+    import pandas as pd
+
+    from .alerts import AlertService
+
+    service = AlertService(args.alerts, start=False)
+    while True:
+        try:
+            alerts = service.tick()
+            if not args.watch:
+                export_frame(pd.DataFrame(alerts), args.output, args.format)
+                return 0
+        except (OSError, ValueError) as exc:
+            print(f"error: {exc}", file=sys.stderr)
+            if not args.watch:
+                return 2
+            alerts = []
+        for alert in alerts:
+            print(json.dumps(alert), flush=True)
+        time.sleep(service.poll)
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.alerts:
+        return run_alerts(args)
+
+    from .candles import load_price_panel
+    from .ingest import ingest_symbols
+    from .metrics import (
+        add_rolling_features, build_metrics_table, compute_log_returns, validate_price_data
+    )
+    from .volatility import add_ewma_volatility, fit_garch_warm
+
+    symbols = resolve_symbols(args)
+    if not args.no_fetch:
+        def report(done, total):
+            print(f"synced {done}/{total} symbols", file=sys.stderr)
+
+        failed = ingest_symbols(symbols, args.days, ingest_interval(args.interval), report)
+        if failed:
+            print(f"warning: could not sync {', '.join(failed)}", file=sys.stderr)
+
+    prices = load_price_panel(args.days, symbols, args.interval)
+    if not validate_price_data(prices):
+        print("error: no price data available for the requested window", file=sys.stderr)
+        return 1
+
+    ppy = periods_per_year(args.interval)
+    returns_df = compute_log_returns(prices)
+    # GARCH estimates are stored per interval and warm-start the next run
+    garch = fit_garch_warm(returns_df, args.interval)
+    metrics = build_metrics_table(returns_df, args.benchmark, ppy, garch)
+
+    try:
+        export_frame(metrics, args.output, args.format)
+        if args.prices:
+            prices_out = add_ewma_volatility(add_rolling_features(returns_df, ppy=ppy), ppy=ppy)
+            export_frame(prices_out, args.prices, args.format)
+        if args.risk:
+            from .risk import MC_PATHS, risk_table
+
+            # The portfolio row is an equal-weight basket of the exported symbols
+            risk = risk_table(
+                returns_df, tuple(args.confidence), args.horizon,
+                weights=dict.fromkeys(metrics["Crypto"], 1.0),
+                n_paths=args.paths or MC_PATHS, seed=args.seed
+            )
+            export_frame(risk, args.risk, args.format)
+        if args.correlation:
+            from .correlation import correlation_regime
+
+            regime = correlation_regime(returns_df, args.corr_window)
+            export_frame(regime.reset_index(), args.correlation, args.format)
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 2
+    return 0
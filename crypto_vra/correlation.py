@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+
+from .engine import returns_matrix
+from .profiling import stage
+
+# =====================================================
+# ROLLING CORRELATION
+# =====================================================
+# Correlation of every symbol pair over a trailing window of bars, streamed
+# through time: the state keeps the window's rows in a ring buffer plus the
+# window sums of the returns and of their cross-products, and each new bar
+# adds its outer product and subtracts the one of the bar leaving the window
+# (O(N^2) per step, memory O(window * N + N^2) whatever the history length).
+# Like the other rolling metrics, a symbol needs a full window of returns;
+# until then its row and column are NaN. Returns are centered on the
+# window mean at every resync, and the sums are rebuilt from the buffer
+# every CORR_RESYNC_EVERY bars so add/subtract rounding cannot accumulate.
+CORR_WINDOW = 30
+CORR_WINDOWS = (30, 60, 90, 180)
+CORR_RESYNC_EVERY = 256
+# Mean pairwise correlation bands: (upper bound, label)
+CORR_REGIMES = ((0.3, "🟢 Decoupled"), (0.6, "🟡 Mixed"), (np.inf, "🔴 Coupled"))
+
+class RollingCorrelation:
+
+    def __init__(self, symbols, window=CORR_WINDOW):
+        self.symbols = pd.Index(symbols)
+        self.window = window
+        k = len(self.symbols)
+        self.shift = np.zeros(k)
+        self.rows = np.zeros((window, k))
+        self.valid = np.zeros((window, k), dtype=bool)
+        self.counts = np.zeros(k, dtype=np.int64)
+        self.s = np.zeros(k)
+        self.sxy = np.zeros((k, k))
+        self.pos = 0
+        self.pushed = 0
+
+    def push(self, row):
+        # row: one bar of returns per symbol, NaN where missing
+        row = np.asarray(row, dtype=float)
+        valid = ~np.isnan(row)
+        x = np.where(valid, row - self.shift, 0.0)
+        old = self.rows[self.pos]
+        self.s += x - old
+        # Rank-2 update in one product: x x' - old old'
+        self.sxy += np.stack([x, old]).T @ np.stack([x, -old])
+        self.counts += valid.astype(np.int64) - self.valid[self.pos]
+        self.rows[self.pos] = x
+        self.valid[self.pos] = valid
+        self.pos = (self.pos + 1) % self.window
+        self.pushed += 1
+        if self.pushed == self.window or self.pushed % CORR_RESYNC_EVERY == 0:
+            self._resync()
+
+    def _resync(self):
+        # Re-center on the window mean and rebuild the sums from the buffer
+        raw = self.rows + self.shift
+        n = np.maximum(self.counts, 1)
+        shift = np.where(self.counts > 0, np.where(self.valid, raw, 0.0).sum(axis=0) / n, 0.0)
+        self.rows = np.where(self.valid, raw - shift, 0.0)
+        self.shift = shift
+        self.s = self.rows.sum(axis=0)
+        self.sxy = self.rows.T @ self.rows
+
+    def _scale(self):
+        # 1 / sqrt(window sum of squared deviations) of every symbol with a
+        # full, non-constant window; 0 elsewhere
+        var = np.diag(self.sxy) - self.s * self.s / self.window
+        active = (self.counts == self.window) & (var > 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(active, 1 / np.sqrt(np.where(active, var, 1.0)), 0.0), active
+
+    def matrix(self):
+        d, active = self._scale()
+        corr = (self.sxy - np.outer(self.s, self.s) / self.window) * d[:, None] * d[None, :]
+        np.clip(corr, -1.0, 1.0, out=corr)
+        np.fill_diagonal(corr, 1.0)
+        corr[~active] = np.nan
+        corr[:, ~active] = np.nan
+        return corr
+
+    def mean_correlation(self):
+        # Average off-diagonal correlation without forming the matrix: the
+        # sum of all entries is d' C d for the scaled deviation sums
+        d, active = self._scale()
+        m = int(active.sum())
+        if m < 2:
+            return np.nan, m
+        total = d @ self.sxy @ d - (d @ self.s) ** 2 / self.window
+        return (total - m) / (m * (m - 1)), m
+
+def correlation_regime_label(value):
+    if np.isnan(value):
+        return ""
+    for bound, label in CORR_REGIMES:
+        if value < bound:
+            return label
+
+def rolling_correlation(returns_df, window=CORR_WINDOW, at=None, value_col="log_return"):
+    # [symbol x symbol] correlation of the window ending at the last bar on
+    # or before `at` (default: the latest bar)
+    wide = returns_matrix(returns_df, value_col)
+    end = len(wide) if at is None else int(wide.index.searchsorted(pd.Timestamp(at), side="right"))
+    state = RollingCorrelation(wide.columns, window)
+    for row in wide.to_numpy()[max(end - window, 0):end]:
+        state.push(row)
+    return pd.DataFrame(state.matrix(), index=wide.columns, columns=wide.columns)
+
+def correlation_regime(returns_df, window=CORR_WINDOW, value_col="log_return"):
+    # Mean pairwise correlation of the symbols with a full window at every
+    # bar, the number of such symbols and the regime band it falls in
+    wide = returns_matrix(returns_df, value_col)
+    values = wide.to_numpy()
+    state = RollingCorrelation(wide.columns, window)
+    mean = np.full(len(values), np.nan)
+    active = np.zeros(len(values), dtype=np.int64)
+    with stage("correlation.stream"):
+        for t, row in enumerate(values):
+            state.push(row)
+            if t >= window - 1:
+                mean[t], active[t] = state.mean_correlation()
+    return pd.DataFrame({
+        "Mean Correlation": mean,
+        "Symbols": active,
+        "Regime": [correlation_regime_label(v) for v in mean]
+    }, index=wide.index)
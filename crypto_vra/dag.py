@@ -0,0 +1,263 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from .candles import load_price_panel, window_start_ms
+from .correlation import CORR_WINDOW, correlation_regime
+from .derived import cached_derived, derived_invalidate, derived_key, raw_data_version
+from .engine import rolling_beta
+from .intervals import periods_per_year
+from .memory import frame_bytes
+from .metrics import add_rolling_features, build_metrics_table, compute_log_returns
+from .portfolio import (
+    cached_covariance, efficient_frontier, max_sharpe_weights, min_variance_weights,
+    portfolio_stats, random_portfolios
+)
+from .processed import build_processed
+from .profiling import count, stage
+from .risk import MC_PATHS, RISK_CONFIDENCE, RISK_HORIZON, risk_table
+from .volatility import add_ewma_volatility, fit_garch_warm
+
+# =====================================================
+# ANALYTICS GRAPH
+# =====================================================
+# The analytics pipeline as named stages (prices -> returns -> rolling ->
+# metrics, ...). A stage's version hashes its own parameters with the
+# versions of the stages it reads, and the raw candle fingerprint enters at
+# `prices`, so new candles change every version while e.g. a different
+# benchmark only changes the stages that take `benchmark`. Results are
+# memoized per version for the whole process, so both dashboard pages and
+# every session share them; stages marked persist are also kept in the
+# derived cache on disk. Memoized frames are shared: callers must not
+# modify them in place.
+DAG_CACHE_MAX_BYTES = int(os.environ.get("CVRA_DAG_CACHE_MB", "256")) * 1024 * 1024
+ANALYTICS_WINDOW = 30
+# risk_weights None is an equal-weight basket of the loaded symbols
+RISK_DEFAULTS = {
+    "risk_confidence": RISK_CONFIDENCE,
+    "risk_horizon": RISK_HORIZON,
+    "risk_weights": None,
+    "risk_paths": MC_PATHS,
+    "risk_dof": None,
+    "risk_seed": 0
+}
+PORTFOLIO_DEFAULTS = {"long_only": True}
+
+class Node:
+
+    def __init__(self, name, fn, deps, params, key, persist):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.params = tuple(params)
+        # key: context entries that version the stage without being passed
+        # to it (e.g. the raw data fingerprint)
+        self.key = tuple(key)
+        self.persist = persist
+
+class AnalyticsGraph:
+
+    def __init__(self, max_bytes=DAG_CACHE_MAX_BYTES):
+        self.nodes = {}
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.memo = OrderedDict()
+        self.nbytes = 0
+        self.building = {}
+
+    def node(self, name, deps=(), params=(), key=(), persist=None):
+        # persist: {"symbol_col": ..., "time_col": ...} to store the result
+        # as a derived dataset
+        def register(fn):
+            self.nodes[name] = Node(name, fn, deps, params, key, persist)
+            return fn
+        return register
+
+    def _params(self, node, ctx):
+        return {p: ctx[p] for p in node.params + node.key}
+
+    def version(self, name, ctx):
+        node = self.nodes[name]
+        deps = [self.version(dep, ctx) for dep in node.deps]
+        return derived_key(name, deps, self._params(node, ctx))
+
+    def get(self, name, ctx):
+        node = self.nodes[name]
+        key = self.version(name, ctx)
+        while True:
+            with self.lock:
+                if key in self.memo:
+                    self.memo.move_to_end(key)
+                    count(f"dag.{name}.hit")
+                    return self.memo[key][0]
+                pending = self.building.get(key)
+                if pending is None:
+                    self.building[key] = threading.Event()
+                    break
+            # Another thread is building this version; use its result
+            pending.wait()
+        try:
+            inputs = [self.get(dep, ctx) for dep in node.deps]
+            kwargs = {p: ctx[p] for p in node.params}
+            count(f"dag.{name}.miss")
+            with stage(f"dag.{name}"):
+                if node.persist:
+                    value = cached_derived(
+                        key, lambda: node.fn(*inputs, **kwargs), name,
+                        self._params(node, ctx), **node.persist
+                    )
+                else:
+                    value = node.fn(*inputs, **kwargs)
+            self._store(key, value)
+            return value
+        finally:
+            with self.lock:
+                self.building.pop(key).set()
+
+    def _store(self, key, value):
+        nbytes = _nbytes(value)
+        with self.lock:
+            self.memo[key] = (value, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes and len(self.memo) > 1:
+                _, (_, size) = self.memo.popitem(last=False)
+                self.nbytes -= size
+
+    def dependents(self, name):
+        # name and every stage that reads it, directly or not
+        out = {name}
+        changed = True
+        while changed:
+            changed = False
+            for node in self.nodes.values():
+                if node.name not in out and out.intersection(node.deps):
+                    out.add(node.name)
+                    changed = True
+        return out
+
+    def invalidate(self, name, ctx):
+        # Drops the memoized results of `name` and everything downstream of
+        # it for this context, including their derived datasets on disk
+        for dep in self.dependents(name):
+            key = self.version(dep, ctx)
+            with self.lock:
+                entry = self.memo.pop(key, None)
+                if entry is not None:
+                    self.nbytes -= entry[1]
+            if self.nodes[dep].persist:
+                derived_invalidate(key)
+
+    def clear(self):
+        with self.lock:
+            self.memo.clear()
+            self.nbytes = 0
+
+def _nbytes(value):
+    # Frames are sized on their own, so columns shared between stages are
+    # counted once per stage and the budget errs on the small side
+    if isinstance(value, pd.DataFrame):
+        return frame_bytes(value)
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, tuple):
+        return sum(_nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+analytics = AnalyticsGraph()
+
+def analytics_context(days, symbols, interval="1d", benchmark="BTCUSDT", window=ANALYTICS_WINDOW,
+                      corr_window=CORR_WINDOW, **params):
+    # Everything the stages are parameterized on. Build it after ingestion:
+    # raw_version fingerprints the stored candles at this moment. Other
+    # stage parameters default to RISK_DEFAULTS / PORTFOLIO_DEFAULTS and
+    # can be overridden through params.
+    symbols = tuple(sorted(symbols))
+    return {
+        "days": days,
+        "symbols": symbols,
+        "interval": interval,
+        "ppy": periods_per_year(interval),
+        "window": window,
+        "benchmark": benchmark,
+        "corr_window": corr_window,
+        **RISK_DEFAULTS,
+        **PORTFOLIO_DEFAULTS,
+        **params,
+        "raw_version": raw_data_version(symbols, interval, window_start_ms(days, interval))
+    }
+
+# =====================================================
+# STAGES
+# =====================================================
+@analytics.node("prices", params=("days", "symbols", "interval"), key=("raw_version",))
+def _prices(days, symbols, interval):
+    return load_price_panel(days, list(symbols), interval)
+
+@analytics.node("returns", deps=("prices",))
+def _returns(prices):
+    return compute_log_returns(prices)
+
+@analytics.node("rolling", deps=("returns",), params=("window", "ppy"))
+def _rolling(returns_df, window, ppy):
+    df = add_rolling_features(returns_df, window, ppy)
+    return add_ewma_volatility(df, ppy=ppy)
+
+@analytics.node("garch", deps=("returns",), params=("interval",))
+def _garch(returns_df, interval):
+    # Refit only when new candles land; every refit is warm-started from
+    # the stored estimates
+    return fit_garch_warm(returns_df, interval)
+
+@analytics.node("metrics", deps=("returns", "garch"), params=("benchmark", "ppy"))
+def _metrics(returns_df, garch_params, benchmark, ppy):
+    return build_metrics_table(returns_df, benchmark, ppy, garch_params)
+
+@analytics.node("beta", deps=("returns",), params=("benchmark", "window"))
+def _beta(returns_df, benchmark, window):
+    return rolling_beta(returns_df, benchmark, window)
+
+@analytics.node("correlation", deps=("returns",), params=("corr_window",))
+def _correlation(returns_df, corr_window):
+    return correlation_regime(returns_df, corr_window)
+
+@analytics.node("risk", deps=("returns",), params=tuple(RISK_DEFAULTS))
+def _risk(returns_df, risk_confidence, risk_horizon, risk_weights, risk_paths, risk_dof, risk_seed):
+    if risk_weights is None:
+        risk_weights = dict.fromkeys(returns_df["crypto"].unique(), 1.0)
+    return risk_table(
+        returns_df, tuple(risk_confidence), risk_horizon, risk_weights,
+        n_paths=risk_paths, seed=risk_seed, dof=risk_dof
+    )
+
+@analytics.node("moments", deps=("returns",), params=("interval", "days"))
+def _moments(returns_df, interval, days):
+    # (mean, covariance), folded incrementally into the statistics kept
+    # from the previous returns version
+    return cached_covariance(returns_df, key=(interval, days))
+
+@analytics.node("optimal", deps=("moments",), params=("long_only", "ppy"))
+def _optimal(moments, long_only, ppy):
+    mean, cov = moments
+    return pd.DataFrame({
+        "Min Variance": min_variance_weights(mean, cov, long_only),
+        "Max Sharpe": max_sharpe_weights(mean, cov, long_only, ppy)
+    })
+
+@analytics.node("frontier", deps=("moments",), params=("long_only", "ppy"))
+def _frontier(moments, long_only, ppy):
+    mean, cov = moments
+    return efficient_frontier(mean, cov, long_only=long_only, ppy=ppy)
+
+@analytics.node("candidates", deps=("moments",), params=("ppy",))
+def _candidates(moments, ppy):
+    # Random long-only portfolios plotted against the frontier
+    mean, cov = moments
+    return portfolio_stats(random_portfolios(cov.index), mean, cov, ppy)
+
+@analytics.node("processed", deps=("prices",), params=("window", "ppy"),
+                persist={"symbol_col": "Crypto", "time_col": "Date"})
+def _processed(prices, window, ppy):
+    return build_processed(prices, window=window, ppy=ppy)
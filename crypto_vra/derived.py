@@ -0,0 +1,134 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from .candles import candle_root
+from .intervals import ingest_interval
+from .profiling import count, stage
+from .store import (
+    DATA_DIR, interprocess_lock, partition_files, read_partitions, write_json_atomic,
+    write_dataset
+)
+
+# =====================================================
+# DERIVED DATA CACHE
+# =====================================================
+# Derived datasets are stored under data/derived/<key>/, where the key
+# hashes the fingerprint of the raw candle partitions they were built from
+# together with the computation parameters. Changed inputs produce a new
+# key (so stale results are never served), different parameterizations
+# live side by side, and the least recently used artifacts are evicted
+# once the cache outgrows DERIVED_CACHE_MAX_BYTES.
+DERIVED_DIR = os.path.join(DATA_DIR, "derived")
+DERIVED_INDEX = os.path.join(DERIVED_DIR, "index.json")
+DERIVED_LOCK_PATH = os.path.join(DERIVED_DIR, ".index.lock")
+DERIVED_CACHE_MAX_BYTES = int(os.environ.get("CVRA_DERIVED_CACHE_MB", "512")) * 1024 * 1024
+DERIVED_SCHEMA_VERSION = 1
+
+def raw_data_version(symbols, interval, start=None):
+    # Fingerprint of every stored partition a derived artifact could read
+    root = candle_root(ingest_interval(interval))
+    digest = hashlib.sha256()
+    for symbol in sorted(symbols):
+        for path in partition_files(root, symbol, start):
+            info = os.stat(path)
+            digest.update(
+                f"{symbol}/{os.path.basename(path)}:{info.st_size}:{info.st_mtime_ns};".encode()
+            )
+    return digest.hexdigest()
+
+def derived_key(name, raw_version, params):
+    payload = json.dumps(
+        {"name": name, "raw": raw_version, "params": params, "schema": DERIVED_SCHEMA_VERSION},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+def _load_derived_index():
+    if not os.path.exists(DERIVED_INDEX):
+        return {}
+    try:
+        with open(DERIVED_INDEX) as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+def _save_derived_index(index):
+    write_json_atomic(DERIVED_INDEX, index)
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+def _evict_derived(index, keep=None):
+    total = sum(entry.get("bytes", 0) for entry in index.values())
+    for key, entry in sorted(index.items(), key=lambda item: item[1].get("last_used", 0)):
+        if total <= DERIVED_CACHE_MAX_BYTES:
+            break
+        if key == keep:
+            continue
+        shutil.rmtree(os.path.join(DERIVED_DIR, key), ignore_errors=True)
+        total -= entry.get("bytes", 0)
+        del index[key]
+
+def derived_get(key, symbol_col=None, time_col=None):
+    path = os.path.join(DERIVED_DIR, key)
+    if not os.path.isdir(path):
+        return None
+    try:
+        df = read_partitions(path, time_col=time_col, symbol_col=symbol_col)
+    except Exception:
+        return None
+    now = time.time()
+    with interprocess_lock(DERIVED_LOCK_PATH):
+        index = _load_derived_index()
+        entry = index.get(key)
+        # Recency only needs minute resolution; avoid a write on every rerun
+        if entry is not None and now - entry.get("last_used", 0) > 60:
+            entry["last_used"] = now
+            _save_derived_index(index)
+    return df
+
+def derived_put(key, df, name, params, symbol_col, time_col):
+    path = os.path.join(DERIVED_DIR, key)
+    write_dataset(path, df, symbol_col=symbol_col, time_col=time_col)
+    with interprocess_lock(DERIVED_LOCK_PATH):
+        index = _load_derived_index()
+        index[key] = {
+            "name": name,
+            "params": params,
+            "bytes": _dir_size(path),
+            "created": time.time(),
+            "last_used": time.time()
+        }
+        _evict_derived(index, keep=key)
+        _save_derived_index(index)
+
+def derived_invalidate(key):
+    with interprocess_lock(DERIVED_LOCK_PATH):
+        shutil.rmtree(os.path.join(DERIVED_DIR, key), ignore_errors=True)
+        index = _load_derived_index()
+        if index.pop(key, None) is not None:
+            _save_derived_index(index)
+
+def cached_derived(key, build_fn, name, params, symbol_col, time_col):
+    with stage(f"derived.{name}.read"):
+        df = derived_get(key, symbol_col=symbol_col, time_col=time_col)
+    if df is not None and not df.empty:
+        count(f"derived.{name}.hit")
+        return df
+    count(f"derived.{name}.miss")
+    with stage(f"derived.{name}.build"):
+        df = build_fn()
+    if not df.empty:
+        try:
+            with stage(f"derived.{name}.write"):
+                derived_put(key, df, name, params, symbol_col, time_col)
+        except Exception:
+            pass
+    return df
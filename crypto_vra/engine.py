@@ -0,0 +1,234 @@
+import numpy as np
+import pandas as pd
+
+# =====================================================
+# ANALYTICS ENGINE (WIDE MATRIX)
+# =====================================================
+# Long (date, crypto, value) frames are scattered once into a dense
+# [bar position x symbol] float matrix: column j holds symbol j's values in
+# date order, padded with NaN at the end. Every per-symbol computation is
+# then a single NumPy expression over all symbols, and results are
+# gathered back to long form with the same index arrays. Aligning on each
+# symbol's own bar position (not on calendar date) keeps shift/rolling
+# semantics identical to groupby("crypto").transform(...).
+class PanelMatrix:
+
+    def __init__(self, df, symbol_col="crypto", time_col="date"):
+        codes, symbols = pd.factorize(df[symbol_col], sort=True)
+        # int32 codes / positions halve the index arrays kept with the frame
+        codes = codes.astype(np.int32)
+        times = np.asarray(df[time_col])
+        # Frames already grouped by symbol and sorted by time (the layout
+        # load_price_panel returns) are used as they are, without a sort
+        same = codes[1:] == codes[:-1]
+        self.is_sorted = bool(((codes[1:] > codes[:-1]) | (same & (times[1:] >= times[:-1]))).all())
+        if self.is_sorted:
+            self.frame = df
+        else:
+            order = np.lexsort((times, codes))
+            self.frame = df.iloc[order]
+            codes = codes[order]
+        self.codes = codes
+        self.symbols = pd.Index(np.asarray(symbols), name=symbol_col)
+
+        counts = np.bincount(self.codes, minlength=len(symbols))
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1])).astype(np.int32)
+        self.pos = np.arange(len(self.codes), dtype=np.int32) - starts[self.codes]
+        self.shape = (int(counts.max()) if len(counts) else 0, len(symbols))
+
+    def matrix(self, col, dtype=None):
+        # Float columns keep their precision (float32 panels stay float32)
+        if dtype is None:
+            dtype = self.frame[col].dtype
+            dtype = dtype if np.issubdtype(dtype, np.floating) else np.float64
+        out = np.full(self.shape, np.nan, dtype=dtype)
+        out[self.pos, self.codes] = self.frame[col].to_numpy(dtype=dtype)
+        return out
+
+    def to_long(self, values):
+        return values[self.pos, self.codes]
+
+def _lagged_ratio(prices, lag=1):
+    out = np.full(prices.shape, np.nan, dtype=prices.dtype)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[lag:] = prices[lag:] / prices[:-lag]
+    return out
+
+def matrix_log_returns(prices):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.log(_lagged_ratio(prices))
+
+def matrix_simple_returns(prices):
+    return _lagged_ratio(prices) - 1.0
+
+def _window_sums(values, window, dtype=np.float64):
+    # Trailing-window sums (rows window-1 onwards) from one cumulative sum,
+    # accumulated in float64 whatever the input dtype
+    c = np.cumsum(values, axis=0, dtype=dtype)
+    out = c[window - 1:].copy()
+    out[1:] -= c[:-window]
+    return out
+
+def _rolling_sums(values, window):
+    # Window sums of the column-centered values (centering keeps the
+    # sum-of-squares form accurate) and a mask of complete windows
+    valid = ~np.isnan(values)
+    center = _column_means(values, valid)
+    x = values - center
+    x[~valid] = 0.0
+    full = _window_sums(valid, window, np.int32) == window
+    return x, center, full
+
+def matrix_rolling_mean(values, window):
+    # Same semantics as Series.rolling(window).mean(): NaN until a full
+    # window of non-missing values is available. Prefix sums keep memory
+    # at a few matrices regardless of the window length.
+    out = np.full(values.shape, np.nan, dtype=values.dtype)
+    if values.shape[0] >= window:
+        x, center, full = _rolling_sums(values, window)
+        mean = _window_sums(x, window) / window + center
+        out[window - 1:] = np.where(full, mean, np.nan)
+    return out
+
+def matrix_rolling_std(values, window, ddof=1):
+    out = np.full(values.shape, np.nan, dtype=values.dtype)
+    if values.shape[0] >= window and window > ddof:
+        x, _, full = _rolling_sums(values, window)
+        s1 = _window_sums(x, window)
+        x *= x
+        var = _window_sums(x, window)
+        del x
+        # var = (sum(x^2) - sum(x)^2 / n) / (n - ddof), computed in place
+        s1 *= s1
+        s1 /= window
+        var -= s1
+        del s1
+        np.maximum(var, 0.0, out=var)
+        var /= window - ddof
+        np.sqrt(var, out=var)
+        var[~full] = np.nan
+        out[window - 1:] = var
+    return out
+
+def matrix_sharpe(mean, std, periods_per_year):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (mean * periods_per_year) / (std * np.sqrt(periods_per_year))
+
+def _with_columns(panel, **columns):
+    # Sorted copy of the input frame plus new columns; the input frame
+    # itself is never modified.
+    out = panel.frame.copy(deep=False) if panel.is_sorted else panel.frame
+    for name, values in columns.items():
+        out[name] = values
+    return out
+
+# =====================================================
+# COVARIANCE ENGINE
+# =====================================================
+# Full symbol x symbol covariance / correlation from one pass of matrix
+# products over a [date x symbol] returns matrix. Missing values are
+# handled pairwise (same as DataFrame.cov / Series.cov): every entry only
+# uses the dates on which both symbols have a return.
+def returns_matrix(returns_df, value_col="log_return"):
+    # Same frame as pivot(index="date", columns="crypto"), scattered straight
+    # from factorized codes instead of through pivot's row-sized temporaries
+    dates, date_index = pd.factorize(returns_df["date"], sort=True)
+    codes, symbols = pd.factorize(returns_df["crypto"], sort=True)
+    values = np.full((len(date_index), len(symbols)), np.nan)
+    values[dates, codes] = returns_df[value_col].to_numpy(dtype=float)
+    return pd.DataFrame(
+        values,
+        index=pd.Index(date_index, name="date"),
+        columns=pd.Index(np.asarray(symbols), name="crypto")
+    )
+
+def _column_means(values, mask):
+    return np.where(mask, values, 0.0).sum(axis=0) / np.maximum(mask.sum(axis=0), 1)
+
+def _pairwise_moments(values):
+    mask = ~np.isnan(values)
+    # Centering first keeps the sum-of-products form numerically stable
+    x = values - _column_means(values, mask)
+    x[~mask] = 0.0
+    m = mask.astype(float)
+    n = m.T @ m
+    sx = x.T @ m
+    sxy = x.T @ x
+    x *= x
+    sxx = x.T @ m
+    return n, sx, sxx, sxy
+
+def pairwise_covariance(values, ddof=1, min_periods=2):
+    n, sx, _, sxy = _pairwise_moments(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = (sxy - sx * sx.T / n) / (n - ddof)
+    cov[n < max(min_periods, ddof + 1)] = np.nan
+    return cov
+
+def pairwise_correlation(values, min_periods=2):
+    n, sx, sxx, sxy = _pairwise_moments(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sxy - sx * sx.T / n
+        # Variances restricted to the dates shared by each pair
+        var = sxx - sx * sx / n
+        corr = cov / np.sqrt(var * var.T)
+    corr[n < min_periods] = np.nan
+    return np.clip(corr, -1.0, 1.0)
+
+def covariance_frame(returns_df, value_col="log_return"):
+    pivot = returns_matrix(returns_df, value_col)
+    return pd.DataFrame(
+        pairwise_covariance(pivot.to_numpy(dtype=float)),
+        index=pivot.columns, columns=pivot.columns
+    )
+
+def correlation_frame(returns_df, value_col="log_return"):
+    pivot = returns_matrix(returns_df, value_col)
+    return pd.DataFrame(
+        pairwise_correlation(pivot.to_numpy(dtype=float)),
+        index=pivot.columns, columns=pivot.columns
+    )
+
+def beta_from_covariance(cov, benchmark):
+    # cov is a labelled covariance frame; the benchmark variance is its own
+    # diagonal entry, i.e. taken over all of its available dates.
+    if benchmark not in cov.columns:
+        return pd.Series(dtype=float)
+    market_var = cov.loc[benchmark, benchmark]
+    if not market_var or np.isnan(market_var):
+        beta = pd.Series(np.nan, index=cov.index)
+    else:
+        beta = cov[benchmark] / market_var
+    beta[benchmark] = 1.0
+    return beta
+
+def rolling_beta(returns_df, benchmark="BTCUSDT", window=30, min_periods=None,
+                 value_col="log_return"):
+    # Rolling beta of every symbol against `benchmark` from cumulative sums
+    # of x, b, x*b and b*b over the dates both series are present.
+    pivot = returns_matrix(returns_df, value_col)
+    if benchmark not in pivot.columns:
+        return pd.DataFrame(index=pivot.index)
+    min_periods = window if min_periods is None else min_periods
+
+    x = pivot.to_numpy(dtype=float)
+    b = x[:, [pivot.columns.get_loc(benchmark)]]
+    both = ~np.isnan(x) & ~np.isnan(b)
+    x = x - _column_means(x, ~np.isnan(x))
+    b = b - _column_means(b, ~np.isnan(b))
+    xz = np.where(both, x, 0.0)
+    bz = np.where(both, b, 0.0)
+
+    def window_sum(a):
+        c = np.cumsum(np.vstack([np.zeros((1, a.shape[1])), a]), axis=0)
+        out = c[1:].copy()
+        out[window:] -= c[1:-window]
+        return out
+
+    n = window_sum(both.astype(float))
+    sx, sb = window_sum(xz), window_sum(bz)
+    sxb, sbb = window_sum(xz * bz), window_sum(bz * bz)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        beta = (sxb - sx * sb / n) / (sbb - sb * sb / n)
+    beta[n < max(min_periods, 2)] = np.nan
+    return pd.DataFrame(beta, index=pivot.index, columns=pivot.columns)
@@ -0,0 +1,246 @@
+import os
+import threading
+import time
+from functools import lru_cache
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .profiling import count, registry
+from .store import FETCH_MAX_WORKERS
+
+# =====================================================
+# BINANCE FETCH
+# =====================================================
+BINANCE_BASE_URLS = [
+    "https://api.binance.com",
+    "https://api-gcp.binance.com",
+    "https://api1.binance.com",
+    "https://api2.binance.com",
+    "https://api3.binance.com",
+]
+
+crypto_symbols = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "ADAUSDT", "DOGEUSDT"]
+
+@lru_cache(maxsize=None)
+def get_http_session():
+    # One keep-alive session shared by all fetch threads; the pool is sized
+    # so every worker can hold its own connection to the same mirror.
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=len(BINANCE_BASE_URLS),
+        pool_maxsize=FETCH_MAX_WORKERS
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# =====================================================
+# REQUEST SCHEDULER (RATE LIMIT + MIRROR HEALTH)
+# =====================================================
+# Binance meters REST usage as request weight per IP per minute, shared by
+# every mirror, and reports what has been used in X-MBX-USED-WEIGHT-1M.
+WEIGHT_LIMIT_PER_MINUTE = int(os.environ.get("CVRA_WEIGHT_LIMIT", "6000"))
+WEIGHT_SAFETY = 0.8
+MAX_BACKOFF_WAIT = 60
+REQUEST_TIMEOUT = (3.05, 10)
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 30
+BREAKER_MAX_COOLDOWN = 600
+
+class WeightRateLimiter:
+    # Token bucket holding the weight we may still spend this minute. It
+    # refills continuously, is pulled down to the server's own count
+    # whenever a response reports it, and is frozen after a 429/418 until
+    # the Retry-After period has passed.
+
+    def __init__(self, limit_per_minute=WEIGHT_LIMIT_PER_MINUTE, safety=WEIGHT_SAFETY):
+        self.capacity = limit_per_minute * safety
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, weight, max_wait=MAX_BACKOFF_WAIT):
+        # Returns False instead of sleeping longer than max_wait in total.
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.tokens >= weight:
+                    self.tokens -= weight
+                    return True
+                wait = max(self.blocked_until - now, (weight - self.tokens) / self.rate)
+            if now + wait > deadline:
+                return False
+            time.sleep(min(wait, 1.0))
+
+    def observe(self, headers):
+        used = headers.get("X-MBX-USED-WEIGHT-1M") or headers.get("x-mbx-used-weight-1m")
+        if used is None:
+            return
+        try:
+            remaining = self.capacity - int(used)
+        except ValueError:
+            return
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, remaining)
+
+    def penalize(self, retry_after):
+        with self.lock:
+            now = time.monotonic()
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+            self.tokens = 0.0
+            self.updated = now
+
+class MirrorHealth:
+    # Circuit breaker plus latency score for one base URL. After
+    # BREAKER_THRESHOLD consecutive failures the mirror is skipped for an
+    # exponentially growing cool-down; the first request after it acts as
+    # the half-open probe.
+
+    def __init__(self, url):
+        self.url = url
+        self.latency = None
+        self.failures = 0
+        self.open_until = 0.0
+        self.lock = threading.Lock()
+
+    def available(self, now):
+        return now >= self.open_until
+
+    def score(self):
+        latency = self.latency if self.latency is not None else 0.5
+        return latency * (1 + self.failures)
+
+    def record_success(self, elapsed):
+        with self.lock:
+            self.failures = 0
+            self.open_until = 0.0
+            self.latency = elapsed if self.latency is None else 0.8 * self.latency + 0.2 * elapsed
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= BREAKER_THRESHOLD:
+                cooldown = BREAKER_COOLDOWN * 2 ** (self.failures - BREAKER_THRESHOLD)
+                self.open_until = time.monotonic() + min(cooldown, BREAKER_MAX_COOLDOWN)
+
+class RequestScheduler:
+
+    def __init__(self, base_urls):
+        self.limiter = WeightRateLimiter()
+        self.mirrors = [MirrorHealth(url) for url in base_urls]
+
+    def ordered_mirrors(self):
+        # Healthy mirrors, fastest first. If every breaker is open, probe
+        # the one that re-closes soonest rather than giving up.
+        now = time.monotonic()
+        healthy = sorted(
+            (m for m in self.mirrors if m.available(now)), key=lambda m: m.score()
+        )
+        if healthy:
+            return healthy
+        return [min(self.mirrors, key=lambda m: m.open_until)]
+
+@lru_cache(maxsize=None)
+def get_request_scheduler():
+    return RequestScheduler(BINANCE_BASE_URLS)
+
+def api_get(session, path, params=None, weight=1):
+    # GET `path` from the best available mirror within the weight budget.
+    # Returns the decoded JSON, or None if no mirror could serve it.
+    scheduler = get_request_scheduler()
+    attempts = len(scheduler.mirrors) + 1
+
+    for _ in range(attempts):
+        for mirror in scheduler.ordered_mirrors():
+            if not scheduler.limiter.acquire(weight):
+                return None
+            start = time.monotonic()
+            count("http.requests")
+            try:
+                r = session.get(f"{mirror.url}{path}", params=params, timeout=REQUEST_TIMEOUT)
+            except requests.RequestException:
+                count("http.failures")
+                mirror.record_failure()
+                continue
+
+            scheduler.limiter.observe(r.headers)
+
+            if r.status_code == 200:
+                mirror.record_success(time.monotonic() - start)
+                return r.json()
+            if r.status_code in (418, 429):
+                # Limits are per IP, so switching mirror would not help
+                try:
+                    retry_after = int(r.headers.get("Retry-After", "60"))
+                except ValueError:
+                    retry_after = 60
+                count("http.throttled")
+                scheduler.limiter.penalize(retry_after)
+                break
+            if r.status_code >= 500:
+                count("http.failures")
+                mirror.record_failure()
+                continue
+            # Any other 4xx is a problem with the request itself
+            mirror.record_success(time.monotonic() - start)
+            return None
+        else:
+            return None
+    return None
+
+def mirror_stats():
+    scheduler = get_request_scheduler()
+    now = time.monotonic()
+    return [{
+        "mirror": m.url,
+        "latency_ms": None if m.latency is None else round(m.latency * 1000, 1),
+        "failures": m.failures,
+        "breaker_open": not m.available(now)
+    } for m in scheduler.mirrors]
+
+def _mirror_gauges():
+    for s in mirror_stats():
+        labels = {"mirror": s["mirror"]}
+        yield "mirror_latency_ms", labels, s["latency_ms"]
+        yield "mirror_failures", labels, s["failures"]
+        yield "mirror_breaker_open", labels, int(s["breaker_open"])
+
+registry.add_collector(_mirror_gauges)
+
+def kline_weight(limit):
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+# =====================================================
+# SYMBOL UNIVERSE
+# =====================================================
+QUOTE_ASSETS = ["USDT", "USDC", "FDUSD", "BTC", "ETH"]
+
+def request_exchange_info(session):
+    return api_get(session, "/api/v3/exchangeInfo", weight=20)
+
+def discover_symbols(quote_asset="USDT", status="TRADING"):
+    info = request_exchange_info(get_http_session())
+    if not info:
+        return []
+    return sorted(
+        s["symbol"] for s in info.get("symbols", [])
+        if s.get("quoteAsset") == quote_asset
+        and s.get("status") == status
+        and s.get("isSpotTradingAllowed", True)
+    )
@@ -0,0 +1,210 @@
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from .candles import load_manifest, load_price_panel, save_manifest, sync_symbol, window_start_ms
+from .exchange import crypto_symbols, get_http_session
+from .intervals import DAY_MS, INTERVAL_MS, ingest_interval
+from .profiling import count, stage
+from .store import CANDLE_STORE_DIR, FETCH_MAX_WORKERS, interprocess_lock
+
+# =====================================================
+# SHARED INGESTION SERVICE
+# =====================================================
+# One background worker per app process does all exchange syncing. Sessions
+# submit (symbols, days, interval) requests and read the shared store;
+# identical requests in flight are collapsed into one job (single flight),
+# and work that is still fresh is not repeated. Across worker processes the
+# store is guarded by a lock file, and the manifest's per-symbol sync time
+# lets a process that waited on the lock skip what another one just did.
+FETCH_TTL = 300
+REFRESH_MIN_INTERVAL = 15
+WATCH_WINDOW = 900
+INGEST_LOCK_PATH = os.path.join(CANDLE_STORE_DIR, ".ingest.lock")
+INGEST_BATCH_SIZE = int(os.environ.get("CVRA_INGEST_BATCH", "50"))
+# Jobs run on INGEST_WORKERS threads, smallest (symbols x bars) first, so a
+# large-universe or 1m backfill cannot hold back small interactive syncs;
+# the store lock is taken per batch, so batches of different jobs
+# interleave. Callers wait at most INGEST_WAIT_TIMEOUT seconds and then
+# read whatever is stored while the job keeps running.
+INGEST_WORKERS = int(os.environ.get("CVRA_INGEST_WORKERS", "2"))
+INGEST_WAIT_TIMEOUT = float(os.environ.get("CVRA_INGEST_WAIT", "60"))
+
+def is_fresh(entry, window_start, now=None):
+    if not entry or "synced_at" not in entry:
+        return False
+    now = time.time() if now is None else now
+    return (now - entry["synced_at"] < FETCH_TTL
+            and entry.get("covered_from", window_start + 1) <= window_start)
+
+def ingest_symbols(symbols, days, interval="1d", on_progress=None, force=False):
+    # Sync the store for `symbols` in batches of INGEST_BATCH_SIZE. Each
+    # batch re-reads the manifest under the interprocess lock, skips
+    # symbols another process synced within FETCH_TTL (unless forced) and
+    # saves the manifest before releasing the lock, so an interrupted bulk
+    # load resumes where it stopped.
+    session = get_http_session()
+    symbols = list(symbols)
+    total = len(symbols)
+    window_start = window_start_ms(days, interval)
+    failed = []
+
+    for offset in range(0, total, INGEST_BATCH_SIZE):
+        batch = symbols[offset:offset + INGEST_BATCH_SIZE]
+        with stage("ingest.batch"), interprocess_lock(INGEST_LOCK_PATH):
+            manifest = load_manifest()
+            interval_manifest = manifest.setdefault(interval, {})
+            stale = [
+                symbol for symbol in batch
+                if force or not is_fresh(interval_manifest.get(symbol), window_start)
+            ]
+            if stale:
+                workers = max(1, min(FETCH_MAX_WORKERS, len(stale)))
+                with ThreadPoolExecutor(max_workers=workers) as pool:
+                    entries = list(pool.map(
+                        lambda symbol: sync_symbol(
+                            session, symbol, days, interval_manifest.get(symbol), interval
+                        ),
+                        stale
+                    ))
+                for symbol, entry in zip(stale, entries):
+                    if entry is None:
+                        failed.append(symbol)
+                    else:
+                        entry["synced_at"] = time.time()
+                        interval_manifest[symbol] = entry
+                save_manifest(manifest)
+        if on_progress is not None:
+            on_progress(min(offset + len(batch), total), total)
+
+    return failed
+
+class IngestJob:
+
+    def __init__(self, key, force=False):
+        self.key = key
+        self.force = force
+        self.done = 0
+        self.total = len(key[2])
+        self.failed = []
+        self.error = None
+        self.finished = threading.Event()
+
+    def progress(self, done, total):
+        self.done, self.total = done, total
+
+    def size(self):
+        interval, days, symbols = self.key
+        return len(symbols) * days * DAY_MS // INTERVAL_MS[interval]
+
+    def wait(self, on_progress=None, poll=0.2, timeout=None):
+        # Returns self; finished is still unset if the timeout ran out
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.finished.wait(poll):
+            if deadline is not None and time.monotonic() >= deadline:
+                count("ingest.wait_timeout")
+                return self
+            if on_progress is not None:
+                on_progress(self.done, self.total)
+        if on_progress is not None:
+            on_progress(self.total, self.total)
+        return self
+
+class IngestionService:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queue = queue.PriorityQueue()
+        self.submitted = itertools.count()
+        self.in_flight = {}
+        self.synced_at = {}
+        self.watched = {}
+        self.threads = [
+            threading.Thread(target=self._run, name=f"ingestion-worker-{i}", daemon=True)
+            for i in range(max(1, INGEST_WORKERS))
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def _enqueue(self, job):
+        # Ties run in submission order
+        self.queue.put((job.size(), next(self.submitted), job))
+
+    def submit(self, symbols, days, interval, force=False):
+        key = (interval, days, tuple(sorted(symbols)))
+        now = time.time()
+        with self.lock:
+            self.watched[key] = now
+            job = self.in_flight.get(key)
+            if job is not None:
+                count("ingest.joined")
+                return job
+            age = now - self.synced_at.get(key, 0)
+            if age < (REFRESH_MIN_INTERVAL if force else FETCH_TTL):
+                count("ingest.hit")
+                job = IngestJob(key)
+                job.done = job.total
+                job.finished.set()
+                return job
+            job = self.in_flight[key] = IngestJob(key, force)
+        count("ingest.miss")
+        self._enqueue(job)
+        return job
+
+    def _run(self):
+        while True:
+            try:
+                _, _, job = self.queue.get(timeout=FETCH_TTL / 5)
+            except queue.Empty:
+                self._refresh_watched()
+                continue
+            interval, days, symbols = job.key
+            try:
+                job.failed = ingest_symbols(symbols, days, interval, job.progress, job.force)
+            except Exception as exc:
+                job.error = exc
+            with self.lock:
+                if job.error is None:
+                    self.synced_at[job.key] = time.time()
+                self.in_flight.pop(job.key, None)
+            job.finished.set()
+
+    def _refresh_watched(self):
+        # Keep recently viewed requests warm so sessions rarely wait on the
+        # exchange; requests nobody asked for in WATCH_WINDOW are dropped.
+        now = time.time()
+        with self.lock:
+            for key, seen in list(self.watched.items()):
+                if now - seen > WATCH_WINDOW:
+                    del self.watched[key]
+            due = [key for key in self.watched
+                   if key not in self.in_flight
+                   and now - self.synced_at.get(key, 0) >= FETCH_TTL]
+            for key in due:
+                job = self.in_flight[key] = IngestJob(key)
+                self._enqueue(job)
+
+@lru_cache(maxsize=None)
+def get_ingestion_service():
+    return IngestionService()
+
+def request_refresh(days, interval="1d", symbols=None):
+    symbols = list(symbols or crypto_symbols)
+    return get_ingestion_service().submit(symbols, days, ingest_interval(interval), force=True)
+
+def wait_for_ingest(days, interval="1d", symbols=None, on_progress=None):
+    # Blocks until the stored candles cover the request, or for at most
+    # INGEST_WAIT_TIMEOUT seconds, after which callers read what is stored
+    symbols = list(symbols or crypto_symbols)
+    with stage("fetch.wait"):
+        job = get_ingestion_service().submit(symbols, days, ingest_interval(interval))
+        job.wait(on_progress, timeout=INGEST_WAIT_TIMEOUT)
+    return symbols
+
+def fetch_binance_data(days, interval="1d", symbols=None, on_progress=None):
+    symbols = wait_for_ingest(days, interval, symbols, on_progress)
+    return load_price_panel(days, symbols, interval)
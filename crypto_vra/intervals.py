@@ -0,0 +1,32 @@
+# =====================================================
+# INTERVALS & ANNUALIZATION
+# =====================================================
+DAY_MS = 86_400_000
+INTERVAL_MS = {
+    "1m": 60_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "1h": 3_600_000,
+    "4h": 14_400_000,
+    "1d": DAY_MS,
+}
+# Intraday bars are resampled from one stored 1-minute history; daily bars
+# keep their own native store so long daily ranges stay cheap to backfill.
+BASE_INTERVAL = "1m"
+LOOKBACK_DAYS = {"1d": [30, 180, 365]}
+INTRADAY_LOOKBACK_DAYS = [1, 7, 30]
+
+# Crypto trades every day of the year, so a year is 365 daily bars
+TRADING_DAYS = 365
+
+def periods_per_year(interval="1d"):
+    return TRADING_DAYS * DAY_MS / INTERVAL_MS[interval]
+
+def ingest_interval(interval):
+    return interval if interval == "1d" else BASE_INTERVAL
+
+def lookback_options(interval):
+    return LOOKBACK_DAYS.get(interval, INTRADAY_LOOKBACK_DAYS)
+
+def bar_label(interval):
+    return "Day" if interval == "1d" else f"Bar ({interval})"
@@ -0,0 +1,195 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .intervals import periods_per_year
+from .rolling import RollingBook
+
+# =====================================================
+# LIVE STREAMING (WEBSOCKET)
+# =====================================================
+# Kline pushes from the exchange websocket land in fixed-size per-symbol
+# ring buffers and in a RollingBook, so the live view reads the latest
+# state without refetching or recomputing history. CVRA_WS_URL can point
+# the client at a local stand-in server (tools/ws_standin_server.py).
+BINANCE_WS_URL = os.environ.get("CVRA_WS_URL", "wss://stream.binance.com:9443")
+LIVE_BUFFER_SIZE = 2000
+LIVE_REFRESH_SECONDS = 1
+LIVE_IDLE_TIMEOUT = 300
+STREAMS_PER_CONNECTION = 200
+
+class PriceRingBuffer:
+
+    def __init__(self, capacity=LIVE_BUFFER_SIZE):
+        self.capacity = capacity
+        self.times = np.zeros(capacity, dtype="int64")
+        self.prices = np.zeros(capacity, dtype="float64")
+        self.head = 0
+        self.count = 0
+
+    def push(self, bar_time, price):
+        last = (self.head - 1) % self.capacity
+        if self.count and bar_time == self.times[last]:
+            self.prices[last] = price
+            return
+        if self.count and bar_time < self.times[last]:
+            return
+        self.times[self.head] = bar_time
+        self.prices[self.head] = price
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def to_frame(self):
+        idx = (self.head - self.count + np.arange(self.count)) % self.capacity
+        return pd.DataFrame({
+            "date": pd.to_datetime(self.times[idx], unit="ms"),
+            "price": self.prices[idx]
+        })
+
+def kline_stream_url(symbols, interval):
+    streams = "/".join(f"{s.lower()}@kline_{interval}" for s in symbols)
+    return f"{BINANCE_WS_URL}/stream?streams={streams}"
+
+def parse_kline_message(raw):
+    try:
+        msg = json.loads(raw)
+    except ValueError:
+        return None
+    data = msg.get("data", msg)
+    if not isinstance(data, dict) or data.get("e") != "kline":
+        return None
+    k = data["k"]
+    return data.get("s", k.get("s")), int(k["t"]), float(k["c"])
+
+class LiveKlineStream:
+
+    def __init__(self, symbols, interval, history=None):
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.buffers = {symbol: PriceRingBuffer() for symbol in self.symbols}
+        ppy = periods_per_year(interval)
+        if history is not None and not history.empty:
+            self.book = RollingBook.from_history(history, periods_per_year=ppy)
+            tail = history.sort_values("date").groupby("crypto", observed=True).tail(LIVE_BUFFER_SIZE)
+            for symbol, t, price in tail[["crypto", "date", "price"]].itertuples(index=False):
+                if symbol in self.buffers:
+                    self.buffers[symbol].push(int(pd.Timestamp(t).value // 1_000_000), price)
+        else:
+            self.book = RollingBook(periods_per_year=ppy)
+        self.lock = threading.Lock()
+        self.messages = 0
+        self.last_message = None
+        self.last_access = time.monotonic()
+        self.connected = 0
+        self.error = None
+        self._stop = threading.Event()
+        self.threads = [
+            threading.Thread(
+                target=self._run,
+                args=(self.symbols[i:i + STREAMS_PER_CONNECTION],),
+                name=f"kline-stream-{interval}-{i}",
+                daemon=True
+            )
+            for i in range(0, len(self.symbols), STREAMS_PER_CONNECTION)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def _run(self, symbols):
+        from websockets.sync.client import connect
+
+        backoff = 1
+        while not self._reap_if_idle():
+            try:
+                with connect(kline_stream_url(symbols, self.interval),
+                             open_timeout=10, close_timeout=1) as ws:
+                    with self.lock:
+                        self.connected += 1
+                        self.error = None
+                    backoff = 1
+                    try:
+                        while not self._reap_if_idle():
+                            try:
+                                raw = ws.recv(timeout=1)
+                            except TimeoutError:
+                                continue
+                            self.on_message(raw)
+                    finally:
+                        with self.lock:
+                            self.connected -= 1
+            except Exception as exc:
+                self.error = str(exc)
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 60)
+
+    def on_message(self, raw):
+        parsed = parse_kline_message(raw)
+        if parsed is None:
+            return
+        symbol, bar_time, price = parsed
+        with self.lock:
+            buffer = self.buffers.get(symbol)
+            if buffer is None:
+                return
+            buffer.push(bar_time, price)
+            self.book.update(symbol, pd.Timestamp(bar_time, unit="ms"), price)
+            self.messages += 1
+            self.last_message = time.time()
+
+    def snapshot(self, symbol):
+        with self.lock:
+            self.last_access = time.monotonic()
+            frame = self.buffers[symbol].to_frame() if symbol in self.buffers else pd.DataFrame()
+            tracker = self.book.trackers.get(symbol)
+            stats = tracker.snapshot() if tracker else {}
+            status = {
+                "connected": self.connected,
+                "messages": self.messages,
+                "lag": time.time() - self.last_message if self.last_message else None,
+                "error": self.error
+            }
+        return frame, stats, status
+
+    def touch(self):
+        with self.lock:
+            self.last_access = time.monotonic()
+
+    def _reap_if_idle(self):
+        # Checked by every connection thread at least once a second, so a
+        # stream whose viewers have all left shuts itself down
+        if not self._stop.is_set() and time.monotonic() - self.last_access > LIVE_IDLE_TIMEOUT:
+            self.stop()
+            _discard_stream(self)
+        return self._stop.is_set()
+
+    @property
+    def stopped(self):
+        return self._stop.is_set()
+
+    def stop(self):
+        self._stop.set()
+
+_live_streams = {}
+_live_streams_lock = threading.Lock()
+
+def _discard_stream(stream):
+    with _live_streams_lock:
+        key = (tuple(stream.symbols), stream.interval)
+        if _live_streams.get(key) is stream:
+            del _live_streams[key]
+
+def acquire_live_stream(symbols, interval, history=None):
+    # One stream per (universe, interval), shared by every session. Streams
+    # nobody has looked at for LIVE_IDLE_TIMEOUT seconds stop themselves
+    # (see LiveKlineStream._reap_if_idle) and are replaced on next use.
+    key = (tuple(symbols), interval)
+    with _live_streams_lock:
+        stream = _live_streams.get(key)
+        if stream is None or stream.stopped:
+            stream = _live_streams[key] = LiveKlineStream(symbols, interval, history)
+        stream.touch()
+        return stream
@@ -0,0 +1,91 @@
+import os
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from .intervals import TRADING_DAYS
+
+# =====================================================
+# COMPACT PANELS
+# =====================================================
+# Price panels are kept in their smallest faithful form: symbols as a
+# categorical (1-2 byte codes instead of one Python string per row), dates
+# as datetime64[ns], and prices as float64, or float32 when
+# CVRA_PANEL_FLOAT=float32 (half the bytes, ~7 significant digits, which is
+# plenty for returns and risk metrics). Rows stay grouped by symbol and
+# sorted by date, the layout PanelMatrix consumes without reordering, and
+# pipeline stages add columns to shallow copies, so the price data is never
+# duplicated between stages.
+PANEL_FLOAT_DTYPE = np.dtype(os.environ.get("CVRA_PANEL_FLOAT", "float64"))
+
+def symbol_dtype(symbols):
+    return pd.CategoricalDtype(sorted(symbols))
+
+def compact_panel(df, float_dtype=None, symbol_col="crypto", time_col="date", value_cols=("price",)):
+    # Converts a (date, crypto, price) frame in place of a copy where it can:
+    # columns that already have the target dtype are shared, not copied
+    float_dtype = np.dtype(float_dtype or PANEL_FLOAT_DTYPE)
+    out = df.copy(deep=False)
+    if not isinstance(out[symbol_col].dtype, pd.CategoricalDtype):
+        out[symbol_col] = out[symbol_col].astype(symbol_dtype(out[symbol_col].unique()))
+    if out[time_col].dtype != "datetime64[ns]":
+        out[time_col] = pd.to_datetime(out[time_col]).astype("datetime64[ns]")
+    for col in value_cols:
+        if col in out and out[col].dtype != float_dtype:
+            out[col] = out[col].astype(float_dtype)
+    return out
+
+# =====================================================
+# MEMORY REPORT
+# =====================================================
+def frame_bytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+def memory_report(frames):
+    # frames: {stage name: DataFrame}, in pipeline order
+    rows = []
+    for name, df in frames.items():
+        nbytes = frame_bytes(df)
+        rows.append({
+            "stage": name,
+            "rows": len(df),
+            "MB": nbytes / 2**20,
+            "bytes/row": nbytes / max(len(df), 1),
+            "dtypes": ", ".join(f"{c}:{t}" for c, t in df.dtypes.astype(str).items())
+        })
+    return pd.DataFrame(rows)
+
+def pipeline_memory(prices, ppy=TRADING_DAYS, benchmark="BTCUSDT", window=30):
+    # Runs prices -> returns -> rolling -> metrics once, recording for every
+    # stage the size of its output frame, the peak memory allocated while
+    # it ran (tracemalloc) and its wall time
+    from .metrics import add_rolling_features, build_metrics_table, compute_log_returns
+
+    stages = [
+        ("returns", lambda df: compute_log_returns(df)),
+        ("rolling", lambda df: add_rolling_features(df, window, ppy)),
+        ("metrics", lambda df: build_metrics_table(df, benchmark, ppy)),
+    ]
+    frames = {"prices": prices}
+    peaks = {"prices": np.nan}
+    seconds = {"prices": np.nan}
+    current = prices
+    for name, fn in stages:
+        tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            out = fn(current)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        seconds[name] = time.perf_counter() - start
+        peaks[name] = peak / 2**20
+        frames[name] = out
+        if name != "metrics":
+            current = out
+    report = memory_report(frames)
+    report.insert(3, "peak MB", report["stage"].map(peaks))
+    report.insert(4, "seconds", report["stage"].map(seconds))
+    return report
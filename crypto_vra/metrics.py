@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from .engine import (
+    PanelMatrix, _with_columns, beta_from_covariance, covariance_frame,
+    matrix_log_returns, matrix_rolling_mean, matrix_rolling_std
+)
+from .intervals import TRADING_DAYS
+from .volatility import compute_ewma_volatility, fit_garch, garch_volatility
+
+# =====================================================
+# HELPERS
+# =====================================================
+def calculate_volatility_simple(df, ppy=TRADING_DAYS):
+    if df.empty or len(df) < 2:
+        return 0
+    returns = df["price"].pct_change().dropna()
+    return returns.std() * np.sqrt(ppy) * 100
+
+def risk_level(vol):
+    if vol < 20:
+        return "🟢 Low Risk"
+    elif vol < 50:
+        return "🟡 Medium Risk"
+    else:
+        return "🔴 High Risk"
+
+# =====================================================
+# MILESTONE 2 FUNCTIONS
+# =====================================================
+def validate_price_data(df):
+    required_cols = {"date", "crypto", "price"}
+    return not df.empty and required_cols.issubset(df.columns)
+
+def compute_log_returns(df):
+    panel = PanelMatrix(df)
+    log_returns = matrix_log_returns(panel.matrix("price"))
+    return _with_columns(panel, log_return=panel.to_long(log_returns))
+
+def compute_volatility(returns_df, ppy=TRADING_DAYS):
+    return (returns_df.groupby("crypto")["log_return"]
+            .std() * np.sqrt(ppy) * 100).round(2)
+
+def compute_sharpe(returns_df, ppy=TRADING_DAYS):
+    mean_returns = returns_df.groupby("crypto")["log_return"].mean() * ppy
+    vol = returns_df.groupby("crypto")["log_return"].std() * np.sqrt(ppy)
+    return (mean_returns / vol).round(2)
+
+def compute_beta(returns_df, benchmark="BTCUSDT"):
+    return beta_from_covariance(covariance_frame(returns_df), benchmark).round(2)
+
+def add_rolling_features(df, window=30, ppy=TRADING_DAYS):
+    panel = PanelMatrix(df)
+    # Gathered one at a time so only one set of matrix temporaries is alive
+    ma = panel.to_long(matrix_rolling_mean(panel.matrix("price"), window))
+    vol = panel.to_long(matrix_rolling_std(panel.matrix("log_return"), window)) * float(np.sqrt(ppy) * 100)
+    return _with_columns(panel, ma_30=ma, rolling_vol_30=vol)
+
+def beta_label(benchmark):
+    return f"Beta vs {benchmark.removesuffix('USDT')}"
+
+def build_metrics_table(returns_df, benchmark="BTCUSDT", ppy=TRADING_DAYS, garch_params=None):
+    # garch_params: a fit_garch result to reuse (e.g. warm-started by the
+    # caller); fitted from scratch when omitted
+    if garch_params is None:
+        garch_params = fit_garch(returns_df)
+    metrics = pd.concat([
+        compute_volatility(returns_df, ppy),
+        compute_sharpe(returns_df, ppy),
+        compute_beta(returns_df, benchmark),
+        compute_ewma_volatility(returns_df, ppy=ppy),
+        garch_volatility(garch_params, ppy)
+    ], axis=1)
+    metrics.columns = [
+        "Volatility (%)", "Sharpe Ratio", beta_label(benchmark), "EWMA Vol (%)", "GARCH Vol (%)"
+    ]
+    return metrics.rename_axis("Crypto").reset_index()
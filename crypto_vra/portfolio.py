@@ -0,0 +1,247 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .engine import returns_matrix
+from .intervals import TRADING_DAYS
+from .profiling import count, stage
+
+# =====================================================
+# INCREMENTAL COVARIANCE
+# =====================================================
+# Pairwise sufficient statistics of a [date x symbol] returns matrix (the
+# same pairwise-complete estimator as engine.pairwise_covariance), kept per
+# universe and updated by folding in only the rows that changed since the
+# last call: new bars are added, bars that left the lookback window are
+# subtracted, and a revised last bar is swapped. Values are shifted by a
+# fixed per-symbol offset (the first mean seen) so the sum-of-products form
+# stays well conditioned.
+COV_CACHE_MAX_ENTRIES = 8
+# Full rebuilds bound the rounding drift of repeated add/subtract updates
+COV_REBUILD_EVERY = 500
+
+class CovarianceState:
+
+    def __init__(self, wide):
+        self.symbols = wide.columns
+        values = wide.to_numpy(dtype=float)
+        with np.errstate(invalid="ignore"):
+            self.shift = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(len(self.symbols))
+        k = len(self.symbols)
+        self.n = np.zeros((k, k))
+        self.sx = np.zeros((k, k))
+        self.sxy = np.zeros((k, k))
+        self.dates = wide.index[:0]
+        self.values = np.empty((0, k))
+        self.updates = 0
+        self._fold(values, 1)
+        self.dates, self.values = wide.index, values
+
+    def _fold(self, rows, sign):
+        if not len(rows):
+            return
+        mask = ~np.isnan(rows)
+        x = np.where(mask, rows - self.shift, 0.0)
+        m = mask.astype(float)
+        self.n += sign * (m.T @ m)
+        self.sx += sign * (x.T @ m)
+        self.sxy += sign * (x.T @ x)
+
+    def update(self, wide):
+        # Returns True if the statistics were updated in place, False if
+        # they had to be rebuilt (new universe or too many changes)
+        wide = wide.reindex(columns=self.symbols)
+        values = wide.to_numpy(dtype=float)
+        old_pos = pd.Index(self.dates).get_indexer(wide.index)
+        new_pos = pd.Index(wide.index).get_indexer(self.dates)
+        removed = self.values[new_pos < 0]
+        added = values[old_pos < 0]
+        both = np.flatnonzero(old_pos >= 0)
+        before, after = self.values[old_pos[both]], values[both]
+        changed = ((before != after) & ~(np.isnan(before) & np.isnan(after))).any(axis=1)
+
+        touched = len(removed) + len(added) + 2 * changed.sum()
+        self.updates += 1
+        if touched > len(values) or self.updates >= COV_REBUILD_EVERY:
+            self.__init__(wide)
+            return False
+        self._fold(removed, -1)
+        self._fold(before[changed], -1)
+        self._fold(after[changed], 1)
+        self._fold(added, 1)
+        self.dates, self.values = wide.index, values
+        return True
+
+    def mean(self):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return pd.Series(np.diag(self.sx) / np.diag(self.n) + self.shift, index=self.symbols)
+
+    def cov(self, ddof=1, min_periods=2):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = (self.sxy - self.sx * self.sx.T / self.n) / (self.n - ddof)
+        cov[self.n < max(min_periods, ddof + 1)] = np.nan
+        return pd.DataFrame(cov, index=self.symbols, columns=self.symbols)
+
+_cov_states = {}
+_cov_states_lock = threading.Lock()
+
+def cached_covariance(returns_df, key=None):
+    # Per-bar (mean, covariance) of the log returns, reusing the statistics
+    # of the previous call with the same key and symbol set
+    wide = returns_matrix(returns_df)
+    cache_key = (key, tuple(wide.columns))
+    with _cov_states_lock:
+        entry = _cov_states.get(cache_key)
+        with stage("portfolio.covariance"):
+            if entry is None:
+                state = CovarianceState(wide)
+                count("portfolio.cov.build")
+            else:
+                state = entry[0]
+                count("portfolio.cov.incremental" if state.update(wide) else "portfolio.cov.build")
+        _cov_states[cache_key] = (state, time.time())
+        while len(_cov_states) > COV_CACHE_MAX_ENTRIES:
+            oldest = min(_cov_states, key=lambda k: _cov_states[k][1])
+            del _cov_states[oldest]
+        return state.mean(), state.cov()
+
+# =====================================================
+# PORTFOLIO ANALYTICS
+# =====================================================
+# mean / cov are per-bar log-return moments (cached_covariance); results
+# are annualized with ppy. Weights are taken as given (no normalization),
+# as a dict / Series for one portfolio or a [portfolio x symbol] DataFrame
+# or array for many; batches are evaluated with one matrix product. Array
+# columns follow cov.index, including symbols that are dropped for lack of
+# a usable variance.
+OPT_MAX_ITER = 5000
+OPT_TOL = 1e-10
+FRONTIER_POINTS = 50
+
+def _weight_matrix(weights, symbols, universe):
+    # symbols: the held subset of universe (cov.index)
+    if isinstance(weights, pd.DataFrame):
+        return weights.reindex(columns=symbols).fillna(0.0).to_numpy(dtype=float)
+    if isinstance(weights, (dict, pd.Series)):
+        return pd.Series(weights, dtype=float).reindex(symbols).fillna(0.0).to_numpy()[None, :]
+    w = np.atleast_2d(np.asarray(weights, dtype=float))
+    if w.shape[1] != len(universe):
+        raise ValueError(f"weights have {w.shape[1]} columns, expected one per symbol ({len(universe)})")
+    return w[:, universe.get_indexer(symbols)]
+
+def _clean_moments(mean, cov):
+    # Symbols without a usable variance cannot be held
+    ok = np.isfinite(np.diag(cov.to_numpy())) & mean.notna().to_numpy()
+    symbols = cov.index[ok]
+    return mean[symbols].to_numpy(), cov.loc[symbols, symbols].fillna(0.0).to_numpy(), symbols
+
+def portfolio_stats(weights, mean, cov, ppy=TRADING_DAYS, risk_free=0.0):
+    mu, sigma, symbols = _clean_moments(mean, cov)
+    w = _weight_matrix(weights, symbols, cov.index)
+    ret = w @ mu * ppy
+    vol = np.sqrt(np.maximum(((w @ sigma) * w).sum(axis=1), 0) * ppy)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = (ret - risk_free) / vol
+    index = weights.index if isinstance(weights, pd.DataFrame) else None
+    return pd.DataFrame({
+        "Return (%)": ret * 100,
+        "Volatility (%)": vol * 100,
+        "Sharpe Ratio": sharpe
+    }, index=index)
+
+def risk_contributions(weights, mean, cov, ppy=TRADING_DAYS):
+    # Marginal risk d(vol)/d(w_i), component risk w_i * marginal (sums to
+    # the portfolio volatility) and each symbol's share of it
+    _, sigma, symbols = _clean_moments(mean, cov)
+    w = _weight_matrix(weights, symbols, cov.index)[0]
+    cov_w = sigma @ w
+    port_vol = np.sqrt(max(w @ cov_w, 0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        marginal = cov_w / port_vol
+    component = w * marginal
+    return pd.DataFrame({
+        "Weight (%)": w * 100,
+        "Marginal Risk (%)": marginal * np.sqrt(ppy) * 100,
+        "Risk Contribution (%)": component * np.sqrt(ppy) * 100,
+        "Risk Share (%)": component / port_vol * 100
+    }, index=symbols).rename_axis("Crypto")
+
+def _project_simplex(w):
+    # Euclidean projection of every row onto {w >= 0, sum(w) = 1}
+    u = -np.sort(-w, axis=1)
+    css = np.cumsum(u, axis=1) - 1
+    cond = u - css / np.arange(1, w.shape[1] + 1) > 0
+    rho = w.shape[1] - 1 - np.argmax(cond[:, ::-1], axis=1)
+    theta = css[np.arange(len(w)), rho] / (rho + 1)
+    return np.maximum(w - theta[:, None], 0.0)
+
+def _frontier_weights(mu, sigma, t, long_only=True):
+    # argmin w' S w - t * mu' w subject to sum(w) = 1 (and w >= 0), one row
+    # per risk tolerance t. Long-only rows are solved together by
+    # accelerated projected gradient; otherwise in closed form.
+    k = len(mu)
+    if not long_only:
+        inv = np.linalg.pinv(sigma)
+        ones = np.ones(k)
+        w_mv = inv @ ones / (ones @ inv @ ones)
+        tilt = inv @ mu - (ones @ inv @ mu) * w_mv
+        return w_mv[None, :] + (t[:, None] / 2) * tilt[None, :]
+
+    step = 1 / (2 * max(np.linalg.eigvalsh(sigma)[-1], 1e-300))
+    w = np.full((len(t), k), 1 / k)
+    y, s = w.copy(), 1.0
+    for _ in range(OPT_MAX_ITER):
+        w_next = _project_simplex(y - step * (2 * y @ sigma - t[:, None] * mu[None, :]))
+        s_next = (1 + np.sqrt(1 + 4 * s * s)) / 2
+        y = w_next + ((s - 1) / s_next) * (w_next - w)
+        done = np.abs(w_next - w).max() < OPT_TOL
+        w, s = w_next, s_next
+        if done:
+            break
+    return w
+
+def _tolerance_grid(mu, sigma, n_points):
+    # Risk tolerances from the minimum-variance portfolio (t = 0) up to
+    # where the return term dominates the covariance
+    spread = np.ptp(mu) if len(mu) > 1 else abs(mu).max()
+    scale = 2 * np.linalg.eigvalsh(sigma)[-1] / max(spread, 1e-300)
+    return np.concatenate(([0.0], np.geomspace(1e-3, 10, n_points - 1) * scale))
+
+def min_variance_weights(mean, cov, long_only=True):
+    mu, sigma, symbols = _clean_moments(mean, cov)
+    return pd.Series(_frontier_weights(mu, sigma, np.zeros(1), long_only)[0], index=symbols)
+
+def efficient_frontier(mean, cov, n_points=FRONTIER_POINTS, long_only=True, ppy=TRADING_DAYS,
+                       risk_free=0.0):
+    # One row per frontier portfolio: annualized return / volatility /
+    # Sharpe plus the weights, sorted by volatility
+    mu, sigma, symbols = _clean_moments(mean, cov)
+    with stage("portfolio.frontier"):
+        w = _frontier_weights(mu, sigma, _tolerance_grid(mu, sigma, n_points), long_only)
+    weights = pd.DataFrame(w, columns=symbols)
+    stats = portfolio_stats(weights, mean, cov, ppy, risk_free)
+    frontier = pd.concat([stats, weights], axis=1)
+    return frontier.sort_values("Volatility (%)").drop_duplicates(subset=list(stats.columns)).reset_index(drop=True)
+
+def max_sharpe_weights(mean, cov, long_only=True, ppy=TRADING_DAYS, risk_free=0.0,
+                       n_points=FRONTIER_POINTS):
+    # Best Sharpe ratio on a frontier grid, refined on a finer grid between
+    # the neighbours of the best point
+    mu, sigma, symbols = _clean_moments(mean, cov)
+    excess = mu - risk_free / ppy
+    grid = _tolerance_grid(mu, sigma, n_points)
+    for _ in range(2):
+        w = _frontier_weights(mu, sigma, grid, long_only)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = (w @ excess) / np.sqrt(((w @ sigma) * w).sum(axis=1))
+        best = int(np.nanargmax(sharpe)) if np.isfinite(sharpe).any() else 0
+        lo, hi = grid[max(best - 1, 0)], grid[min(best + 1, len(grid) - 1)]
+        grid = np.linspace(lo, hi, n_points)
+    return pd.Series(w[best], index=symbols)
+
+def random_portfolios(symbols, n=5000, seed=0):
+    # Long-only candidate weightings, uniform on the simplex
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(rng.dirichlet(np.ones(len(symbols)), n), columns=symbols)
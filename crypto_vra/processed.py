@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+from .engine import (
+    PanelMatrix, _with_columns, matrix_rolling_mean, matrix_rolling_std,
+    matrix_sharpe, matrix_simple_returns
+)
+from .intervals import TRADING_DAYS
+
+# =====================================================
+# MILESTONE 3 FUNCTIONS
+# =====================================================
+PROCESSED_COLUMNS = ["Date", "Crypto", "Close", "Returns", "Volatility", "Sharpe_Ratio"]
+
+def build_processed(price_df, window=30, ppy=TRADING_DAYS):
+    if price_df.empty:
+        return pd.DataFrame()
+    df = price_df.rename(columns={"date": "Date", "price": "Close", "crypto": "Crypto"})
+    panel = PanelMatrix(df, symbol_col="Crypto", time_col="Date")
+    returns = matrix_simple_returns(panel.matrix("Close"))
+    # Rolling volatility and Sharpe
+    roll_std = matrix_rolling_std(returns, window)
+    roll_mean = matrix_rolling_mean(returns, window)
+    df = _with_columns(
+        panel,
+        Returns=panel.to_long(returns),
+        Volatility=panel.to_long(roll_std * np.sqrt(ppy)),
+        Sharpe_Ratio=panel.to_long(matrix_sharpe(roll_mean, roll_std, ppy))
+    ).reset_index(drop=True)
+    return df[PROCESSED_COLUMNS]
+
+# Per-symbol sorted datetime64 index with prefix sums of the KPI columns.
+# Rows are grouped by symbol and sorted by time, so a symbol's date range
+# is two binary searches inside its block, and the sum / count / sum of
+# squares over that range are differences of the global prefix arrays.
+# Range means and stds therefore cost O(log n) per symbol, however long
+# the history is. NaNs are skipped, matching pandas mean()/std().
+class RangeIndex:
+
+    def __init__(self, df, symbol_col="Crypto", time_col="Date", value_cols=(), squared_cols=()):
+        codes, symbols = pd.factorize(df[symbol_col], sort=True)
+        times = df[time_col].to_numpy(dtype="datetime64[ns]")
+        order = np.lexsort((times, codes))
+        self.frame = df.iloc[order].reset_index(drop=True)
+        self.times = times[order]
+        self.symbols = list(symbols)
+        self.codes = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.offsets = np.searchsorted(codes[order], np.arange(len(self.symbols) + 1))
+
+        self.sums, self.sq_sums, self.counts = {}, {}, {}
+        for col in set(value_cols) | set(squared_cols):
+            values = self.frame[col].to_numpy(dtype=float)
+            valid = ~np.isnan(values)
+            values = np.where(valid, values, 0.0)
+            self.sums[col] = np.concatenate(([0.0], np.cumsum(values)))
+            self.counts[col] = np.concatenate(([0], np.cumsum(valid)))
+            if col in squared_cols:
+                self.sq_sums[col] = np.concatenate(([0.0], np.cumsum(values * values)))
+
+    @property
+    def empty(self):
+        return len(self.times) == 0
+
+    def time_span(self):
+        return pd.Timestamp(self.times.min()), pd.Timestamp(self.times.max())
+
+    def bounds(self, symbols, start, end):
+        # [lo, hi) row ranges for each symbol with start <= time < end
+        start = np.datetime64(pd.Timestamp(start), "ns")
+        end = np.datetime64(pd.Timestamp(end), "ns")
+        lo = np.empty(len(symbols), dtype=np.int64)
+        hi = np.empty(len(symbols), dtype=np.int64)
+        for i, symbol in enumerate(symbols):
+            code = self.codes[symbol]
+            a, b = self.offsets[code], self.offsets[code + 1]
+            block = self.times[a:b]
+            lo[i] = a + np.searchsorted(block, start, side="left")
+            hi[i] = a + np.searchsorted(block, end, side="left")
+        return lo, hi
+
+    def rows(self, lo, hi):
+        if not len(lo):
+            return self.frame.iloc[:0]
+        idx = np.concatenate([np.arange(l, h) for l, h in zip(lo, hi)])
+        return self.frame.iloc[idx]
+
+    def _moments(self, col, lo, hi):
+        n = (self.counts[col][hi] - self.counts[col][lo]).astype(float)
+        total = self.sums[col][hi] - self.sums[col][lo]
+        return n, total
+
+    def mean(self, col, lo, hi):
+        n, total = self._moments(col, lo, hi)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(n > 0, total / n, np.nan)
+
+    def std(self, col, lo, hi, ddof=1):
+        n, total = self._moments(col, lo, hi)
+        sq = self.sq_sums[col][hi] - self.sq_sums[col][lo]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            var = (sq - total * total / n) / (n - ddof)
+        return np.where(n > ddof, np.sqrt(np.clip(var, 0.0, None)), np.nan)
@@ -0,0 +1,210 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# =====================================================
+# STAGE TIMING & COUNTERS
+# =====================================================
+# Library code wraps its expensive steps in stage() and bumps count() for
+# cache hits/misses. Totals always go to the process-wide registry (served
+# as Prometheus text by start_metrics_server); when the calling thread has
+# an active RunRecorder, i.e. inside one Streamlit rerun, the same events
+# are also kept per run for the admin panel and the structured run log.
+METRICS_LOG_PATH = os.environ.get("CVRA_METRICS_LOG")
+METRICS_PORT = int(os.environ.get("CVRA_METRICS_PORT", "0"))
+PROFILE_TOP_N = 40
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.timings = {}
+        self.gauges = {}
+        self.collectors = []
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, seconds):
+        with self.lock:
+            calls, total, worst = self.timings.get(name, (0, 0.0, 0.0))
+            self.timings[name] = (calls + 1, total + seconds, max(worst, seconds))
+
+    def gauge(self, name, value):
+        with self.lock:
+            self.gauges[name] = value
+
+    def add_collector(self, fn):
+        # fn() -> iterable of (name, labels dict, value), read at scrape time
+        self.collectors.append(fn)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "timings": {
+                    name: {"calls": calls, "total_s": total, "max_s": worst}
+                    for name, (calls, total, worst) in self.timings.items()
+                },
+                "gauges": dict(self.gauges),
+            }
+
+    def prometheus_text(self):
+        def metric(name):
+            return "cvra_" + "".join(c if c.isalnum() else "_" for c in name)
+
+        def labels(items):
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in sorted(items.items())) + "}"
+
+        snap = self.snapshot()
+        lines = []
+        for name, value in sorted(snap["counters"].items()):
+            lines.append(f"{metric(name)}_total {value}")
+        for name, t in sorted(snap["timings"].items()):
+            lines.append(f"{metric(name)}_seconds_count {t['calls']}")
+            lines.append(f"{metric(name)}_seconds_sum {t['total_s']:.6f}")
+            lines.append(f"{metric(name)}_seconds_max {t['max_s']:.6f}")
+        for name, value in sorted(snap["gauges"].items()):
+            lines.append(f"{metric(name)} {value}")
+        for collect in self.collectors:
+            for name, items, value in collect():
+                if value is not None:
+                    lines.append(f"{metric(name)}{labels(items)} {value}")
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+_local = threading.local()
+
+class RunRecorder:
+    # Stages, counter increments and frame footprints of one rerun. Stages
+    # keep their nesting depth so the panel can show them as a tree.
+
+    def __init__(self, label, profile=False):
+        self.label = label
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.stages = []
+        self.counters = {}
+        self.frames = {}
+        self.depth = 0
+        self.profile_text = None
+        self.profiler = cProfile.Profile() if profile else None
+
+    def activate(self):
+        _local.run = self
+        if self.profiler is not None:
+            self.profiler.enable()
+        return self
+
+    def finish(self):
+        if self.seconds is not None:
+            return self
+        if getattr(_local, "run", None) is self:
+            _local.run = None
+        self.seconds = time.perf_counter() - self.started
+        if self.profiler is not None:
+            self.profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self.profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+            self.profile_text = out.getvalue()
+            self.profiler = None
+        registry.observe(f"run.{self.label}", self.seconds)
+        if METRICS_LOG_PATH:
+            log_run(self, METRICS_LOG_PATH)
+        return self
+
+    def to_dict(self):
+        return {
+            "label": self.label,
+            "started_at": self.started_at,
+            "seconds": self.seconds,
+            "stages": self.stages,
+            "counters": self.counters,
+            "frames": self.frames,
+        }
+
+def current_run():
+    return getattr(_local, "run", None)
+
+@contextmanager
+def stage(name):
+    run = current_run()
+    depth = 0
+    if run is not None:
+        depth = run.depth
+        run.depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe(name, elapsed)
+        if run is not None:
+            run.depth -= 1
+            run.stages.append({"stage": name, "seconds": elapsed, "depth": depth,
+                               "offset": start - run.started})
+
+def count(name, n=1):
+    registry.count(name, n)
+    run = current_run()
+    if run is not None:
+        run.counters[name] = run.counters.get(name, 0) + n
+
+def record_frame(name, df):
+    nbytes = int(df.memory_usage(deep=True).sum())
+    registry.gauge(f"frame_bytes.{name}", nbytes)
+    run = current_run()
+    if run is not None:
+        run.frames[name] = {"rows": len(df), "bytes": nbytes}
+    return nbytes
+
+def log_run(run, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        f.write(json.dumps(run.to_dict()) + "\n")
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?")[0] == "/metrics":
+            body, ctype = registry.prometheus_text().encode(), "text/plain; version=0.0.4"
+        elif self.path.split("?")[0] == "/metrics.json":
+            body, ctype = json.dumps(registry.snapshot()).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def start_metrics_server(port=METRICS_PORT, host="127.0.0.1"):
+    # Idempotent; one scrape endpoint per process on /metrics and /metrics.json
+    global _metrics_server
+    if not port:
+        return None
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            threading.Thread(
+                target=_metrics_server.serve_forever, name="metrics-server", daemon=True
+            ).start()
+    return _metrics_server
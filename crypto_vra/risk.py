@@ -0,0 +1,227 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from .engine import PanelMatrix, matrix_rolling_mean, pairwise_covariance, returns_matrix
+from .profiling import stage
+
+# =====================================================
+# VALUE-AT-RISK / EXPECTED SHORTFALL
+# =====================================================
+# Losses are simple-return losses over `horizon` bars in % (positive =
+# loss): VaR at confidence c is the loss exceeded with probability 1 - c,
+# CVaR (expected shortfall) the average loss beyond it. Every method works
+# on the log returns from compute_log_returns:
+#   historical  - empirical quantiles of overlapping horizon-bar returns
+#   parametric  - normal log returns (closed-form lognormal VaR / CVaR)
+#   monte_carlo - correlated draws from the return covariance, normal or
+#                 Student-t, for every symbol and the portfolio at once
+RISK_CONFIDENCE = (0.95, 0.99)
+RISK_HORIZON = 1
+PORTFOLIO_LABEL = "Portfolio"
+MC_PATHS = int(os.environ.get("CVRA_MC_PATHS", "100000"))
+# Simulated values per chunk; bounds the memory of each worker
+MC_CHUNK_ELEMENTS = 2_000_000
+MC_MAX_WORKERS = int(os.environ.get("CVRA_MC_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+_normal = NormalDist()
+_norm_cdf = np.vectorize(_normal.cdf, otypes=[float])
+
+def risk_columns(method, confidence):
+    pct = f"{confidence:.1%}".replace(".0%", "%")
+    return f"{method} VaR {pct}", f"{method} CVaR {pct}"
+
+def _weight_vector(weights, symbols):
+    # Weights as a Series over `symbols` (missing = 0), normalized to sum 1
+    w = pd.Series(weights, dtype=float).reindex(symbols).fillna(0.0)
+    total = w.sum()
+    return w / total if total else w
+
+def _horizon_sum(values, horizon):
+    # Overlapping horizon-bar log returns per column
+    if horizon == 1:
+        return values
+    return matrix_rolling_mean(values, horizon) * horizon
+
+def _empirical_tail(losses, confidence):
+    # VaR / CVaR per column of a [sample x column] loss matrix (NaN ignored)
+    valid = ~np.isnan(losses)
+    out = {}
+    for c in confidence:
+        with np.errstate(invalid="ignore"):
+            var = np.nanquantile(losses, c, axis=0) if len(losses) else np.full(losses.shape[1], np.nan)
+            beyond = valid & (losses >= var[None, :])
+            es = np.where(beyond, losses, 0.0).sum(axis=0) / np.maximum(beyond.sum(axis=0), 1)
+        out[c] = (var, np.where(beyond.any(axis=0), es, np.nan))
+    return out
+
+def _tail_frame(tails, method, index):
+    columns = {}
+    for c, (var, es) in tails.items():
+        var_col, es_col = risk_columns(method, c)
+        columns[var_col] = np.asarray(var) * 100
+        columns[es_col] = np.asarray(es) * 100
+    return pd.DataFrame(columns, index=index)
+
+def _portfolio_returns(returns_df, weights, horizon):
+    # Horizon-bar simple returns of the weighted basket, on the dates where
+    # every held symbol has a return
+    wide = returns_matrix(returns_df)
+    w = _weight_vector(weights, wide.columns)
+    held = w[w != 0].index
+    log_r = wide[held].dropna().to_numpy()
+    log_r = _horizon_sum(log_r, horizon)
+    log_r = log_r[~np.isnan(log_r).any(axis=1)]
+    return np.expm1(log_r) @ w[held].to_numpy()
+
+def historical_var(returns_df, confidence=RISK_CONFIDENCE, horizon=RISK_HORIZON, weights=None):
+    panel = PanelMatrix(returns_df)
+    losses = -np.expm1(_horizon_sum(panel.matrix("log_return"), horizon))
+    table = _tail_frame(_empirical_tail(losses, confidence), "Hist", panel.symbols)
+    if weights is not None:
+        port = -_portfolio_returns(returns_df, weights, horizon)
+        row = _tail_frame(_empirical_tail(port[:, None], confidence), "Hist", [PORTFOLIO_LABEL])
+        table = pd.concat([table, row])
+    return table
+
+def _lognormal_tail(mean, std, confidence, horizon):
+    # Log return ~ N(h * mean, h * std^2); loss = 1 - exp(log return)
+    m = mean * horizon
+    s = std * np.sqrt(horizon)
+    out = {}
+    for c in confidence:
+        z = _normal.inv_cdf(1 - c)
+        var = -np.expm1(m + z * s)
+        # E[exp(X) | X < q] * P(X < q) = exp(m + s^2 / 2) * Phi(z - s)
+        es = 1 - np.exp(m + s * s / 2) * _norm_cdf(z - s) / (1 - c)
+        out[c] = (var, es)
+    return out
+
+def _moments(returns_df):
+    wide = returns_matrix(returns_df)
+    cov = pd.DataFrame(pairwise_covariance(wide.to_numpy(dtype=float)),
+                       index=wide.columns, columns=wide.columns)
+    return wide.mean(), cov
+
+def parametric_var(returns_df, confidence=RISK_CONFIDENCE, horizon=RISK_HORIZON, weights=None):
+    panel = PanelMatrix(returns_df)
+    values = panel.matrix("log_return")
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0, ddof=1)
+    table = _tail_frame(_lognormal_tail(mean, std, confidence, horizon), "Param", panel.symbols)
+    if weights is not None:
+        mean, cov = _moments(returns_df)
+        w = _weight_vector(weights, cov.index).to_numpy()
+        held = w != 0
+        c = cov.to_numpy()[np.ix_(held, held)]
+        port_mean = np.array([mean.to_numpy()[held] @ w[held]])
+        port_std = np.array([np.sqrt(w[held] @ c @ w[held])])
+        row = _tail_frame(_lognormal_tail(port_mean, port_std, confidence, horizon), "Param",
+                          [PORTFOLIO_LABEL])
+        table = pd.concat([table, row])
+    return table
+
+def _cov_factor(cov):
+    # Cholesky factor, or a PSD square root when pairwise estimates make
+    # the matrix slightly indefinite
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        vals, vecs = np.linalg.eigh(cov)
+        return vecs * np.sqrt(np.clip(vals, 0, None))
+
+def _simulate_losses(seed, n_paths, mean, factor, horizon, dof, weights):
+    # [path x column] simple-return losses of one chunk; the last column is
+    # the portfolio when weights are given
+    rng = np.random.default_rng(seed)
+    k = len(mean)
+    if dof is None:
+        # Sums of iid normal bars are normal: draw the horizon return directly
+        log_r = rng.standard_normal((n_paths, k)) @ (factor.T * np.sqrt(horizon))
+        log_r += mean * horizon
+    else:
+        # Student-t bars scaled to unit variance, summed bar by bar
+        scale = np.sqrt((dof - 2) / dof)
+        log_r = np.zeros((n_paths, k))
+        for _ in range(horizon):
+            log_r += (rng.standard_t(dof, (n_paths, k)) * scale) @ factor.T
+        log_r += mean * horizon
+    losses = -np.expm1(log_r, out=log_r)
+    if weights is not None:
+        losses = np.column_stack([losses, losses @ weights])
+    return losses
+
+def _top_losses(losses, k):
+    # k largest values of every column
+    if k <= 0:
+        return losses[:0]
+    if len(losses) <= k:
+        return losses
+    return np.partition(losses, len(losses) - k, axis=0)[-k:]
+
+def monte_carlo_var(returns_df, confidence=RISK_CONFIDENCE, horizon=RISK_HORIZON, weights=None,
+                    n_paths=MC_PATHS, seed=0, dof=None, max_workers=MC_MAX_WORKERS):
+    # Paths are simulated in chunks, each with its own child of one
+    # SeedSequence, so results depend on `seed` but not on the number of
+    # workers. Only the largest (1 - min(confidence)) * n_paths losses per
+    # column are kept between chunks: enough for exact empirical VaR and
+    # CVaR at every requested level.
+    mean, cov = _moments(returns_df)
+    ok = ~(cov.isna().all(axis=1) | mean.isna())
+    symbols = cov.index[ok]
+    mean = mean[symbols].to_numpy()
+    cov = cov.loc[symbols, symbols].fillna(0.0).to_numpy()
+    w = None if weights is None else _weight_vector(weights, symbols).to_numpy()
+    n_cols = len(symbols) + (w is not None)
+    index = list(symbols) + ([PORTFOLIO_LABEL] if w is not None else [])
+    if not len(symbols):
+        return _tail_frame({c: (np.full(n_cols, np.nan),) * 2 for c in confidence}, "MC", index)
+
+    factor = _cov_factor(cov)
+    keep = math.ceil((1 - min(confidence)) * n_paths)
+    chunk = max(1_000, MC_CHUNK_ELEMENTS // n_cols)
+    sizes = [min(chunk, n_paths - start) for start in range(0, n_paths, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    def run(job):
+        child, size = job
+        return _top_losses(_simulate_losses(child, size, mean, factor, horizon, dof, w), keep)
+
+    with stage("risk.monte_carlo"):
+        # Chunks are screened against the smallest loss still in the running
+        # top-k of each column and merged once the buffer has doubled, so the
+        # expensive partition runs a handful of times instead of per chunk.
+        floor = np.full(n_cols, -np.inf)
+        buffer, rows = [], 0
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            for part in pool.map(run, zip(seeds, sizes)):
+                part = _top_losses(part, int((part > floor).sum(axis=0).max()))
+                buffer.append(part)
+                rows += len(part)
+                if rows >= 2 * keep:
+                    tail = _top_losses(np.concatenate(buffer), keep)
+                    floor = tail.min(axis=0)
+                    buffer, rows = [tail], len(tail)
+        tail = _top_losses(np.concatenate(buffer), keep)
+        tail = -np.sort(-tail, axis=0)
+
+    tails = {}
+    for c in confidence:
+        k = max(1, math.ceil((1 - c) * n_paths))
+        tails[c] = (tail[k - 1], tail[:k].mean(axis=0))
+    return _tail_frame(tails, "MC", index)
+
+def risk_table(returns_df, confidence=RISK_CONFIDENCE, horizon=RISK_HORIZON, weights=None,
+               n_paths=MC_PATHS, seed=0, dof=None):
+    with stage("risk.historical"):
+        hist = historical_var(returns_df, confidence, horizon, weights)
+    with stage("risk.parametric"):
+        param = parametric_var(returns_df, confidence, horizon, weights)
+    mc = monte_carlo_var(returns_df, confidence, horizon, weights, n_paths, seed, dof)
+    table = pd.concat([hist, param, mc], axis=1).round(2)
+    return table.rename_axis("Crypto").reset_index()
@@ -0,0 +1,157 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from .intervals import TRADING_DAYS
+
+# =====================================================
+# INCREMENTAL ROLLING STATISTICS
+# =====================================================
+class RollingWindowStats:
+    # Fixed-size window with Welford-style running mean / sum of squared
+    # deviations. push() and pop_last() are O(1); the accumulators are
+    # re-derived from the window every `resync_every` updates so rounding
+    # error from repeated eviction cannot build up on long-running feeds.
+    # Like Series.rolling(window), results are NaN until the window is
+    # full and while it contains a missing value.
+
+    def __init__(self, window, resync_every=None):
+        self.window = window
+        self.values = deque()
+        self.count = 0
+        self.nan_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.resync_every = resync_every or 50 * window
+        self._updates = 0
+
+    def _add(self, x):
+        if np.isnan(x):
+            self.nan_count += 1
+            return
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+
+    def _remove(self, x):
+        if np.isnan(x):
+            self.nan_count -= 1
+            return
+        if self.count <= 1:
+            self.count, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        delta = x - self.mean
+        self.mean -= delta / (self.count - 1)
+        self.m2 -= delta * (x - self.mean)
+        self.count -= 1
+
+    def _resync(self):
+        self.count, self.nan_count, self.mean, self.m2 = 0, 0, 0.0, 0.0
+        for x in self.values:
+            self._add(x)
+        self._updates = 0
+
+    def push(self, x):
+        x = float(x)
+        if len(self.values) == self.window:
+            self._remove(self.values.popleft())
+        self.values.append(x)
+        self._add(x)
+        self._updates += 1
+        if self._updates >= self.resync_every:
+            self._resync()
+
+    def pop_last(self):
+        x = self.values.pop()
+        self._remove(x)
+        return x
+
+    @property
+    def ready(self):
+        return len(self.values) == self.window and self.nan_count == 0
+
+    def rolling_mean(self):
+        return self.mean if self.ready else np.nan
+
+    def rolling_std(self, ddof=1):
+        if not self.ready or self.count <= ddof:
+            return np.nan
+        return float(np.sqrt(max(self.m2, 0.0) / (self.count - ddof)))
+
+class SymbolRollingTracker:
+    # Live counterpart of add_rolling_features for one symbol. Each bar is
+    # identified by its open time: a new open time appends a bar, the same
+    # open time revises the still-open bar in place.
+
+    def __init__(self, window=30, periods_per_year=None):
+        self.window = window
+        self.periods_per_year = periods_per_year or TRADING_DAYS
+        self.prices = RollingWindowStats(window)
+        self.returns = RollingWindowStats(window)
+        self.last_time = None
+        self.last_price = np.nan
+        self.prev_price = np.nan
+
+    def update(self, bar_time, price):
+        price = float(price)
+        if self.last_time is not None and bar_time == self.last_time:
+            self.prices.pop_last()
+            self.returns.pop_last()
+        elif self.last_time is not None and bar_time < self.last_time:
+            return self.snapshot()
+        else:
+            self.prev_price = self.last_price
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_return = np.log(price / self.prev_price)
+        self.prices.push(price)
+        self.returns.push(log_return)
+        self.last_time = bar_time
+        self.last_price = price
+        return self.snapshot()
+
+    def snapshot(self):
+        mean = self.returns.rolling_mean()
+        std = self.returns.rolling_std()
+        ppy = self.periods_per_year
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sharpe = (mean * ppy) / (std * np.sqrt(ppy))
+        return {
+            "date": self.last_time,
+            "price": self.last_price,
+            "ma_30": self.prices.rolling_mean(),
+            "rolling_vol_30": std * np.sqrt(ppy) * 100,
+            "rolling_sharpe": sharpe
+        }
+
+class RollingBook:
+    # One SymbolRollingTracker per symbol, seeded from the stored history so
+    # live updates only ever touch the newest bar.
+
+    def __init__(self, window=30, periods_per_year=None):
+        self.window = window
+        self.periods_per_year = periods_per_year
+        self.trackers = {}
+
+    @classmethod
+    def from_history(cls, price_df, window=30, periods_per_year=None):
+        book = cls(window, periods_per_year)
+        seed = (price_df.sort_values(["crypto", "date"])
+                .groupby("crypto", observed=True).tail(window + 1))
+        for symbol, t, price in seed[["crypto", "date", "price"]].itertuples(index=False):
+            book.update(symbol, t, price)
+        return book
+
+    def update(self, symbol, bar_time, price):
+        tracker = self.trackers.get(symbol)
+        if tracker is None:
+            tracker = self.trackers[symbol] = SymbolRollingTracker(
+                self.window, self.periods_per_year
+            )
+        return tracker.update(bar_time, price)
+
+    def snapshot_frame(self):
+        rows = [{"crypto": symbol, **tracker.snapshot()}
+                for symbol, tracker in self.trackers.items()]
+        return pd.DataFrame(rows)
@@ -0,0 +1,178 @@
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from .profiling import stage
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# =====================================================
+# COLUMNAR STORE (PARQUET, PARTITIONED BY SYMBOL / MONTH)
+# =====================================================
+# Layout: <root>/<SYMBOL>/<YYYY-MM>.parquet. Readers only open the
+# partitions that overlap the requested symbols and time range, and get
+# typed columns back without any text parsing.
+DATA_DIR = os.environ.get("CVRA_DATA_DIR", "data")
+CANDLE_STORE_DIR = os.path.join(DATA_DIR, "candles")
+
+# Max number of symbols fetched or read in parallel
+FETCH_MAX_WORKERS = int(os.environ.get("CVRA_FETCH_WORKERS", "8"))
+
+def write_atomic(path, write_fn):
+    # Write to a private temp file next to the target, then swap it in, so
+    # readers never observe a half-written file.
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    try:
+        write_fn(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def write_json_atomic(path, obj):
+    # Manifests, indexes and state files: readers always see a whole document
+    def _dump(tmp):
+        with open(tmp, "w") as f:
+            json.dump(obj, f, indent=2, sort_keys=True)
+    write_atomic(path, _dump)
+
+def to_datetime64(times):
+    if pd.api.types.is_integer_dtype(times):
+        return pd.to_datetime(times, unit="ms")
+    return pd.to_datetime(times)
+
+def month_key(ts):
+    if isinstance(ts, (int, np.integer)):
+        ts = pd.Timestamp(int(ts), unit="ms")
+    return pd.Timestamp(ts).strftime("%Y-%m")
+
+def month_keys(times):
+    return to_datetime64(times).to_numpy().astype("datetime64[M]").astype(str)
+
+def partition_files(root, symbol, start=None, end=None):
+    sym_dir = os.path.join(root, symbol)
+    if not os.path.isdir(sym_dir):
+        return []
+    lo = month_key(start) if start is not None else None
+    hi = month_key(end) if end is not None else None
+    files = []
+    for name in sorted(os.listdir(sym_dir)):
+        if not name.endswith(".parquet"):
+            continue
+        month = name[:-len(".parquet")]
+        if (lo and month < lo) or (hi and month > hi):
+            continue
+        files.append(os.path.join(sym_dir, name))
+    return files
+
+def dataset_symbols(root):
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name for name in os.listdir(root)
+        if os.path.isdir(os.path.join(root, name))
+    )
+
+def read_partitions(root, symbols=None, start=None, end=None, time_col="open_time",
+                    columns=None, symbol_col=None):
+    # start/end are inclusive and use the same units as `time_col`
+    # (epoch ms for candles, datetime64 for derived datasets).
+    symbols = dataset_symbols(root) if symbols is None else symbols
+    # One shared categorical dtype, so the concatenated symbol column stays
+    # categorical (small integer codes) instead of a string per row
+    symbol_dtype = pd.CategoricalDtype(sorted(set(symbols)))
+
+    def read_symbol(symbol):
+        parts = []
+        code = symbol_dtype.categories.get_loc(symbol)
+        for path in partition_files(root, symbol, start, end):
+            part = pd.read_parquet(path, columns=columns)
+            if start is not None:
+                part = part[part[time_col] >= start]
+            if end is not None:
+                part = part[part[time_col] <= end]
+            if symbol_col:
+                part[symbol_col] = pd.Categorical.from_codes(
+                    np.full(len(part), code), dtype=symbol_dtype
+                )
+            parts.append(part)
+        return parts
+
+    with stage("store.read"):
+        # Parquet decoding releases the GIL, so large universes are read in parallel
+        if len(symbols) > 1:
+            workers = max(1, min(FETCH_MAX_WORKERS, len(symbols)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                frames = [part for parts in pool.map(read_symbol, symbols) for part in parts]
+        else:
+            frames = [part for symbol in symbols for part in read_symbol(symbol)]
+
+        if not frames:
+            return pd.DataFrame(columns=columns) if columns else pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+def write_partitions(root, symbol, df, time_col="open_time"):
+    # Merge `df` into the symbol's partitions, touching only the months that
+    # `df` covers. Rows are deduplicated on `time_col`, newest wins.
+    if df.empty:
+        return
+    with stage("store.write"):
+        keys = month_keys(df[time_col])
+        for month in np.unique(keys):
+            path = os.path.join(root, symbol, f"{month}.parquet")
+            rows = df[keys == month]
+            if os.path.exists(path):
+                rows = pd.concat([pd.read_parquet(path), rows], ignore_index=True)
+            rows = (rows.drop_duplicates(time_col, keep="last")
+                    .sort_values(time_col)
+                    .reset_index(drop=True))
+            write_atomic(path, lambda tmp: rows.to_parquet(tmp, index=False))
+
+def write_dataset(root, df, symbol_col, time_col):
+    # Full rewrite of a derived dataset: build it beside the old one and
+    # swap directories so readers see either the old or the new version.
+    tmp_root = f"{root}.tmp-{os.getpid()}-{threading.get_ident()}"
+    shutil.rmtree(tmp_root, ignore_errors=True)
+    for symbol, part in df.groupby(symbol_col, sort=False, observed=True):
+        write_partitions(tmp_root, symbol, part.drop(columns=symbol_col), time_col)
+    os.makedirs(tmp_root, exist_ok=True)
+    old_root = f"{root}.old-{os.getpid()}-{threading.get_ident()}"
+    if os.path.exists(root):
+        os.replace(root, old_root)
+    os.replace(tmp_root, root)
+    shutil.rmtree(old_root, ignore_errors=True)
+
+@contextmanager
+def interprocess_lock(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,275 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from .engine import PanelMatrix, _with_columns
+from .intervals import TRADING_DAYS
+from .store import DATA_DIR, write_json_atomic
+
+# =====================================================
+# EWMA (RISKMETRICS) VOLATILITY
+# =====================================================
+# sigma2_t = lam * sigma2_{t-1} + (1 - lam) * r_t^2, evaluated for every
+# symbol at once on the [bar x symbol] returns matrix. The value at bar t
+# already includes r_t, i.e. it is the variance forecast for bar t + 1.
+EWMA_LAMBDA = 0.94
+EWMA_MIN_PERIODS = 20
+
+def ewma_variance_matrix(values, lam=EWMA_LAMBDA, min_periods=EWMA_MIN_PERIODS):
+    return (pd.DataFrame(values * values)
+            .ewm(alpha=1 - lam, adjust=False, ignore_na=True, min_periods=min_periods)
+            .mean()
+            .to_numpy())
+
+def _last_valid(values):
+    # Last non-NaN entry of every column (NaN if the column is empty)
+    valid = ~np.isnan(values)
+    if not len(values):
+        return np.full(values.shape[1], np.nan)
+    last = np.where(valid.any(axis=0), values.shape[0] - 1 - np.argmax(valid[::-1], axis=0), 0)
+    out = values[last, np.arange(values.shape[1])]
+    out[~valid.any(axis=0)] = np.nan
+    return out
+
+def add_ewma_volatility(df, lam=EWMA_LAMBDA, ppy=TRADING_DAYS):
+    panel = PanelMatrix(df)
+    var = ewma_variance_matrix(panel.matrix("log_return"), lam)
+    return _with_columns(panel, ewma_vol=panel.to_long(np.sqrt(var * ppy) * 100))
+
+def compute_ewma_volatility(returns_df, lam=EWMA_LAMBDA, ppy=TRADING_DAYS):
+    panel = PanelMatrix(returns_df)
+    var = _last_valid(ewma_variance_matrix(panel.matrix("log_return"), lam))
+    return pd.Series(np.sqrt(var * ppy) * 100, index=panel.symbols).round(2)
+
+# =====================================================
+# GARCH(1,1)
+# =====================================================
+# sigma2_t = omega + alpha * r_{t-1}^2 + beta * sigma2_{t-1} on demeaned log
+# returns, fitted by Gaussian maximum likelihood for every symbol at once.
+# omega is pinned by variance targeting (omega = var * (1 - alpha - beta)),
+# which leaves two parameters, searched in (alpha, persistence) space: a
+# coarse grid, then a per-symbol pattern search that halves its step
+# whenever no neighbour improves. Every candidate is a column of one
+# [bar x (candidate, symbol)] recursion, so the cost is one NumPy pass per
+# bar regardless of how many symbols are fitted. Previous estimates can be
+# passed as warm_start to skip the grid and start with small steps. Only
+# each symbol's most recent GARCH_MAX_BARS bars enter the likelihood, which
+# bounds the cost of a refit on long intraday histories.
+GARCH_MIN_OBS = 100
+GARCH_MAX_BARS = int(os.environ.get("CVRA_GARCH_MAX_BARS", "5000"))
+GARCH_MAX_PERSISTENCE = 0.999
+GARCH_GRID_ALPHA = (0.02, 0.05, 0.08, 0.12, 0.18, 0.25)
+GARCH_GRID_PERSISTENCE = (0.85, 0.92, 0.96, 0.98, 0.99, 0.995)
+GARCH_SEARCH_ROUNDS = 14
+GARCH_WARM_ROUNDS = 8
+GARCH_PARAMS_DIR = os.path.join(DATA_DIR, "models")
+
+def _recent_bars(values, n):
+    # Last n rows of every column, right-aligned: columns are padded with
+    # NaN at the end, so each symbol's tail starts at a different row
+    valid = ~np.isnan(values)
+    length = np.where(valid.any(axis=0), values.shape[0] - np.argmax(valid[::-1], axis=0), 0)
+    n = min(n, int(length.max()) if len(length) else 0)
+    rows = np.arange(n)[:, None] + (length - n)[None, :]
+    out = values[np.clip(rows, 0, None), np.arange(values.shape[1])[None, :]]
+    out[rows < 0] = np.nan
+    return out
+
+def _garch_inputs(values):
+    # The likelihood is accumulated over thousands of bars: always float64
+    values = values.astype(np.float64, copy=False)
+    mask = ~np.isnan(values)
+    counts = mask.sum(axis=0)
+    mean = np.where(mask, values, 0.0).sum(axis=0) / np.maximum(counts, 1)
+    resid = np.where(mask, values - mean, 0.0)
+    r2 = resid * resid
+    var = r2.sum(axis=0) / np.maximum(counts - 1, 1)
+    return r2, mask, var, counts
+
+def _garch_recursion(r2, mask, var0, omega, alpha, beta, loglik=True):
+    # Candidates are (k, symbol) arrays; missing bars leave sigma2 unchanged
+    # and add nothing to the likelihood. Returns (mean log-likelihood per
+    # bar, sigma2 forecast for the bar after the last one).
+    sigma2 = np.broadcast_to(var0, omega.shape).copy()
+    ll = np.zeros(omega.shape)
+    tmp = np.empty(omega.shape)
+    complete = mask.all(axis=1)
+    for t in range(r2.shape[0]):
+        x = r2[t]
+        if complete[t]:
+            # Common case, every symbol has a bar: update in place
+            if loglik:
+                np.log(sigma2, out=tmp)
+                ll -= tmp
+                np.divide(x, sigma2, out=tmp)
+                ll -= tmp
+            sigma2 *= beta
+            sigma2 += omega
+            np.multiply(alpha, x, out=tmp)
+            sigma2 += tmp
+        else:
+            m = mask[t]
+            if loglik:
+                ll -= np.where(m, np.log(sigma2) + x / sigma2, 0.0)
+            sigma2 = np.where(m, omega + alpha * x + beta * sigma2, sigma2)
+    n = np.maximum(mask.sum(axis=0), 1)
+    return 0.5 * ll / n, sigma2
+
+def _feasible(alpha, persistence):
+    alpha = np.clip(alpha, 1e-4, 0.5)
+    persistence = np.clip(persistence, alpha, GARCH_MAX_PERSISTENCE)
+    return alpha, persistence
+
+def _evaluate(r2, mask, var, alpha, persistence):
+    alpha, persistence = _feasible(alpha, persistence)
+    omega = var * (1 - persistence)
+    ll, _ = _garch_recursion(r2, mask, var, omega, alpha, persistence - alpha)
+    return alpha, persistence, ll
+
+def garch_fit_matrix(values, warm_start=None):
+    # values: [bar x symbol] log returns. warm_start: optional (alpha,
+    # persistence) arrays, NaN where a symbol has no previous estimate.
+    r2, mask, var, counts = _garch_inputs(_recent_bars(values, GARCH_MAX_BARS))
+    n_symbols = values.shape[1]
+    alpha = np.full(n_symbols, np.nan)
+    persistence = np.full(n_symbols, np.nan)
+    if warm_start is not None:
+        alpha[:], persistence[:] = warm_start
+    cold = np.isnan(alpha) | np.isnan(persistence)
+
+    if cold.any():
+        grid_a, grid_p = np.meshgrid(GARCH_GRID_ALPHA, GARCH_GRID_PERSISTENCE)
+        keep = grid_a.ravel() < grid_p.ravel()
+        grid_a, grid_p = grid_a.ravel()[keep], grid_p.ravel()[keep]
+        cols = np.flatnonzero(cold)
+        _, _, ll = _evaluate(
+            r2[:, cols], mask[:, cols], var[cols],
+            np.repeat(grid_a[:, None], len(cols), axis=1),
+            np.repeat(grid_p[:, None], len(cols), axis=1)
+        )
+        best = np.argmax(ll, axis=0)
+        alpha[cols], persistence[cols] = grid_a[best], grid_p[best]
+        step_a = np.where(cold, 0.04, 0.01)
+        step_p = np.where(cold, 0.02, 0.005)
+        rounds = GARCH_SEARCH_ROUNDS
+    else:
+        step_a = np.full(n_symbols, 0.01)
+        step_p = np.full(n_symbols, 0.005)
+        rounds = GARCH_WARM_ROUNDS
+
+    alpha, persistence, best_ll = _evaluate(r2, mask, var, alpha[None, :], persistence[None, :])
+    alpha, persistence, best_ll = alpha[0], persistence[0], best_ll[0]
+    # Pattern search: the four axis neighbours of every symbol's current
+    # point are scored in one recursion; moves are taken only if they help.
+    moves = np.array([[1, 0], [-1, 0], [0, 1], [0, -1]], dtype=float)
+    for _ in range(rounds):
+        cand_a = alpha[None, :] + moves[:, :1] * step_a[None, :]
+        cand_p = persistence[None, :] + moves[:, 1:] * step_p[None, :]
+        cand_a, cand_p, ll = _evaluate(r2, mask, var, cand_a, cand_p)
+        best = np.argmax(ll, axis=0)
+        cols = np.arange(n_symbols)
+        improved = ll[best, cols] > best_ll + 1e-10
+        alpha = np.where(improved, cand_a[best, cols], alpha)
+        persistence = np.where(improved, cand_p[best, cols], persistence)
+        best_ll = np.where(improved, ll[best, cols], best_ll)
+        step_a = np.where(improved, step_a, step_a / 2)
+        step_p = np.where(improved, step_p, step_p / 2)
+
+    omega = var * (1 - persistence)
+    _, next_var = _garch_recursion(
+        r2, mask, var, omega[None, :], alpha[None, :], (persistence - alpha)[None, :], loglik=False
+    )
+    fitted = counts >= GARCH_MIN_OBS
+    out = {
+        "omega": omega,
+        "alpha": alpha,
+        "beta": persistence - alpha,
+        "persistence": persistence,
+        "long_run_var": var,
+        "next_var": next_var[0],
+        "loglik": best_ll,
+        "n_obs": counts,
+    }
+    for key in ("omega", "alpha", "beta", "persistence", "next_var", "loglik"):
+        out[key] = np.where(fitted, out[key], np.nan)
+    return out
+
+def fit_garch(returns_df, warm_start=None):
+    # Returns one row of GARCH(1,1) estimates per symbol. warm_start is a
+    # previous result (or load_garch_params output) indexed by symbol.
+    panel = PanelMatrix(returns_df)
+    start = None
+    if warm_start is not None and len(warm_start):
+        prev = warm_start.reindex(panel.symbols)
+        start = (prev["alpha"].to_numpy(dtype=float), prev["persistence"].to_numpy(dtype=float))
+    fit = garch_fit_matrix(panel.matrix("log_return"), start)
+    return pd.DataFrame(fit, index=panel.symbols)
+
+def garch_volatility(params, ppy=TRADING_DAYS):
+    # Annualized one-step-ahead GARCH volatility in %
+    return (np.sqrt(params["next_var"] * ppy) * 100).round(2).rename(None)
+
+def garch_forecast(params, horizon=30, ppy=TRADING_DAYS):
+    # sigma2_{T+h} = var + p^(h-1) * (sigma2_{T+1} - var), annualized in %
+    steps = np.arange(1, horizon + 1)
+    decay = params["persistence"].to_numpy()[None, :] ** (steps[:, None] - 1)
+    var = params["long_run_var"].to_numpy()[None, :]
+    sigma2 = var + decay * (params["next_var"].to_numpy()[None, :] - var)
+    out = pd.DataFrame(np.sqrt(sigma2 * ppy) * 100, index=pd.Index(steps, name="step"),
+                       columns=params.index)
+    return out.melt(ignore_index=False, var_name="crypto", value_name="garch_vol").reset_index()
+
+def garch_conditional_volatility(returns_df, params, ppy=TRADING_DAYS):
+    # In-sample sigma_t per bar (the forecast made at t - 1), as a column
+    panel = PanelMatrix(returns_df)
+    p = params.reindex(panel.symbols)
+    r2, mask, var, _ = _garch_inputs(panel.matrix("log_return"))
+    omega = p["omega"].to_numpy()
+    alpha = p["alpha"].to_numpy()
+    beta = p["beta"].to_numpy()
+    sigma2 = var.copy()
+    out = np.full(r2.shape, np.nan)
+    for t in range(r2.shape[0]):
+        out[t] = np.where(mask[t], sigma2, np.nan)
+        sigma2 = np.where(mask[t], omega + alpha * r2[t] + beta * sigma2, sigma2)
+    return _with_columns(panel, garch_vol=panel.to_long(np.sqrt(out * ppy) * 100))
+
+def garch_params_path(interval):
+    return os.path.join(GARCH_PARAMS_DIR, f"garch_{interval}.json")
+
+def load_garch_params(interval):
+    path = garch_params_path(interval)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            stored = json.load(f)
+    except Exception:
+        return None
+    return pd.DataFrame.from_dict(stored, orient="index")
+
+def save_garch_params(interval, params):
+    # Only the search coordinates are kept; they seed the next refresh.
+    # Symbols missing from this fit keep their previous entry.
+    fitted = params.dropna(subset=["alpha", "persistence"])[["alpha", "persistence"]].copy()
+    fitted["fitted_at"] = time.time()
+    previous = load_garch_params(interval)
+    if previous is not None:
+        fitted = pd.concat([previous.drop(fitted.index, errors="ignore"), fitted])
+    stored = {
+        symbol: {"alpha": float(row.alpha), "persistence": float(row.persistence),
+                 "fitted_at": float(row.fitted_at)}
+        for symbol, row in fitted.iterrows()
+    }
+    write_json_atomic(garch_params_path(interval), stored)
+
+def fit_garch_warm(returns_df, interval):
+    params = fit_garch(returns_df, load_garch_params(interval))
+    try:
+        save_garch_params(interval, params)
+    except OSError:
+        pass
+    return params
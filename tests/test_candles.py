@@ -0,0 +1,44 @@
+from crypto_vra import candles
+from crypto_vra.intervals import INTERVAL_MS
+
+
+def fake_exchange(fail_calls=()):
+    # request_klines stand-in serving every bar of the range; the calls
+    # numbered in fail_calls fail like a network error
+    calls = []
+
+    def request_klines(session, symbol, interval, start_time=None, end_time=None,
+                       limit=candles.KLINE_PAGE_LIMIT):
+        calls.append((start_time, end_time))
+        if len(calls) in fail_calls:
+            return None
+        step = INTERVAL_MS[interval]
+        stop = min(end_time, start_time + (limit - 1) * step)
+        return [[t, "1", "1", "1", "1", "1"] for t in range(start_time, stop + 1, step)]
+
+    return request_klines, calls
+
+
+def test_backfill_with_a_failed_page_keeps_coverage(tmp_path, monkeypatch):
+    monkeypatch.setattr(candles, "candle_root", lambda interval="1d": str(tmp_path / interval))
+    step = INTERVAL_MS["1m"]
+    covered_from = candles.window_start_ms(3, "1m") + 2500 * step
+    entry = {"covered_from": covered_from, "last_open_time": covered_from + 100 * step}
+
+    # The second backfill page fails: the bars before covered_from are
+    # still incomplete, so coverage must not move back
+    request_klines, calls = fake_exchange(fail_calls=(2,))
+    monkeypatch.setattr(candles, "request_klines", request_klines)
+    entry = candles.sync_symbol(None, "BTCUSDT", 3, entry, "1m")
+    assert entry["covered_from"] == covered_from
+
+    # The next sync retries the backfill and closes the gap
+    request_klines, calls = fake_exchange()
+    monkeypatch.setattr(candles, "request_klines", request_klines)
+    entry = candles.sync_symbol(None, "BTCUSDT", 3, entry, "1m")
+    assert calls[0][1] == covered_from - step
+    assert entry["covered_from"] < covered_from
+    stored = candles.read_candles("BTCUSDT", "1m", start=entry["covered_from"])
+    backfilled = stored["open_time"][stored["open_time"] < covered_from]
+    assert backfilled.iloc[-1] == covered_from - step
+    assert (backfilled.diff().dropna() == step).all()
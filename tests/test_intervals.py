@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crypto_vra.intervals import TRADING_DAYS, periods_per_year
+from crypto_vra.metrics import compute_volatility
+
+# Annualization counts every calendar day (crypto trades 365 days a year);
+# before intervals were configurable it used 252 trading days, so daily
+# volatility and Sharpe figures were scaled by sqrt(252) instead of sqrt(365)
+
+
+@pytest.mark.parametrize("interval, periods", [
+    ("1d", 365),
+    ("4h", 365 * 6),
+    ("1h", 365 * 24),
+    ("15m", 365 * 96),
+    ("5m", 365 * 288),
+    ("1m", 365 * 1440),
+])
+def test_periods_per_year(interval, periods):
+    assert periods_per_year(interval) == periods
+
+
+def test_daily_volatility_is_annualized_over_365_days():
+    assert TRADING_DAYS == 365
+    returns = pd.DataFrame({"crypto": "BTCUSDT", "log_return": [0.01, -0.01] * 50})
+    daily_std = returns["log_return"].std()
+    assert compute_volatility(returns)["BTCUSDT"] == round(daily_std * np.sqrt(365) * 100, 2)
@@ -0,0 +1,49 @@
+import importlib.util
+import os
+import threading
+import time
+
+import numpy as np
+
+from crypto_vra import live
+
+STANDIN_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tools", "ws_standin_server.py"
+)
+
+
+def load_standin():
+    spec = importlib.util.spec_from_file_location("ws_standin_server", STANDIN_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_stream_from_the_standin_server(monkeypatch):
+    # One 1m bar closes every 0.02 s of real time
+    standin = load_standin()
+    server = standin.make_server("127.0.0.1", 0, tick_seconds=0.01, speed=3000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.socket.getsockname()[1]
+    monkeypatch.setattr(live, "BINANCE_WS_URL", f"ws://127.0.0.1:{port}")
+
+    symbols = ["BTCUSDT", "ETHUSDT"]
+    stream = live.LiveKlineStream(symbols, "1m")
+    try:
+        deadline = time.monotonic() + 20
+        while time.monotonic() < deadline:
+            if all(stream.buffers[s].count > 40 for s in symbols):
+                break
+            time.sleep(0.05)
+        for symbol in symbols:
+            frame, stats, status = stream.snapshot(symbol)
+            assert len(frame) > 40
+            assert frame["date"].is_monotonic_increasing and frame["date"].is_unique
+            # The book follows the buffer bar for bar and has a full window
+            assert stats["date"] == frame["date"].iloc[-1]
+            assert np.isfinite(stats["rolling_vol_30"])
+            assert np.isfinite(stats["ma_30"])
+        assert status["connected"] == 1 and status["error"] is None
+    finally:
+        stream.stop()
+        server.shutdown()
@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+from crypto_vra.intervals import TRADING_DAYS
+from crypto_vra.metrics import add_rolling_features, compute_beta, compute_log_returns
+
+# The groupby/transform implementations the matrix engine replaced; the
+# engine must keep agreeing with them
+
+
+def baseline_log_returns(df):
+    df = df.copy().sort_values(["crypto", "date"])
+    df["log_return"] = df.groupby("crypto")["price"].transform(
+        lambda x: np.log(x / x.shift(1))
+    )
+    return df
+
+
+def baseline_rolling_features(df, window=30, ppy=TRADING_DAYS):
+    df = df.copy().sort_values(["crypto", "date"])
+    df["ma_30"] = df.groupby("crypto")["price"].transform(
+        lambda x: x.rolling(window).mean()
+    )
+    df["rolling_vol_30"] = df.groupby("crypto")["log_return"].transform(
+        lambda x: x.rolling(window).std() * np.sqrt(ppy) * 100
+    )
+    return df
+
+
+def baseline_beta(returns_df, benchmark="BTCUSDT"):
+    pivot = returns_df.pivot(index="date", columns="crypto", values="log_return")
+    market_var = pivot[benchmark].var()
+    beta_values = {}
+    for col in pivot.columns:
+        if col == benchmark:
+            beta_values[col] = 1.0
+        else:
+            cov = pivot[col].cov(pivot[benchmark])
+            beta_values[col] = cov / market_var if market_var != 0 else np.nan
+    return pd.Series(beta_values).round(2)
+
+
+def ragged_panel(seed=0):
+    # Symbols listed on different dates with different lengths and price
+    # levels, a few NaN gaps in the prices and rows shuffled
+    rng = np.random.default_rng(seed)
+    frames = []
+    for symbol, level, start, n_bars in [("BTCUSDT", 60000, 0, 400), ("ETHUSDT", 3000, 35, 365),
+                                         ("SOLUSDT", 150, 120, 200), ("DOGEUSDT", 0.1, 10, 25)]:
+        dates = pd.date_range("2024-01-01", periods=start + n_bars, freq="D")[start:]
+        price = level * np.exp(np.cumsum(rng.normal(0, 0.04, n_bars)))
+        price[rng.choice(n_bars, 3, replace=False)] = np.nan
+        frames.append(pd.DataFrame({"date": dates, "crypto": symbol, "price": price}))
+    df = pd.concat(frames, ignore_index=True)
+    return df.sample(frac=1, random_state=seed).reset_index(drop=True)
+
+
+def by_symbol_and_date(df, columns):
+    return df.set_index(["crypto", "date"])[columns].sort_index()
+
+
+def test_engine_matches_the_groupby_baseline():
+    prices = ragged_panel()
+
+    returns = compute_log_returns(prices)
+    expected_returns = baseline_log_returns(prices)
+    pd.testing.assert_frame_equal(
+        by_symbol_and_date(returns, ["price", "log_return"]),
+        by_symbol_and_date(expected_returns, ["price", "log_return"]),
+        check_exact=True
+    )
+
+    rolling = add_rolling_features(returns, window=30)
+    expected_rolling = baseline_rolling_features(expected_returns, window=30)
+    pd.testing.assert_frame_equal(
+        by_symbol_and_date(rolling, ["ma_30", "rolling_vol_30"]),
+        by_symbol_and_date(expected_rolling, ["ma_30", "rolling_vol_30"]),
+        check_exact=False, rtol=1e-12, atol=1e-12
+    )
+
+    pd.testing.assert_series_equal(
+        compute_beta(returns).sort_index(), baseline_beta(expected_returns).sort_index(),
+        check_names=False, check_exact=True
+    )
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from crypto_vra import portfolio
+
+
+def moments_with_a_dropped_symbol():
+    symbols = pd.Index(["AAAUSDT", "BBBUSDT", "CCCUSDT"])
+    mean = pd.Series([0.001, np.nan, 0.002], index=symbols)
+    cov = pd.DataFrame(np.diag([0.0004, np.nan, 0.0009]), index=symbols, columns=symbols)
+    return mean, cov
+
+
+def test_array_weights_follow_the_full_symbol_index():
+    mean, cov = moments_with_a_dropped_symbol()
+    from_array = portfolio.portfolio_stats(np.array([[0.25, 0.5, 0.25]]), mean, cov)
+    from_frame = portfolio.portfolio_stats(
+        pd.DataFrame([[0.25, 0.5, 0.25]], columns=cov.index), mean, cov
+    )
+    pd.testing.assert_frame_equal(from_array, from_frame)
+
+
+def test_array_weights_of_the_wrong_width_are_rejected():
+    mean, cov = moments_with_a_dropped_symbol()
+    with pytest.raises(ValueError):
+        portfolio.portfolio_stats(np.array([0.5, 0.5]), mean, cov)
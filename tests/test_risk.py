@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from crypto_vra import risk
+
+
+def returns_frame(n_bars=500, symbols=("BTCUSDT", "ETHUSDT"), seed=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2024-01-01", periods=n_bars, freq="D")
+    return pd.DataFrame({
+        "date": np.tile(dates, len(symbols)),
+        "crypto": np.repeat(symbols, n_bars),
+        "log_return": rng.normal(0, 0.03, n_bars * len(symbols)),
+    })
+
+
+def test_top_losses_with_nothing_to_keep():
+    losses = np.arange(6.0).reshape(3, 2)
+    assert risk._top_losses(losses, 0).shape == (0, 2)
+
+
+def test_monte_carlo_paths_not_a_multiple_of_the_chunk(monkeypatch):
+    # Chunks of 1,000 paths leave a last chunk of one path, whose losses are
+    # usually all below the running top-k floor
+    monkeypatch.setattr(risk, "MC_CHUNK_ELEMENTS", 2_000)
+    df = returns_frame()
+    for seed in range(5):
+        table = risk.monte_carlo_var(df, n_paths=20_001, seed=seed, max_workers=1)
+        assert table.notna().all().all()
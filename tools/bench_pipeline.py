@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from crypto_vra.engine import rolling_beta  # noqa: E402
+from crypto_vra.intervals import periods_per_year  # noqa: E402
+from crypto_vra.memory import PANEL_FLOAT_DTYPE, pipeline_memory, symbol_dtype  # noqa: E402
+from crypto_vra.metrics import (  # noqa: E402
+    add_rolling_features, build_metrics_table, compute_beta, compute_log_returns
+)
+from crypto_vra.processed import build_processed  # noqa: E402
+from crypto_vra.risk import monte_carlo_var  # noqa: E402
+from crypto_vra.volatility import add_ewma_volatility, fit_garch  # noqa: E402
+
+# Benchmarks for the metrics pipeline on synthetic price panels:
+#
+#   python tools/bench_pipeline.py                    # quick grid
+#   python tools/bench_pipeline.py --preset full      # up to 5,000 symbols / 10M rows
+#   python tools/bench_pipeline.py --symbols 500 --rows 1000000 --stage build_metrics_table
+#   python tools/bench_pipeline.py --symbols 500 --rows 1000000 --memory --float32
+#
+# --memory prints, per case, the frame size and traced peak memory of every
+# pipeline stage instead of timing them. --float32 runs on float32 prices.
+#
+# Every run is appended to benchmarks/results.jsonl together with the git
+# commit, and compared with the most recent run of the same case from a
+# different commit (or --baseline). Cases that got slower or use more
+# memory than --tolerance allows are flagged, and the exit status is 1.
+
+PRESETS = {
+    "quick": {"symbols": [5, 50], "rows": [1_000, 100_000]},
+    "standard": {"symbols": [5, 50, 500], "rows": [1_000, 100_000, 1_000_000]},
+    "full": {"symbols": [5, 50, 500, 5_000], "rows": [1_000, 100_000, 1_000_000, 10_000_000]},
+}
+DEFAULT_RESULTS = os.path.join(REPO_ROOT, "benchmarks", "results.jsonl")
+BENCH_INTERVAL = "1h"
+BENCH_WINDOW = 30
+BENCH_MC_PATHS = 100_000
+MIN_DELTA_SECONDS = 0.005
+
+
+def synthetic_panel(n_symbols, n_rows, interval=BENCH_INTERVAL, seed=0, float_dtype=None):
+    # Long (date, crypto, price) frame of geometric random walks, BTCUSDT
+    # included so beta stages always have their benchmark. Same layout and
+    # dtypes as load_price_panel: grouped by symbol, sorted by date,
+    # categorical symbols.
+    rng = np.random.default_rng(seed)
+    bars = max(2, n_rows // n_symbols)
+    symbols = ["BTCUSDT"] + [f"SYM{i:04d}USDT" for i in range(1, n_symbols)]
+    dates = pd.date_range("2020-01-01", periods=bars, freq=interval.replace("m", "min"))
+    vols = rng.uniform(0.002, 0.02, n_symbols)
+    log_prices = np.cumsum(rng.normal(0, 1, (bars, n_symbols)) * vols, axis=0)
+    prices = 100 * np.exp(log_prices)
+    dtype = symbol_dtype(symbols)
+    codes = np.repeat(dtype.categories.get_indexer(symbols), bars)
+    return pd.DataFrame({
+        "date": np.tile(dates.values.astype("datetime64[ns]"), n_symbols),
+        "crypto": pd.Categorical.from_codes(codes, dtype=dtype),
+        "price": prices.T.ravel().astype(float_dtype or PANEL_FLOAT_DTYPE)
+    }).sort_values(["crypto", "date"], ignore_index=True)
+
+
+def stage_table(ppy):
+    # name -> (input key, function); inputs are built once per case
+    return {
+        "compute_log_returns": ("prices", compute_log_returns),
+        "add_rolling_features": ("returns", lambda df: add_rolling_features(df, BENCH_WINDOW, ppy)),
+        "compute_beta": ("returns", lambda df: compute_beta(df, "BTCUSDT")),
+        "rolling_beta": ("returns", lambda df: rolling_beta(df, "BTCUSDT", BENCH_WINDOW)),
+        "add_ewma_volatility": ("returns", lambda df: add_ewma_volatility(df, ppy=ppy)),
+        "fit_garch": ("returns", fit_garch),
+        "monte_carlo_var": ("returns", lambda df: monte_carlo_var(
+            df, weights=dict.fromkeys(df["crypto"].unique(), 1.0), n_paths=BENCH_MC_PATHS
+        )),
+        "build_metrics_table": ("returns", lambda df: build_metrics_table(df, "BTCUSDT", ppy)),
+        "build_processed": ("prices", lambda df: build_processed(df, BENCH_WINDOW, ppy)),
+    }
+
+
+def measure(fn, arg, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - start)
+    # Peak memory is taken on a separate run, since tracing slows the code down
+    tracemalloc.start()
+    try:
+        fn(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return float(np.median(times)), peak
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def find_baseline(history, record, baseline=None):
+    # Most recent earlier run of the same case from another (or the given) commit
+    for old in reversed(history):
+        if (old["stage"], old["symbols"], old["rows"]) != (record["stage"], record["symbols"], record["rows"]):
+            continue
+        if baseline is not None:
+            if old["commit"].startswith(baseline):
+                return old
+        elif old["commit"] != record["commit"]:
+            return old
+    return None
+
+
+def compare(record, base, tolerance):
+    if base is None:
+        return "", False
+    ratio = record["seconds"] / base["seconds"] if base["seconds"] else np.inf
+    mem_ratio = record["peak_mb"] / base["peak_mb"] if base["peak_mb"] else 1.0
+    slower = ratio > 1 + tolerance and record["seconds"] - base["seconds"] > MIN_DELTA_SECONDS
+    bigger = mem_ratio > 1 + tolerance
+    note = f"x{ratio:.2f} time, x{mem_ratio:.2f} mem vs {base['commit']}"
+    if slower or bigger:
+        note += "  << REGRESSION"
+    return note, slower or bigger
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the metrics pipeline on synthetic panels")
+    parser.add_argument("--preset", choices=list(PRESETS), default="quick")
+    parser.add_argument("--symbols", type=int, nargs="+", help="symbol counts (overrides preset)")
+    parser.add_argument("--rows", type=int, nargs="+", help="total row counts (overrides preset)")
+    parser.add_argument("--stage", action="append", help="only run these stages")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case below 1M rows")
+    parser.add_argument("--results", default=DEFAULT_RESULTS, help="JSONL history file")
+    parser.add_argument("--baseline", help="commit to compare against (default: previous commit seen)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    parser.add_argument("--no-save", action="store_true", help="do not append to the history")
+    parser.add_argument("--memory", action="store_true", help="print a per-stage memory report")
+    parser.add_argument("--float32", action="store_true", help="use float32 price panels")
+    args = parser.parse_args()
+
+    preset = PRESETS[args.preset]
+    symbol_counts = args.symbols or preset["symbols"]
+    row_counts = args.rows or preset["rows"]
+    ppy = periods_per_year(BENCH_INTERVAL)
+    stages = stage_table(ppy)
+    selected = args.stage or list(stages)
+    unknown = set(selected) - set(stages)
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(sorted(unknown))}")
+
+    float_dtype = "float32" if args.float32 else None
+    if args.memory:
+        for n_symbols in symbol_counts:
+            for n_rows in row_counts:
+                prices = synthetic_panel(n_symbols, n_rows, float_dtype=float_dtype)
+                print(f"{n_symbols} symbols, {len(prices):,} rows, {prices['price'].dtype} prices")
+                report = pipeline_memory(prices, ppy, window=BENCH_WINDOW)
+                print(report.round(2).to_string(index=False))
+                print()
+        return 0
+
+    history = load_history(args.results)
+    commit = git_commit()
+    env = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+    }
+    records = []
+    regressions = 0
+
+    print(f"commit {commit}  python {env['python']}  numpy {env['numpy']}  pandas {env['pandas']}")
+    print(f"{'stage':<22}{'symbols':>8}{'rows':>11}{'seconds':>10}{'rows/s':>13}{'peak MB':>10}  vs baseline")
+    for n_symbols in symbol_counts:
+        for n_rows in row_counts:
+            # Each symbol needs a window's worth of bars for the rolling stages
+            if n_rows < n_symbols * (BENCH_WINDOW + 1):
+                continue
+            inputs = {"prices": synthetic_panel(n_symbols, n_rows, float_dtype=float_dtype)}
+            inputs["returns"] = compute_log_returns(inputs["prices"])
+            rows = len(inputs["prices"])
+            repeat = args.repeat if rows < 1_000_000 else 1
+            for name in selected:
+                key, fn = stages[name]
+                seconds, peak = measure(fn, inputs[key], repeat)
+                record = {
+                    "stage": name,
+                    "symbols": n_symbols,
+                    "rows": rows,
+                    "seconds": round(seconds, 6),
+                    "rows_per_sec": round(rows / seconds) if seconds else None,
+                    "peak_mb": round(peak / 2**20, 2),
+                    "commit": commit,
+                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    **env,
+                }
+                note, regressed = compare(record, find_baseline(history, record, args.baseline), args.tolerance)
+                regressions += regressed
+                records.append(record)
+                print(f"{name:<22}{n_symbols:>8}{rows:>11}{seconds:>10.4f}"
+                      f"{record['rows_per_sec'] or 0:>13,}{record['peak_mb']:>10.1f}  {note}")
+            del inputs
+
+    if records and not args.no_save:
+        os.makedirs(os.path.dirname(args.results) or ".", exist_ok=True)
+        with open(args.results, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        print(f"saved {len(records)} results to {os.path.relpath(args.results)}")
+    if regressions:
+        print(f"{regressions} regression(s) above {args.tolerance:.0%} tolerance")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
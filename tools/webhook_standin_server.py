@@ -0,0 +1,69 @@
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-in for an alert webhook receiver: prints every alert it is
+# sent and keeps them for GET /alerts, for exercising the webhook sink
+# without a real endpoint:
+#
+#   python tools/webhook_standin_server.py --port 8766
+#   CVRA_ALERT_WEBHOOK=http://127.0.0.1:8766/alerts streamlit run crypto_VRA_app_iqramullah.py
+
+
+def make_handler(received, lock, quiet):
+    class Handler(BaseHTTPRequestHandler):
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            try:
+                alerts = json.loads(self.rfile.read(length) or b"{}").get("alerts", [])
+            except ValueError:
+                self.send_response(400)
+                self.end_headers()
+                return
+            with lock:
+                received.extend(alerts)
+            if not quiet:
+                for alert in alerts:
+                    print(f"{alert.get('bar')} {alert.get('symbol')} {alert.get('rule')}: "
+                          f"{alert.get('metric')} {alert.get('op')} {alert.get('threshold')} "
+                          f"(value {alert.get('value')})", flush=True)
+            self.send_response(204)
+            self.end_headers()
+
+        def do_GET(self):
+            with lock:
+                body = json.dumps(received).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def run(host="127.0.0.1", port=8766, quiet=False, ready=None):
+    received = []
+    server = ThreadingHTTPServer((host, port), make_handler(received, threading.Lock(), quiet))
+    if ready is not None:
+        ready.set()
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in alert webhook receiver")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--quiet", action="store_true", help="do not print received alerts")
+    args = parser.parse_args()
+    print(f"Receiving alerts on http://{args.host}:{args.port}/alerts")
+    run(args.host, args.port, args.quiet)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from urllib.parse import urlparse, parse_qs
+
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.server import serve
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from crypto_vra.intervals import INTERVAL_MS  # noqa: E402
+
+# Local stand-in for the Binance combined kline stream, for exercising the
+# Milestone-1 live mode without touching the exchange:
+#
+#   python tools/ws_standin_server.py --port 8765
+#   CVRA_WS_URL=ws://127.0.0.1:8765 streamlit run crypto_VRA_app_iqramullah.py
+#
+# --speed runs the bar clock faster than real time (e.g. --speed 240 with
+# the default --tick closes one 1m bar per push); every bar ends with a
+# closed ("x": true) kline.
+
+
+def parse_streams(path):
+    query = parse_qs(urlparse(path).query)
+    streams = []
+    for name in query.get("streams", [""])[0].split("/"):
+        if "@kline_" not in name:
+            continue
+        symbol, interval = name.split("@kline_")
+        streams.append((symbol.upper(), interval))
+    return streams
+
+
+def kline_message(symbol, interval, price, now, closed=False):
+    step = INTERVAL_MS.get(interval, 60_000)
+    start = now // step * step
+    return json.dumps({
+        "stream": f"{symbol.lower()}@kline_{interval}",
+        "data": {
+            "e": "kline",
+            "E": now,
+            "s": symbol,
+            "k": {
+                "t": start,
+                "T": start + step - 1,
+                "s": symbol,
+                "i": interval,
+                "c": f"{price:.6f}",
+                "x": closed,
+            },
+        },
+    })
+
+
+def make_handler(tick_seconds, seed_price, speed=1.0):
+    def handler(ws):
+        try:
+            stream_klines(ws, parse_streams(ws.request.path), tick_seconds, seed_price, speed)
+        except ConnectionClosed:
+            pass
+    return handler
+
+
+def stream_klines(ws, streams, tick_seconds, seed_price, speed):
+    prices = {symbol: seed_price for symbol, _ in streams}
+    bars = {}
+    started = time.time()
+    while True:
+        now = int((started + (time.time() - started) * speed) * 1000)
+        for symbol, interval in streams:
+            step = INTERVAL_MS.get(interval, 60_000)
+            last = bars.get((symbol, interval))
+            if last is not None and now // step > last // step:
+                # Close the previous bar at its last price
+                ws.send(kline_message(symbol, interval, prices[symbol], last, closed=True))
+            bars[(symbol, interval)] = now
+            prices[symbol] *= 1 + random.gauss(0, 0.001)
+            ws.send(kline_message(symbol, interval, prices[symbol], now))
+        time.sleep(tick_seconds)
+
+
+def make_server(host="127.0.0.1", port=8765, tick_seconds=0.25, seed_price=100.0, speed=1.0):
+    # port 0 picks a free port: see server.socket.getsockname()
+    return serve(make_handler(tick_seconds, seed_price, speed), host, port)
+
+
+def run(host="127.0.0.1", port=8765, tick_seconds=0.25, seed_price=100.0, speed=1.0, ready=None):
+    with make_server(host, port, tick_seconds, seed_price, speed) as server:
+        if ready is not None:
+            ready.set()
+        server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stand-in Binance kline websocket server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--tick", type=float, default=0.25, help="seconds between pushes")
+    parser.add_argument("--price", type=float, default=100.0, help="starting price")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="bar clock speed relative to real time")
+    args = parser.parse_args()
+    print(f"Serving kline streams on ws://{args.host}:{args.port}/stream?streams=...")
+    run(args.host, args.port, args.tick, args.price, args.speed)
+
+
+if __name__ == "__main__":
+    main()